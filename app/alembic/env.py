@@ -15,19 +15,19 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".
 config = context.config
 
 # Interpret the config file for Python logging.
-if config.config_file_name is not None:
+# init_db roda dentro do processo da aplicação e mantém o logging dela
+if config.config_file_name is not None and config.attributes.get(
+    "configure_logger", True
+):
     fileConfig(config.config_file_name)
 
-database_url = os.getenv("DATABASE_URL")
-if database_url and database_url.startswith("postgres://"):
-    database_url = database_url.replace("postgres://", "postgresql://", 1)
-
-if database_url:
-    config.set_main_option("sqlalchemy.url", database_url)
-
-from app.core.database import Base
+from app.core.database import DATABASE_URL, Base
 from app.models import *
 
+# mesma URL do app (DATABASE_URL ou .env); init_db pode passar outra
+database_url = config.attributes.get("database_url", DATABASE_URL)
+config.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
+
 target_metadata = Base.metadata
 
 
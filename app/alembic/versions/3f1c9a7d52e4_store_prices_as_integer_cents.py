@@ -0,0 +1,62 @@
+"""store prices as integer cents
+
+Revision ID: 3f1c9a7d52e4
+Revises: eaa43c9e19a5
+Create Date: 2026-10-18 13:40:12.512204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c9a7d52e4"
+down_revision: Union[str, Sequence[str], None] = "eaa43c9e19a5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("order_items") as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "unit_price_cents", sa.Integer(), nullable=False, server_default="0"
+            )
+        )
+    op.execute(
+        "UPDATE order_items "
+        "SET unit_price_cents = CAST(ROUND(COALESCE(unit_price, 0) * 100) AS INTEGER)"
+    )
+    with op.batch_alter_table("order_items") as batch_op:
+        batch_op.drop_column("unit_price")
+
+    with op.batch_alter_table("orders") as batch_op:
+        batch_op.add_column(
+            sa.Column("price_cents", sa.Integer(), nullable=False, server_default="0")
+        )
+    # o total é recalculado a partir dos itens em vez de copiar o float antigo
+    op.execute(
+        "UPDATE orders SET price_cents = ("
+        "SELECT COALESCE(SUM(order_items.quantity * order_items.unit_price_cents), 0) "
+        "FROM order_items WHERE order_items.order_id = orders.id)"
+    )
+    with op.batch_alter_table("orders") as batch_op:
+        batch_op.drop_column("price")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("orders") as batch_op:
+        batch_op.add_column(sa.Column("price", sa.Float(), nullable=True))
+    op.execute("UPDATE orders SET price = price_cents / 100.0")
+    with op.batch_alter_table("orders") as batch_op:
+        batch_op.drop_column("price_cents")
+
+    with op.batch_alter_table("order_items") as batch_op:
+        batch_op.add_column(sa.Column("unit_price", sa.Float(), nullable=True))
+    op.execute("UPDATE order_items SET unit_price = unit_price_cents / 100.0")
+    with op.batch_alter_table("order_items") as batch_op:
+        batch_op.drop_column("unit_price_cents")
@@ -0,0 +1,32 @@
+"""add order version
+
+Revision ID: 5b7e2c9d4f18
+Revises: 8d2e4b6a1c07
+Create Date: 2026-10-18 15:12:44.318206
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5b7e2c9d4f18"
+down_revision: Union[str, Sequence[str], None] = "8d2e4b6a1c07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("orders") as batch_op:
+        batch_op.add_column(
+            sa.Column("version", sa.Integer(), nullable=False, server_default="1")
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("orders") as batch_op:
+        batch_op.drop_column("version")
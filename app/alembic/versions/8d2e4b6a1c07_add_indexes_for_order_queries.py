@@ -0,0 +1,31 @@
+"""add indexes for order queries
+
+Revision ID: 8d2e4b6a1c07
+Revises: 3f1c9a7d52e4
+Create Date: 2026-10-18 14:05:31.904117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8d2e4b6a1c07"
+down_revision: Union[str, Sequence[str], None] = "3f1c9a7d52e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_orders_user_id_id", "orders", ["user_id", "id"])
+    op.create_index("ix_orders_status_id", "orders", ["status", "id"])
+    op.create_index("ix_order_items_order_id", "order_items", ["order_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_order_items_order_id", table_name="order_items")
+    op.drop_index("ix_orders_status_id", table_name="orders")
+    op.drop_index("ix_orders_user_id_id", table_name="orders")
@@ -0,0 +1,40 @@
+"""add order created_at
+
+Revision ID: c2f7a3d91e54
+Revises: 9c4a1e7f3b26
+Create Date: 2026-10-18 19:05:37.114902
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "c2f7a3d91e54"
+down_revision: Union[str, Sequence[str], None] = "9c4a1e7f3b26"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pedidos antigos recebem a data da migração
+    with op.batch_alter_table("orders") as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "created_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.func.current_timestamp(),
+            )
+        )
+        batch_op.create_index("ix_orders_created_at", ["created_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("orders") as batch_op:
+        batch_op.drop_index("ix_orders_created_at")
+        batch_op.drop_column("created_at")
@@ -0,0 +1,62 @@
+"""add daily rollups
+
+Revision ID: e5b8d2a6c413
+Revises: c2f7a3d91e54
+Create Date: 2026-10-18 20:12:48.306155
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e5b8d2a6c413"
+down_revision: Union[str, Sequence[str], None] = "c2f7a3d91e54"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "daily_order_stats",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.Column("revenue_cents", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "status"),
+    )
+    op.create_table(
+        "daily_item_stats",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("flavor", sa.String(), nullable=False),
+        sa.Column("size", sa.String(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("revenue_cents", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "flavor", "size"),
+    )
+    # os pedidos já existentes entram nos rollups
+    op.execute(
+        "INSERT INTO daily_order_stats (day, status, orders, revenue_cents) "
+        "SELECT date(created_at), status, count(*), sum(price_cents) "
+        "FROM orders WHERE status IS NOT NULL "
+        "GROUP BY date(created_at), status"
+    )
+    op.execute(
+        "INSERT INTO daily_item_stats (day, flavor, size, quantity, revenue_cents) "
+        "SELECT date(orders.created_at), order_items.flavor, "
+        "coalesce(order_items.size, ''), sum(order_items.quantity), "
+        "sum(order_items.quantity * order_items.unit_price_cents) "
+        "FROM order_items JOIN orders ON orders.id = order_items.order_id "
+        "WHERE orders.status = 'FINISHED' "
+        "GROUP BY date(orders.created_at), order_items.flavor, "
+        "coalesce(order_items.size, '')"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("daily_item_stats")
+    op.drop_table("daily_order_stats")
@@ -0,0 +1,104 @@
+"""
+Command line tools.
+
+Usage:
+    python -m app.cli init-db
+    python -m app.cli import-orders orders.ndjson [--format csv] [--chunk-size 1000]
+    python -m app.cli rebuild-rollups
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from app.core.config import IMPORT_CHUNK_SIZE
+from app.core.database import AsyncSessionLocal, async_engine, init_db
+from app.core.order_import import csv_rows, import_orders, iter_lines, ndjson_rows
+from app.core.rollups import rebuild_rollups
+
+FILE_BLOCK_SIZE = 64 * 1024
+
+
+async def file_blocks(path, size=FILE_BLOCK_SIZE):
+    # o disco é lido numa thread, um bloco por vez, sem travar o event loop
+    file = await asyncio.to_thread(open, path, "rb")
+    try:
+        while block := await asyncio.to_thread(file.read, size):
+            yield block
+    finally:
+        await asyncio.to_thread(file.close)
+
+
+async def run_import(path, format, chunk_size, session_factory=AsyncSessionLocal):
+    if format is None:
+        format = "csv" if path.lower().endswith(".csv") else "ndjson"
+    lines = iter_lines(file_blocks(path))
+    rows = csv_rows(lines) if format == "csv" else ndjson_rows(lines)
+    async with session_factory() as session:
+        return await import_orders(session, rows, chunk_size)
+
+
+async def run_rebuild(session_factory=AsyncSessionLocal):
+    async with session_factory() as session:
+        await rebuild_rollups(session)
+
+
+async def run_command(command):
+    # a conexão aiosqlite ociosa no pool prenderia o processo na saída
+    try:
+        return await command
+    finally:
+        await async_engine.dispose()
+
+
+def init_db_command(args):
+    init_db(args.database_url)
+    print("database schema is up to date")
+    return 0
+
+
+def import_orders_command(args):
+    report = asyncio.run(
+        run_command(run_import(args.path, args.format, args.chunk_size))
+    )
+    print(json.dumps(report, indent=2))
+    return 1 if report["errors"] else 0
+
+
+def rebuild_rollups_command(args):
+    asyncio.run(run_command(run_rebuild()))
+    print("rollups rebuilt")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init = commands.add_parser(
+        "init-db",
+        help="create or migrate the schema; run once before starting the workers",
+    )
+    init.add_argument("--database-url", help="defaults to DATABASE_URL")
+    init.set_defaults(handler=init_db_command)
+
+    importer = commands.add_parser(
+        "import-orders", help="bulk import orders from NDJSON or CSV"
+    )
+    importer.add_argument("path")
+    importer.add_argument("--format", choices=("ndjson", "csv"))
+    importer.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    importer.set_defaults(handler=import_orders_command)
+
+    rebuild = commands.add_parser(
+        "rebuild-rollups", help="recompute the report rollups from the orders"
+    )
+    rebuild.set_defaults(handler=rebuild_rollups_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
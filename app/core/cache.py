@@ -0,0 +1,53 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Bounded LRU mapping whose entries also expire ``ttl`` seconds after being set.
+
+    Not thread-safe; meant to be used from the event loop of one worker.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > self.timer():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key, value, expires_at=None):
+        if self.maxsize <= 0:
+            return
+        if expires_at is None:
+            expires_at = self.timer() + self.ttl
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
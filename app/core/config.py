@@ -0,0 +1,110 @@
+"""
+Application settings, read from the environment (and ``.env``) once, when
+this module is first imported. Every other module imports them from here.
+"""
+
+import os
+
+from dotenv import load_dotenv
+from jose import jwk
+
+load_dotenv()
+
+SECRET_KEY = os.getenv("SECRET_KEY")
+ALGORITHM = os.getenv("ALGORITHM")
+ACESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+# chave já montada uma vez; o jose reconstruiria a partir da string a cada token
+SIGNING_KEY = jwk.construct(SECRET_KEY, ALGORITHM) if SECRET_KEY else SECRET_KEY
+
+# pool de hashing de senha (bcrypt fora do event loop)
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 32))
+
+# limite de tentativas em login/login-form/create_account (token bucket),
+# por IP e por email; por minuto = 0 desliga. "sqlite" compartilha o limite
+# entre os workers da máquina
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "./data/ratelimit.db")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+AUTH_RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("AUTH_RATE_LIMIT_IP_PER_MINUTE", 30))
+AUTH_RATE_LIMIT_IP_BURST = int(os.getenv("AUTH_RATE_LIMIT_IP_BURST", 30))
+AUTH_RATE_LIMIT_EMAIL_PER_MINUTE = float(
+    os.getenv("AUTH_RATE_LIMIT_EMAIL_PER_MINUTE", 5)
+)
+AUTH_RATE_LIMIT_EMAIL_BURST = int(os.getenv("AUTH_RATE_LIMIT_EMAIL_BURST", 10))
+
+# cache de usuários autenticados em verify_token (ttl 0 desliga)
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", 30))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", 10000))
+# claims de tokens já verificados, até o exp de cada um (0 desliga)
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 10000))
+# confia nas claims admin/active do token e não consulta o banco
+AUTH_STATELESS_TOKENS = os.getenv("AUTH_STATELESS_TOKENS", "false").lower() == "true"
+
+# escritas nos pedidos: novas tentativas quando perdem uma disputa de lock
+# (SQLite busy/locked, Postgres 40001/40P01)
+ORDER_CONFLICT_RETRIES = int(os.getenv("ORDER_CONFLICT_RETRIES", 5))
+ORDER_CONFLICT_BACKOFF_MS = float(os.getenv("ORDER_CONFLICT_BACKOFF_MS", 10))
+
+# importação em massa: pedidos gravados (e commitados) por lote
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+
+# Idempotency-Key nos POST de pedidos: respostas guardadas por ttl, chave
+# reservada por lock enquanto a primeira requisição roda
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", 60))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", 10000))
+
+# outbox de eventos de pedido: sinks separados por vírgula (queue, file,
+# webhook), lidos em lotes por uma task de fundo em cada worker. Sem sinks
+# ninguém consome o outbox, então os eventos nem são gravados
+OUTBOX_DISPATCHER_ENABLED = (
+    os.getenv("OUTBOX_DISPATCHER_ENABLED", "true").lower() == "true"
+)
+OUTBOX_SINKS = os.getenv("OUTBOX_SINKS", "")
+OUTBOX_ENABLED = any(name.strip() for name in OUTBOX_SINKS.split(","))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", 1.0))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 10))
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", 0.5))
+OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", 60))
+OUTBOX_QUEUE_SIZE = int(os.getenv("OUTBOX_QUEUE_SIZE", 1000))
+OUTBOX_FILE_PATH = os.getenv("OUTBOX_FILE_PATH", "./data/order_events.ndjson")
+OUTBOX_WEBHOOK_URL = os.getenv("OUTBOX_WEBHOOK_URL", "")
+OUTBOX_WEBHOOK_TIMEOUT = float(os.getenv("OUTBOX_WEBHOOK_TIMEOUT", 5))
+
+# atualizações de pedido ao vivo (WebSocket/SSE): mensagens pendentes por
+# conexão antes de derrubá-la e intervalo dos heartbeats de conexões ociosas
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", 100))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", 15))
+
+# banco: primário e réplica somente leitura opcional para as rotas GET
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/dados.db")
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+# por quanto tempo um cliente que acabou de escrever continua lendo do primário
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+
+# perfil de desempenho do SQLite: WAL permite leitores durante uma escrita,
+# synchronous=NORMAL evita um fsync por commit (seguro com WAL) e busy_timeout
+# espera o lock em vez de falhar com "database is locked"
+SQLITE_PERFORMANCE_PROFILE = (
+    os.getenv("SQLITE_PERFORMANCE_PROFILE", "true").lower() == "true"
+)
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    # valor negativo = KiB (64 MiB por conexão)
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64 * 1024)),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+# instrumentação ligada por padrão; "false" remove o middleware e os eventos
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# perfilador de queries por requisição: desligado por padrão (uso em dev/staging)
+QUERY_PROFILER_ENABLED = os.getenv("QUERY_PROFILER", "false").lower() == "true"
+# a partir de quantas repetições da mesma query a requisição é suspeita de N+1
+QUERY_PROFILER_N_PLUS_ONE = int(os.getenv("QUERY_PROFILER_N_PLUS_ONE", 5))
@@ -2,24 +2,170 @@ import os
 import logging
 import pkgutil
 import importlib
-from sqlalchemy import create_engine
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from app.core.cache import TTLCache
+from app.core.config import (
+    DATABASE_READ_URL,
+    DATABASE_URL,
+    METRICS_ENABLED,
+    READ_YOUR_WRITES_SECONDS,
+    SQLITE_PERFORMANCE_PROFILE,
+    SQLITE_PRAGMAS,
+)
+from app.core.metrics import instrument_engine
 
 logger = logging.getLogger("app.database")
 
-
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/dados.db")
+ALEMBIC_INI = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "alembic.ini",
+)
 
 # normaliza caso venha "postgres://"
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+if DATABASE_READ_URL and DATABASE_READ_URL.startswith("postgres://"):
+    DATABASE_READ_URL = DATABASE_READ_URL.replace("postgres://", "postgresql://", 1)
+
+# drivers asyncio usados pelo AsyncSession de cada backend
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url):
+    """Return ``url`` rewritten to the asyncio driver of its backend."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None or parsed.drivername == driver:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
 
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
 
 connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
 
+
+def apply_sqlite_pragmas(engine, pragmas=None):
+    """Run ``PRAGMA name=value`` for every new DBAPI connection of ``engine``."""
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+# SQLSTATEs do Postgres que significam "tente de novo": serialization_failure
+# e deadlock_detected
+RETRYABLE_PGCODES = ("40001", "40P01")
+
+
+def is_write_conflict(error):
+    """
+    True when a DBAPIError only lost a race for a lock and the same
+    transaction may succeed if run again: SQLite's busy/locked errors or a
+    Postgres serialization failure or deadlock.
+    """
+    orig = getattr(error, "orig", None)
+    if getattr(orig, "pgcode", None) in RETRYABLE_PGCODES:
+        return True
+    message = str(orig).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+# engine síncrono: criar_bd, alembic e scripts de manutenção
 engine = create_engine(DATABASE_URL, connect_args=connect_args, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# engine assíncrono: usado por todas as rotas
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, connect_args=connect_args, pool_pre_ping=True
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+if DATABASE_READ_URL:
+    read_engine = create_async_engine(
+        to_async_url(DATABASE_READ_URL), connect_args=connect_args, pool_pre_ping=True
+    )
+    AsyncReadSessionLocal = async_sessionmaker(
+        bind=read_engine, autoflush=False, expire_on_commit=False
+    )
+else:
+    read_engine = async_engine
+    AsyncReadSessionLocal = AsyncSessionLocal
+
+if DATABASE_URL.startswith("sqlite") and SQLITE_PERFORMANCE_PROFILE:
+    apply_sqlite_pragmas(engine)
+    apply_sqlite_pragmas(async_engine.sync_engine)
+    if read_engine is not async_engine:
+        apply_sqlite_pragmas(read_engine.sync_engine)
+
+if METRICS_ENABLED:
+    instrument_engine(engine, "sync")
+    instrument_engine(async_engine.sync_engine, "primary")
+    if read_engine is not async_engine:
+        instrument_engine(read_engine.sync_engine, "replica")
+
+
+class SessionRouter:
+    """
+    Picks the session factory for a request: GET/HEAD go to the replica,
+    everything else to the primary.
+
+    After a client sends a write, its reads stay on the primary for
+    ``read_your_writes_seconds`` so it never misses its own change while
+    the replica catches up. Clients are told apart by their Authorization
+    header, falling back to the remote address.
+    """
+
+    SAFE_METHODS = ("GET", "HEAD")
+
+    def __init__(
+        self, primary, replica=None, read_your_writes_seconds=5.0, maxsize=10000
+    ):
+        self.primary = primary
+        self.replica = replica or primary
+        self.recent_writers = TTLCache(maxsize=maxsize, ttl=read_your_writes_seconds)
+
+    @staticmethod
+    def client_key(request):
+        authorization = request.headers.get("authorization")
+        if authorization:
+            return authorization
+        return request.client.host if request.client else ""
+
+    def factory_for(self, request):
+        if self.replica is self.primary or request.method not in self.SAFE_METHODS:
+            return self.primary
+        if self.recent_writers.get(self.client_key(request)):
+            return self.primary
+        return self.replica
+
+    @asynccontextmanager
+    async def session(self, request):
+        async with self.factory_for(request)() as session:
+            yield session
+        if request.method not in self.SAFE_METHODS:
+            self.recent_writers.set(self.client_key(request), True)
+
+
+session_router = SessionRouter(
+    AsyncSessionLocal,
+    AsyncReadSessionLocal,
+    read_your_writes_seconds=READ_YOUR_WRITES_SECONDS,
+)
+
 Base = declarative_base()
 
 
@@ -36,6 +182,47 @@ def criar_bd():
     Base.metadata.create_all(bind=engine)
 
 
+# revisão equivalente ao schema do create_all que rodava no startup
+CREATE_ALL_REVISION = "eaa43c9e19a5"
+
+
+def init_db(url=None):
+    """
+    Bring the schema to the latest Alembic revision, once per deploy and
+    before the workers start (``python -m app.cli init-db``).
+
+    A database created by the old startup ``create_all`` has tables but no
+    ``alembic_version``: it is stamped at the revision that matches that
+    schema and then migrated like any other.
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    url = url or DATABASE_URL
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database not in (
+        None,
+        "",
+        ":memory:",
+    ):
+        os.makedirs(os.path.dirname(parsed.database) or ".", exist_ok=True)
+
+    config = Config(ALEMBIC_INI)
+    config.attributes["database_url"] = url
+    config.attributes["configure_logger"] = False
+
+    schema_engine = create_engine(url)
+    try:
+        tables = set(inspect(schema_engine).get_table_names())
+        if tables and "alembic_version" not in tables:
+            # o create_all antigo gerava o schema de eaa43c9e19a5 (preços em
+            # float, sem version/created_at): as migrações seguintes convertem
+            command.stamp(config, CREATE_ALL_REVISION)
+        command.upgrade(config, "head")
+    finally:
+        schema_engine.dispose()
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from app.core.metrics import PASSWORD_HASH_DURATION
+
+logger = logging.getLogger("app.hashing")
+
+bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class HashQueueFull(Exception):
+    """Raised when the hashing pool already holds ``workers + queue_size`` jobs."""
+
+
+# funções de módulo para poderem ser enviadas a um ProcessPoolExecutor
+def _hash(password):
+    return bcrypt_context.hash(password)
+
+
+def _verify(password, hashed_password):
+    return bcrypt_context.verify(password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hash/verify in a bounded worker pool instead of the event loop.
+
+    At most ``workers`` jobs run at once and up to ``queue_size`` more wait;
+    anything beyond that fails fast with ``HashQueueFull`` so a burst of
+    logins cannot pile up behind the pool.
+    """
+
+    def __init__(self, workers=4, queue_size=32, executor="thread"):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"unknown password hash executor: {executor!r}")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.executor_kind = executor
+        self._executor = None
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    @property
+    def queue_depth(self):
+        return max(0, self._in_flight - self.workers)
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self._in_flight >= self.workers + self.queue_size:
+            self.rejected += 1
+            raise HashQueueFull()
+
+        self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._in_flight -= 1
+            elapsed = time.perf_counter() - started
+            self.completed += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+            PASSWORD_HASH_DURATION.labels(func.__name__.lstrip("_")).observe(elapsed)
+
+    async def hash(self, password):
+        return await self._run(_hash, password)
+
+    async def verify(self, password, hashed_password):
+        return await self._run(_verify, password, hashed_password)
+
+    def metrics(self):
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "latency_seconds_total": self.total_seconds,
+            "latency_seconds_max": self.max_seconds,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
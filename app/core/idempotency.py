@@ -0,0 +1,205 @@
+import hashlib
+from collections import namedtuple
+from datetime import timedelta
+
+from fastapi import HTTPException, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.cache import TTLCache
+from app.models.tables import IdempotencyKey, utcnow
+
+MAX_KEY_LENGTH = 255
+
+StoredResponse = namedtuple("StoredResponse", "fingerprint status_code body media_type")
+
+
+def request_fingerprint(method, path, body):
+    digest = hashlib.sha256(f"{method} {path}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class IdempotencyStore:
+    """
+    ``(user, Idempotency-Key) -> response`` store for retried writes.
+
+    The ``idempotency_keys`` table is the shared source of truth between
+    workers; completed responses are also kept in a bounded in-memory
+    ``TTLCache`` so replays usually need no query at all. A key is reserved
+    before the write runs, for ``lock_seconds``, so a retry that arrives
+    while the original is still running gets a 409 instead of a second
+    write; completed entries live for ``ttl`` seconds and expired rows are
+    purged every ``purge_every`` saves.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        ttl=86400,
+        lock_seconds=60,
+        maxsize=10000,
+        purge_every=1000,
+    ):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+        self.purge_every = purge_every
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._saves = 0
+
+    async def reserve(self, user_id, key, fingerprint):
+        """Claim ``key`` for a new write, or return the response it already got."""
+        stored = self.cache.get((user_id, key))
+        if stored is None:
+            stored = await self._reserve(user_id, key, fingerprint)
+        if stored is not None and stored.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different request",
+            )
+        return stored
+
+    async def _reserve(self, user_id, key, fingerprint):
+        now = utcnow()
+        locked_until = now + timedelta(seconds=self.lock_seconds)
+        async with self.session_factory() as session:
+            session.add(
+                IdempotencyKey(
+                    user_id=user_id,
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=locked_until,
+                )
+            )
+            try:
+                await session.commit()
+                return None
+            except IntegrityError:
+                await session.rollback()
+
+            # a chave já existe: assume se expirou (ou se a reserva foi abandonada)
+            taken = await session.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.expires_at <= now,
+                )
+                .values(
+                    fingerprint=fingerprint,
+                    status_code=None,
+                    body=None,
+                    media_type=None,
+                    expires_at=locked_until,
+                )
+            )
+            await session.commit()
+            if taken.rowcount:
+                return None
+
+            record = await session.get(IdempotencyKey, (user_id, key))
+            if record is None:
+                return await self._reserve(user_id, key, fingerprint)
+            if record.status_code is None:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress",
+                )
+            stored = StoredResponse(
+                record.fingerprint, record.status_code, record.body, record.media_type
+            )
+            self.cache.set((user_id, key), stored)
+            return stored
+
+    async def save(self, user_id, key, fingerprint, response):
+        stored = StoredResponse(
+            fingerprint, response.status_code, bytes(response.body), response.media_type
+        )
+        now = utcnow()
+        async with self.session_factory() as session:
+            await session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+                .values(
+                    status_code=stored.status_code,
+                    body=stored.body,
+                    media_type=stored.media_type,
+                    expires_at=now + timedelta(seconds=self.ttl),
+                )
+            )
+            self._saves += 1
+            if self._saves % self.purge_every == 0:
+                await session.execute(
+                    delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now)
+                )
+            await session.commit()
+        self.cache.set((user_id, key), stored)
+
+    async def release(self, user_id, key):
+        # a escrita falhou: libera a chave para a próxima tentativa
+        async with self.session_factory() as session:
+            await session.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.status_code.is_(None),
+                )
+            )
+            await session.commit()
+
+
+def idempotent_route_class(store, principal):
+    """
+    APIRoute subclass that honours ``Idempotency-Key`` on POST routes.
+
+    ``principal(request)`` returns the id of the authenticated user (or
+    ``None``, leaving the 401 to the route). Keys are scoped per user and
+    bound to the method, path and body of the first request; only 2xx
+    responses are kept, anything else frees the key for a retry.
+    """
+
+    class IdempotentRoute(APIRoute):
+        def get_route_handler(self):
+            handler = super().get_route_handler()
+
+            async def idempotent_handler(request):
+                key = request.headers.get("idempotency-key")
+                if not key or request.method != "POST":
+                    return await handler(request)
+                if len(key) > MAX_KEY_LENGTH:
+                    raise HTTPException(
+                        status_code=400, detail="Idempotency-Key is too long"
+                    )
+                user_id = await principal(request)
+                if user_id is None:
+                    return await handler(request)
+
+                fingerprint = request_fingerprint(
+                    request.method, request.url.path, await request.body()
+                )
+                stored = await store.reserve(user_id, key, fingerprint)
+                if stored is not None:
+                    # repetição: nenhuma tabela de pedidos é tocada
+                    return Response(
+                        stored.body,
+                        status_code=stored.status_code,
+                        media_type=stored.media_type,
+                        headers={"Idempotent-Replayed": "true"},
+                    )
+
+                try:
+                    response = await handler(request)
+                except BaseException:
+                    await store.release(user_id, key)
+                    raise
+                if 200 <= response.status_code < 300 and hasattr(response, "body"):
+                    await store.save(user_id, key, fingerprint, response)
+                else:
+                    await store.release(user_id, key)
+                return response
+
+            return idempotent_handler
+
+    return IdempotentRoute
@@ -0,0 +1,288 @@
+import bisect
+import time
+
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name, labels):
+        yield f"{name}{labels} {_format_value(self.value)}"
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # contagem por faixa (não cumulativa); a última é o +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        # o rótulo "le" entra junto com os rótulos da série
+        prefix = labels[:-1] + "," if labels else "{"
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = _format_value(bound)
+            yield f'{name}_bucket{prefix}le="{le}"}} {cumulative}'
+        yield f"{name}_sum{labels} {_format_value(self.sum)}"
+        yield f"{name}_count{labels} {self.count}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    def _new_child(self):
+        return _Value()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def clear(self):
+        self._children.clear()
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, child in sorted(self._children.items()):
+            yield from child.samples(self.name, _format_labels(self.labelnames, values))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+
+class Registry:
+    """
+    Collection of metrics rendered in the Prometheus text exposition format.
+
+    Updates are plain attribute writes with no locking: they happen on the
+    event loop of one worker, like the rest of the in-process state.
+    Callbacks added with ``on_collect`` run right before each render, for
+    values that are cheaper to read at scrape time than to track.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._callbacks = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def on_collect(self, callback):
+        self._callbacks.append(callback)
+        return callback
+
+    def render(self):
+        for callback in self._callbacks:
+            callback()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests handled.", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route"),
+)
+HTTP_REQUESTS_IN_PROGRESS = registry.gauge(
+    "http_requests_in_progress", "HTTP requests being handled.", ("method",)
+)
+DB_QUERIES = registry.counter(
+    "db_queries_total", "SQL statements executed.", ("database",)
+)
+DB_QUERY_DURATION = registry.histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time.",
+    ("database",),
+    DB_BUCKETS,
+)
+DB_POOL_CHECKOUT = registry.histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a pooled connection.",
+    ("database",),
+    DB_BUCKETS,
+)
+ORDER_WRITE_CONFLICTS = registry.counter(
+    "order_write_conflicts_total",
+    "Order writes that lost a database lock race "
+    "(SQLite busy/locked, Postgres 40001/40P01).",
+    ("outcome",),
+)
+AUTH_RATE_LIMITED = registry.counter(
+    "auth_rate_limited_total",
+    "Authentication requests rejected with 429.",
+    ("scope",),
+)
+OUTBOX_DELIVERY_LAG = registry.histogram(
+    "outbox_delivery_lag_seconds",
+    "Time from an order event's commit to its delivery to every sink.",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+PASSWORD_HASH_DURATION = registry.histogram(
+    "password_hash_duration_seconds",
+    "bcrypt hash/verify time, queueing included.",
+    ("operation",),
+)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, status and in-flight requests.
+
+    Requests are labelled with the route template (``/orders/order/{order_id}``)
+    that Starlette stores in the scope while routing, so the number of series
+    stays bounded; anything that matched no route is grouped as ``unmatched``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.labels(method, route).observe(elapsed)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+
+
+def instrument_engine(engine, database):
+    """Record query count/time and pool checkout waits of a sync ``engine``."""
+    queries = DB_QUERIES.labels(database)
+    duration = DB_QUERY_DURATION.labels(database)
+    checkout = DB_POOL_CHECKOUT.labels(database)
+
+    # o início fica no contexto da execução: uma query que falha não deixa lixo
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        duration.observe(time.perf_counter() - context._metrics_started)
+        queries.inc()
+
+    # o pool não tem evento de "antes do checkout": mede em volta de
+    # raw_connection, por onde toda Connection (sync ou async) pega a sua
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection():
+        started = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            checkout.observe(time.perf_counter() - started)
+
+    engine.raw_connection = timed_raw_connection
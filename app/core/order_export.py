@@ -0,0 +1,137 @@
+import csv
+import io
+
+import orjson
+from sqlalchemy import select
+
+from app.models.tables import Order, OrderItem
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+# mesmas colunas da importação, mais id, preço e data do pedido
+CSV_EXPORT_COLUMNS = (
+    "order_ref",
+    "user_id",
+    "status",
+    "quantity",
+    "flavor",
+    "size",
+    "unit_price",
+    "item_id",
+    "order_price",
+    "created_at",
+)
+
+
+def export_query(
+    status=None,
+    user_id=None,
+    created_from=None,
+    created_to=None,
+    min_id=None,
+    max_id=None,
+):
+    # uma linha por item (pedidos sem itens vêm com as colunas do item nulas),
+    # em ordem de pedido para agrupar sem guardar nada além do pedido atual
+    query = (
+        select(
+            Order.id,
+            Order.user_id,
+            Order.status,
+            Order.price_cents,
+            Order.created_at,
+            OrderItem.id.label("item_id"),
+            OrderItem.quantity,
+            OrderItem.flavor,
+            OrderItem.size,
+            OrderItem.unit_price_cents,
+        )
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .order_by(Order.id, OrderItem.id)
+    )
+    if status is not None:
+        query = query.where(Order.status == status)
+    if user_id is not None:
+        query = query.where(Order.user_id == user_id)
+    if created_from is not None:
+        query = query.where(Order.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(Order.created_at < created_to)
+    if min_id is not None:
+        query = query.where(Order.id >= min_id)
+    if max_id is not None:
+        query = query.where(Order.id <= max_id)
+    return query
+
+
+async def stream_rows(session_factory, query, batch_size=1000):
+    # a session é da resposta, não da requisição: fica aberta enquanto o
+    # corpo é enviado e o cursor entrega batch_size linhas por vez
+    async with session_factory() as session:
+        result = await session.stream(query.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield rows
+
+
+def item_dict(row):
+    return {
+        "id": row.item_id,
+        "quantity": row.quantity,
+        "flavor": row.flavor,
+        "size": row.size,
+        "unit_price": row.unit_price_cents / 100,
+    }
+
+
+async def ndjson_export(partitions):
+    """One order per line, with its items nested (the import format plus ids)."""
+    current = None
+    async for rows in partitions:
+        lines = []
+        for row in rows:
+            if current is None or current["id"] != row.id:
+                if current is not None:
+                    lines.append(orjson.dumps(current))
+                current = {
+                    "id": row.id,
+                    "user_id": row.user_id,
+                    "status": row.status,
+                    "price": row.price_cents / 100,
+                    "created_at": row.created_at,
+                    "items": [],
+                }
+            if row.item_id is not None:
+                current["items"].append(item_dict(row))
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+    if current is not None:
+        yield orjson.dumps(current) + b"\n"
+
+
+async def csv_export(partitions):
+    """One item per row; orders without items get empty item columns."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_EXPORT_COLUMNS)
+    yield buffer.getvalue().encode()
+    async for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (
+                row.id,
+                row.user_id,
+                row.status,
+                row.quantity,
+                row.flavor,
+                row.size,
+                None if row.unit_price_cents is None else row.unit_price_cents / 100,
+                row.item_id,
+                row.price_cents / 100,
+                row.created_at.isoformat(),
+            )
+            for row in rows
+        )
+        yield buffer.getvalue().encode()
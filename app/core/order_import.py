@@ -0,0 +1,273 @@
+import codecs
+import csv
+import heapq
+import time
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.outbox import event_row, record_events
+from app.core.rollups import record_orders_created
+from app.models.tables import Order, OrderItem, User, to_cents, utcnow
+from scheme import ImportOrderSchema
+
+# só as primeiras falhas vão no relatório; o total continua sendo contado
+MAX_REPORTED_ERRORS = 100
+CSV_ORDER_COLUMNS = ("order_ref", "user_id")
+CSV_ITEM_COLUMNS = ("quantity", "flavor", "size", "unit_price")
+ITEM_COPY_COLUMNS = ("quantity", "flavor", "size", "unit_price_cents", "order_id")
+
+
+async def iter_lines(chunks, encoding="utf-8"):
+    # pedaços de bytes -> linhas de texto, sem juntar o arquivo inteiro
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def error_message(error):
+    return "; ".join(
+        (
+            ".".join(str(part) for part in detail["loc"]) + f": {detail['msg']}"
+            if detail["loc"]
+            else detail["msg"]
+        )
+        for detail in error.errors()
+    )
+
+
+def validate_order(line, data):
+    try:
+        return line, ImportOrderSchema.model_validate(data)
+    except ValidationError as error:
+        return line, error_message(error)
+
+
+async def ndjson_rows(lines):
+    """One order per line: ``{"user_id": 1, "status": "...", "items": [...]}``."""
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_no, ImportOrderSchema.model_validate_json(line)
+        except ValidationError as error:
+            yield line_no, error_message(error)
+
+
+async def csv_rows(lines):
+    """
+    One item per row, under a header with ``order_ref,user_id,status`` and the
+    item columns. Consecutive rows with the same ``order_ref`` are one order;
+    a row with an empty ``flavor`` is an order without items. Fields cannot
+    span lines.
+    """
+    header = None
+    current = None
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        (fields,) = csv.reader([line])
+        if header is None:
+            header = [field.strip() for field in fields]
+            missing = set(CSV_ORDER_COLUMNS + CSV_ITEM_COLUMNS) - set(header)
+            if missing:
+                yield line_no, f"missing columns: {', '.join(sorted(missing))}"
+                return
+            continue
+
+        row = dict(zip(header, fields))
+        if current is not None and row.get("order_ref") != current[1]:
+            yield validate_order(current[0], current[2])
+            current = None
+        if current is None:
+            order = {"user_id": row.get("user_id"), "items": []}
+            if row.get("status"):
+                order["status"] = row["status"]
+            current = (line_no, row.get("order_ref"), order)
+        if row.get("flavor"):
+            current[2]["items"].append(
+                {column: row.get(column) for column in CSV_ITEM_COLUMNS}
+            )
+    if current is not None:
+        yield validate_order(current[0], current[2])
+
+
+def record_error(report, line, error):
+    # as falhas de um lote só chegam quando ele é gravado, depois das de
+    # validação das linhas seguintes: guarda as de menor linha num heap
+    # (linha negativa no topo) e ordena no fim
+    report["errors"] += 1
+    samples = report["error_samples"]
+    heapq.heappush(samples, (-line, error))
+    if len(samples) > MAX_REPORTED_ERRORS:
+        heapq.heappop(samples)
+
+
+async def insert_items(session, item_rows):
+    connection = await session.connection()
+    if connection.dialect.name == "postgresql":
+        # COPY: bem mais rápido que INSERT para lotes grandes no Postgres
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            OrderItem.__tablename__,
+            records=[
+                tuple(row[column] for column in ITEM_COPY_COLUMNS) for row in item_rows
+            ],
+            columns=ITEM_COPY_COLUMNS,
+        )
+    else:
+        await session.execute(insert(OrderItem.__table__), item_rows)
+
+
+async def insert_chunk(session, chunk, report):
+    user_ids = {order.user_id for _, order in chunk}
+    known = set(await session.scalars(select(User.id).where(User.id.in_(user_ids))))
+    valid = []
+    for line, order in chunk:
+        if order.user_id in known:
+            valid.append((line, order))
+        else:
+            record_error(report, line, f"user {order.user_id} does not exist")
+    if not valid:
+        return
+
+    created_at = utcnow()
+    order_rows = [
+        {
+            "user_id": order.user_id,
+            "status": order.status,
+            "price_cents": sum(
+                item.quantity * to_cents(item.unit_price) for item in order.items
+            ),
+            "version": 1,
+            "created_at": created_at,
+        }
+        for _, order in valid
+    ]
+    try:
+        # um INSERT de várias linhas com RETURNING, ids na ordem dos parâmetros
+        order_ids = (
+            (
+                await session.execute(
+                    insert(Order.__table__).returning(
+                        Order.__table__.c.id, sort_by_parameter_order=True
+                    ),
+                    order_rows,
+                )
+            )
+            .scalars()
+            .all()
+        )
+        item_rows = [
+            {
+                "quantity": item.quantity,
+                "flavor": item.flavor,
+                "size": item.size,
+                "unit_price_cents": to_cents(item.unit_price),
+                "order_id": order_id,
+            }
+            for order_id, (_, order) in zip(order_ids, valid)
+            for item in order.items
+        ]
+        if item_rows:
+            await insert_items(session, item_rows)
+        await record_orders_created(
+            session,
+            [
+                (
+                    created_at,
+                    row["status"],
+                    row["price_cents"],
+                    [
+                        (
+                            item.flavor,
+                            item.size,
+                            item.quantity,
+                            to_cents(item.unit_price),
+                        )
+                        for item in order.items
+                    ],
+                )
+                for row, (_, order) in zip(order_rows, valid)
+            ],
+        )
+        # os itens vão por COPY/executemany, sem ids de volta; só pelo outbox
+        await record_events(
+            session,
+            [
+                event_row(
+                    "order.imported",
+                    order_id,
+                    row["user_id"],
+                    row["status"],
+                    row["price_cents"],
+                    row["version"],
+                    items=[item.model_dump() for item in order.items],
+                )
+                for order_id, row, (_, order) in zip(order_ids, order_rows, valid)
+            ],
+            # lotes de milhares de pedidos derrubariam os assinantes ao vivo
+            live=False,
+        )
+        await session.commit()
+    except SQLAlchemyError as error:
+        # o lote inteiro volta atrás, os anteriores já estão gravados
+        await session.rollback()
+        message = str(getattr(error, "orig", None) or error)
+        for line, _ in valid:
+            record_error(report, line, message)
+        return
+    report["orders"] += len(valid)
+    report["items"] += len(item_rows)
+
+
+async def import_orders(session, rows, chunk_size=1000):
+    """
+    Insert ``(line, ImportOrderSchema | error message)`` rows in chunks.
+
+    Each chunk is validated against the existing users, written with one
+    multi-row INSERT for the orders and one for their items (COPY on
+    Postgres) and committed on its own, so a bad row or a failed chunk never
+    aborts the rest of the import. Only ``chunk_size`` orders are held in
+    memory at a time.
+    """
+    report = {
+        "rows": 0,
+        "orders": 0,
+        "items": 0,
+        "errors": 0,
+        "error_samples": [],
+    }
+    started = time.perf_counter()
+    chunk = []
+    async for line, order in rows:
+        report["rows"] += 1
+        if isinstance(order, str):
+            record_error(report, line, order)
+            continue
+        chunk.append((line, order))
+        if len(chunk) >= chunk_size:
+            await insert_chunk(session, chunk, report)
+            chunk = []
+    if chunk:
+        await insert_chunk(session, chunk, report)
+
+    report["error_samples"] = [
+        {"line": -line, "error": error}
+        for line, error in sorted(report["error_samples"], reverse=True)
+    ]
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    report["rows_per_second"] = round(report["rows"] / max(report["seconds"], 0.001), 1)
+    return report
@@ -0,0 +1,360 @@
+import asyncio
+import contextlib
+import logging
+import os
+
+import orjson
+import requests
+from sqlalchemy import delete, insert, select, update
+
+from app.core.config import OUTBOX_ENABLED
+from app.core.metrics import OUTBOX_DELIVERY_LAG
+from app.models.tables import OutboxEvent, utcnow
+
+logger = logging.getLogger("app.outbox")
+
+# mensagens dos eventos gravados pela session, entregues ao vivo depois do commit
+PENDING_EVENTS = "outbox_pending"
+
+
+def event_row(event_type, order_id, user_id, status, price_cents, version, **data):
+    return {
+        "event_type": event_type,
+        "order_id": order_id,
+        "payload": {
+            "order_id": order_id,
+            "user_id": user_id,
+            "status": status,
+            "price": price_cents / 100,
+            "version": version,
+            **data,
+        },
+    }
+
+
+def item_event_data(items):
+    return [
+        {
+            "id": item.id,
+            "quantity": item.quantity,
+            "flavor": item.flavor,
+            "size": item.size,
+            "unit_price": item.unit_price_cents / 100,
+        }
+        for item in items
+    ]
+
+
+async def record_events(session, rows, live=True):
+    """
+    Add ``event_row`` rows to the outbox, in the caller's transaction.
+
+    With ``live`` their messages are also kept on the session until
+    ``pop_pending_events`` takes them, after the commit. Without sinks
+    (``OUTBOX_SINKS`` empty) only the live messages are kept.
+    """
+    if not rows:
+        return
+    created_at = utcnow()
+    if OUTBOX_ENABLED:
+        await session.execute(
+            insert(OutboxEvent.__table__),
+            [
+                {
+                    **row,
+                    "payload": orjson.dumps(row["payload"]).decode(),
+                    "created_at": created_at,
+                }
+                for row in rows
+            ],
+        )
+    if live:
+        occurred_at = created_at.isoformat()
+        session.info.setdefault(PENDING_EVENTS, []).extend(
+            {"type": row["event_type"], "occurred_at": occurred_at, **row["payload"]}
+            for row in rows
+        )
+
+
+def pop_pending_events(session):
+    # chamado no after_commit e no after_rollback: nada passa para a próxima
+    # transação da mesma session
+    return session.info.pop(PENDING_EVENTS, None)
+
+
+async def record_order_event(session, event_type, order, **data):
+    await record_events(
+        session,
+        [
+            event_row(
+                event_type,
+                order.id,
+                order.user_id,
+                order.status,
+                order.price_cents,
+                order.version,
+                **data,
+            )
+        ],
+    )
+
+
+def event_message(row):
+    return {
+        "id": row.id,
+        "type": row.event_type,
+        "occurred_at": row.created_at.isoformat(),
+        **orjson.loads(row.payload),
+    }
+
+
+class SinkFull(Exception):
+    """A sink cannot take the batch right now; the dispatcher backs off."""
+
+
+class QueueSink:
+    """
+    In-process fan-out: each subscriber gets its own bounded ``asyncio.Queue``.
+
+    A batch is only enqueued when every subscriber has room for all of it,
+    otherwise ``SinkFull`` is raised and nothing is enqueued, so a slow
+    consumer holds the dispatcher back instead of losing events. With no
+    subscribers the batch is dropped.
+    """
+
+    name = "queue"
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self.subscribers = set()
+
+    def subscribe(self, maxsize=None):
+        queue = asyncio.Queue(maxsize or self.maxsize)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    async def send(self, events):
+        for queue in self.subscribers:
+            if queue.maxsize - queue.qsize() < len(events):
+                raise SinkFull(f"subscriber queue has {queue.qsize()} events")
+        for queue in self.subscribers:
+            for message in events:
+                queue.put_nowait(message)
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    """Appends each event as one NDJSON line."""
+
+    name = "file"
+
+    def __init__(self, path):
+        self.path = path
+
+    def _write(self, events):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "ab") as file:
+            file.write(b"".join(orjson.dumps(message) + b"\n" for message in events))
+
+    async def send(self, events):
+        await asyncio.to_thread(self._write, events)
+
+    def close(self):
+        pass
+
+
+class WebhookSink:
+    """POSTs each batch as a JSON array; any non-2xx answer is a failure."""
+
+    name = "webhook"
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+        self.http = requests.Session()
+
+    def _post(self, body):
+        response = self.http.post(
+            self.url,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+
+    async def send(self, events):
+        await asyncio.to_thread(self._post, orjson.dumps(events))
+
+    def close(self):
+        self.http.close()
+
+
+def make_sinks(names, queue_size, file_path, webhook_url, webhook_timeout):
+    sinks = []
+    for name in filter(None, (name.strip() for name in names.split(","))):
+        if name == "queue":
+            sinks.append(QueueSink(queue_size))
+        elif name == "file":
+            sinks.append(FileSink(file_path))
+        elif name == "webhook":
+            if not webhook_url:
+                raise ValueError("OUTBOX_WEBHOOK_URL is required for the webhook sink")
+            sinks.append(WebhookSink(webhook_url, webhook_timeout))
+        else:
+            raise ValueError(f"Unknown outbox sink: {name!r}")
+    return sinks
+
+
+class OutboxDispatcher:
+    """
+    Background task draining ``outbox_events`` in id order to every sink.
+
+    Each batch of up to ``batch_size`` events goes to the sinks one after
+    the other and is deleted only after all of them took it, so delivery is
+    at least once (consumers dedupe on the event id). A failed batch stays at
+    the head of the outbox and is retried with exponential backoff, which
+    keeps a single dispatcher's events in order; after ``max_attempts`` its
+    events are marked failed and skipped. Between batches it sleeps
+    ``poll_interval`` unless ``notify`` (called when a commit wrote events)
+    wakes it up. Workers on Postgres each lock a different batch, so across
+    workers only the event id tells the order.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        sinks,
+        batch_size=100,
+        poll_interval=1.0,
+        max_attempts=10,
+        retry_base=0.5,
+        retry_max=60.0,
+        enabled=True,
+    ):
+        self.session_factory = session_factory
+        self.sinks = sinks
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.enabled = enabled
+        self._task = None
+        self._wake = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.delivered = {sink.name: 0 for sink in self.sinks}
+        self.failures = {sink.name: 0 for sink in self.sinks}
+        self.dead = 0
+        self.lag_seconds = 0.0
+
+    def sink(self, name):
+        return next((sink for sink in self.sinks if sink.name == name), None)
+
+    def backoff(self, failures):
+        return min(self.retry_max, self.retry_base * 2 ** (failures - 1))
+
+    def notify(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def dispatch_batch(self):
+        """Deliver the oldest pending batch; returns its size, raises if a sink failed."""
+        async with self.session_factory() as session:
+            # SKIP LOCKED: no Postgres cada worker pega um lote diferente
+            rows = list(
+                await session.scalars(
+                    select(OutboxEvent)
+                    .where(OutboxEvent.failed_at.is_(None))
+                    .order_by(OutboxEvent.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+            )
+            now = utcnow()
+            if not rows:
+                self.lag_seconds = 0.0
+                return 0
+            self.lag_seconds = (now - rows[0].created_at).total_seconds()
+            ids = [row.id for row in rows]
+            events = [event_message(row) for row in rows]
+            for sink in self.sinks:
+                try:
+                    await sink.send(events)
+                except Exception as error:
+                    self.failures[sink.name] += 1
+                    await self._record_failure(session, ids, sink, error, now)
+                    raise
+                self.delivered[sink.name] += len(events)
+
+            await session.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids)))
+            await session.commit()
+            for row in rows:
+                OUTBOX_DELIVERY_LAG.observe((now - row.created_at).total_seconds())
+            return len(rows)
+
+    async def _record_failure(self, session, ids, sink, error, now):
+        await session.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(ids))
+            .values(
+                attempts=OutboxEvent.attempts + 1,
+                last_error=f"{sink.name}: {error}"[:500],
+            )
+        )
+        exhausted = await session.execute(
+            update(OutboxEvent)
+            .where(
+                OutboxEvent.id.in_(ids),
+                OutboxEvent.attempts >= self.max_attempts,
+            )
+            .values(failed_at=now)
+        )
+        self.dead += exhausted.rowcount
+        await session.commit()
+
+    async def run(self):
+        failures = 0
+        while True:
+            self._wake.clear()
+            try:
+                delivered = await self.dispatch_batch()
+            except Exception:
+                failures += 1
+                logger.warning(
+                    "Falha ao entregar eventos do outbox (tentativa %d)",
+                    failures,
+                    exc_info=True,
+                )
+                await asyncio.sleep(self.backoff(failures))
+                continue
+            failures = 0
+            # lote cheio: ainda há fila, segue sem esperar
+            if delivered < self.batch_size:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+
+    async def start(self):
+        if not self.enabled or not self.sinks or self._task is not None:
+            return
+        # o Event fica preso ao loop em que é usado: um por start
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = self._wake = None
+        for sink in self.sinks:
+            sink.close()
@@ -0,0 +1,135 @@
+import logging
+import re
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import QUERY_PROFILER_N_PLUS_ONE
+
+logger = logging.getLogger("app.profiler")
+
+_PARAMETERS = re.compile(r"\$\d+|%\(\w+\)s|%s|:\w+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement):
+    """Return ``statement`` with parameters and literals replaced by ``?``."""
+    statement = _PARAMETERS.sub("?", statement)
+    statement = _LITERALS.sub("?", statement)
+    # "IN (?, ?, ?)" de um selectinload vira "IN (?)" qualquer que seja o tamanho
+    statement = _PLACEHOLDER_LISTS.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class QueryProfile:
+    """Statements seen while the profile is active, grouped by their shape."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = defaultdict(lambda: [0, 0.0])
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        entry = self.statements[normalize_statement(statement)]
+        entry[0] += 1
+        entry[1] += seconds
+
+    def repeated(self, threshold=QUERY_PROFILER_N_PLUS_ONE):
+        """Statements run at least ``threshold`` times, most repeated first."""
+        found = [
+            (statement, count, seconds)
+            for statement, (count, seconds) in self.statements.items()
+            if count >= threshold
+        ]
+        return sorted(found, key=lambda entry: entry[1], reverse=True)
+
+
+current_profile = ContextVar("current_query_profile", default=None)
+
+
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        context._profiler_started = time.perf_counter()
+
+
+def _record(conn, cursor, statement, parameters, context, executemany):
+    # o SQLAlchemy copia o contexto para o greenlet do AsyncSession,
+    # então a profile da requisição é visível aqui também
+    profile = current_profile.get()
+    if profile is not None:
+        profile.record(statement, time.perf_counter() - context._profiler_started)
+
+
+def enable_query_profiler():
+    """Listen on every engine; statements outside a profile cost one lookup."""
+    if not event.contains(Engine, "after_cursor_execute", _record):
+        event.listen(Engine, "before_cursor_execute", _start_timer)
+        event.listen(Engine, "after_cursor_execute", _record)
+
+
+class QueryProfilerMiddleware:
+    """
+    Pure ASGI middleware that profiles the SQL run by each request.
+
+    Adds ``X-Query-Count`` and ``X-DB-Time`` to the response and logs a
+    warning naming the route when one statement shape repeats at least
+    ``n_plus_one`` times, the usual sign of a lazy load inside a loop.
+    """
+
+    def __init__(self, app, n_plus_one=QUERY_PROFILER_N_PLUS_ONE):
+        self.app = app
+        self.n_plus_one = n_plus_one
+        enable_query_profiler()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = current_profile.set(profile)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(profile.count).encode()))
+                headers.append(
+                    (b"x-db-time", f"{profile.seconds * 1000:.3f}ms".encode())
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_profile.reset(token)
+            self.report(scope, profile)
+
+    def report(self, scope, profile):
+        route = scope.get("route")
+        name = getattr(route, "name", None) or scope["path"]
+        path = getattr(route, "path", scope["path"])
+        for statement, count, seconds in profile.repeated(self.n_plus_one):
+            logger.warning(
+                "N+1 suspect in %s (%s %s): %d x %.1fms %s",
+                name,
+                scope["method"],
+                path,
+                count,
+                seconds * 1000,
+                statement,
+            )
+        logger.debug(
+            "%s %s: %d queries in %.1fms",
+            scope["method"],
+            path,
+            profile.count,
+            profile.seconds * 1000,
+        )
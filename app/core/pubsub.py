@@ -0,0 +1,142 @@
+import asyncio
+from collections import deque
+
+
+class SubscriptionClosed(Exception):
+    """
+    The subscription ended: ``dropped`` (slow consumer), ``closed`` (shutdown)
+    or ``disconnected`` (the client went away).
+    """
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Subscription:
+    """
+    Mailbox of one streaming connection, bounded to ``maxsize`` messages.
+
+    Idle it is a deque and a few slots; a future exists only while the
+    connection is waiting for the next message.
+    """
+
+    __slots__ = (
+        "user_id",
+        "admin",
+        "order_id",
+        "maxsize",
+        "messages",
+        "waiter",
+        "reason",
+    )
+
+    def __init__(self, user_id, admin, order_id, maxsize):
+        self.user_id = user_id
+        self.admin = admin
+        self.order_id = order_id
+        self.maxsize = maxsize
+        self.messages = deque()
+        self.waiter = None
+        self.reason = None
+
+    def wants(self, message):
+        return self.order_id is None or message["order_id"] == self.order_id
+
+    def push(self, message):
+        if len(self.messages) >= self.maxsize:
+            return False
+        self.messages.append(message)
+        self.wake()
+        return True
+
+    def wake(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def get(self, timeout=None):
+        """Next message, ``None`` after ``timeout`` seconds without one."""
+        while not self.messages:
+            if self.reason is not None:
+                raise SubscriptionClosed(self.reason)
+            self.waiter = asyncio.get_running_loop().create_future()
+            try:
+                async with asyncio.timeout(timeout):
+                    await self.waiter
+            except TimeoutError:
+                return None
+            finally:
+                self.waiter = None
+        if self.reason == "dropped":
+            raise SubscriptionClosed(self.reason)
+        return self.messages.popleft()
+
+
+class OrderBroker:
+    """
+    In-process fan-out of order updates to the streaming connections.
+
+    A message goes to the subscriptions of the order's owner and to the
+    admin subscriptions, never to a scan of every connection. Publishing
+    never waits: a subscriber whose mailbox is full is dropped (its
+    connection is closed and the client resyncs on reconnect) so one slow
+    consumer cannot hold back the others or grow memory. Only the worker's
+    own connections are reached.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self.by_user = {}
+        self.admins = set()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.admins) + sum(len(subs) for subs in self.by_user.values())
+
+    def subscribe(self, user_id, admin=False, order_id=None, maxsize=None):
+        subscription = Subscription(
+            user_id, admin, order_id, maxsize or self.queue_size
+        )
+        if admin:
+            self.admins.add(subscription)
+        else:
+            self.by_user.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        if subscription.admin:
+            self.admins.discard(subscription)
+            return
+        subscriptions = self.by_user.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.by_user[subscription.user_id]
+
+    def release(self, subscription, reason="disconnected"):
+        self.unsubscribe(subscription)
+        subscription.reason = reason
+        subscription.wake()
+
+    def publish(self, message):
+        self.published += 1
+        # cópia: quem estoura a fila sai do conjunto durante o laço
+        targets = [*self.by_user.get(message["user_id"], ()), *self.admins]
+        for subscription in targets:
+            if not subscription.wants(message):
+                continue
+            if subscription.push(message):
+                self.delivered += 1
+            else:
+                self.dropped += 1
+                self.release(subscription, "dropped")
+
+    def close(self):
+        """Wake every connection so it ends (on shutdown)."""
+        subscriptions = [*self.admins]
+        for user_subscriptions in self.by_user.values():
+            subscriptions.extend(user_subscriptions)
+        for subscription in subscriptions:
+            self.release(subscription, "closed")
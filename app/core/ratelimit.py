@@ -0,0 +1,168 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def take_token(tokens, updated_at, rate, capacity, now):
+    """
+    Refill a token bucket up to ``now`` and try to take one token from it.
+
+    Returns ``(tokens, full_at, retry_after)``: the tokens left, when the
+    bucket will be full again (after that its state is redundant and can be
+    dropped) and how long the caller has to wait, ``0.0`` if it was let in.
+    """
+    tokens = min(capacity, tokens + (now - updated_at) * rate)
+    retry_after = 0.0
+    if tokens >= 1:
+        tokens -= 1
+    else:
+        retry_after = (1 - tokens) / rate
+    return tokens, now + (capacity - tokens) / rate, retry_after
+
+
+class MemoryRateLimitBackend:
+    """
+    Token buckets kept in the worker's memory: ``(tokens, updated_at)`` per key.
+
+    At most ``maxsize`` keys are kept; buckets that are full again are dropped
+    as they are found and, past the limit, the least recently used one goes
+    first. Each worker enforces its own limit.
+    """
+
+    def __init__(self, maxsize=100000, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.timer = timer
+        self._buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    async def take(self, key, rate, capacity):
+        now = self.timer()
+        tokens, updated_at, full_at = self._buckets.pop(key, (capacity, now, now))
+        tokens, full_at, retry_after = take_token(
+            tokens, updated_at, rate, capacity, now
+        )
+        self._buckets[key] = (tokens, now, full_at)
+        # o mais antigo no LRU é o candidato natural a já estar cheio
+        while len(self._buckets) > 1:
+            oldest, (_, _, oldest_full_at) = next(iter(self._buckets.items()))
+            if oldest_full_at > now and len(self._buckets) <= self.maxsize:
+                break
+            del self._buckets[oldest]
+        return retry_after
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class SQLiteRateLimitBackend:
+    """
+    Token buckets in a SQLite file, so every worker on the host shares one limit.
+
+    Each ``take`` is one ``BEGIN IMMEDIATE`` transaction (read, refill,
+    write) run in a thread; rows of buckets that are full again are purged
+    every ``purge_every`` calls.
+    """
+
+    def __init__(self, path, purge_every=1000, timeout=5.0, timer=time.time):
+        self.path = path
+        self.purge_every = purge_every
+        self.timeout = timeout
+        self.timer = timer
+        self._calls = 0
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+                "updated_at REAL NOT NULL, full_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_rate_limit_buckets_full_at "
+                "ON rate_limit_buckets (full_at)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _take(self, key, rate, capacity, purge):
+        conn = self._connect()
+        now = self.timer()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?",
+                (key,),
+            ).fetchone()
+            tokens, updated_at = row or (capacity, now)
+            tokens, full_at, retry_after = take_token(
+                tokens, updated_at, rate, capacity, now
+            )
+            conn.execute(
+                "INSERT INTO rate_limit_buckets (key, tokens, updated_at, full_at) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                "tokens = excluded.tokens, updated_at = excluded.updated_at, "
+                "full_at = excluded.full_at",
+                (key, tokens, now, full_at),
+            )
+            if purge:
+                conn.execute(
+                    "DELETE FROM rate_limit_buckets WHERE full_at <= ?", (now,)
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return retry_after
+
+    async def take(self, key, rate, capacity):
+        self._calls += 1
+        purge = self._calls % self.purge_every == 0
+        return await asyncio.to_thread(self._take, key, rate, capacity, purge)
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM rate_limit_buckets")
+
+
+def make_backend(kind, sqlite_path, maxsize):
+    if kind == "memory":
+        return MemoryRateLimitBackend(maxsize=maxsize)
+    if kind == "sqlite":
+        return SQLiteRateLimitBackend(sqlite_path)
+    raise ValueError(f"Unknown rate limit backend: {kind!r}")
+
+
+class RateLimiter:
+    """
+    ``per_minute`` requests per key with bursts of up to ``burst``.
+
+    ``hit(key)`` returns how many seconds the caller must wait, ``0.0`` when
+    it may go on. A ``per_minute`` of 0 disables the limiter.
+    """
+
+    def __init__(self, backend, scope, per_minute, burst):
+        self.backend = backend
+        self.scope = scope
+        self.per_minute = per_minute
+        self.burst = burst
+
+    async def hit(self, key):
+        if self.per_minute <= 0:
+            return 0.0
+        return await self.backend.take(
+            f"{self.scope}:{key}", self.per_minute / 60, max(self.burst, 1)
+        )
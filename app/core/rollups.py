@@ -0,0 +1,242 @@
+from sqlalchemy import Date, delete, func, insert, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models.tables import DailyItemStats, DailyOrderStats, Order, OrderItem
+
+SOLD_STATUS = "FINISHED"
+
+
+async def upsert_dialect(session):
+    connection = await session.connection()
+    return postgresql if connection.dialect.name == "postgresql" else sqlite
+
+
+def add_on_conflict(statement, table, keys, counters):
+    # soma os contadores na linha existente em vez de falhar no conflito
+    return statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={
+            column: getattr(table, column) + getattr(statement.excluded, column)
+            for column in counters
+        },
+    )
+
+
+async def bump_order_stats(session, deltas):
+    """``deltas``: ``{(day, status): (orders, revenue_cents)}``, applied in one statement."""
+    rows = [
+        {"day": day, "status": status, "orders": orders, "revenue_cents": revenue}
+        for (day, status), (orders, revenue) in deltas.items()
+        if orders or revenue
+    ]
+    if not rows:
+        return
+    dialect = await upsert_dialect(session)
+    statement = add_on_conflict(
+        dialect.insert(DailyOrderStats),
+        DailyOrderStats,
+        ["day", "status"],
+        ["orders", "revenue_cents"],
+    )
+    await session.execute(statement, rows)
+
+
+async def bump_item_stats(session, deltas):
+    """``deltas``: ``{(day, flavor, size): (quantity, revenue_cents)}``."""
+    rows = [
+        {
+            "day": day,
+            "flavor": flavor,
+            "size": size or "",
+            "quantity": quantity,
+            "revenue_cents": revenue,
+        }
+        for (day, flavor, size), (quantity, revenue) in deltas.items()
+        if quantity or revenue
+    ]
+    if not rows:
+        return
+    dialect = await upsert_dialect(session)
+    statement = add_on_conflict(
+        dialect.insert(DailyItemStats),
+        DailyItemStats,
+        ["day", "flavor", "size"],
+        ["quantity", "revenue_cents"],
+    )
+    await session.execute(statement, rows)
+
+
+def item_values(items):
+    # OrderItem -> (flavor, size, quantity, unit_price_cents)
+    return [
+        (item.flavor, item.size, item.quantity, item.unit_price_cents) for item in items
+    ]
+
+
+def item_deltas(day, items, sign=1, deltas=None):
+    """Sum ``(flavor, size, quantity, unit_price_cents)`` items into ``deltas``."""
+    deltas = {} if deltas is None else deltas
+    for flavor, size, quantity, unit_price_cents in items:
+        key = (day, flavor, size)
+        sold, revenue = deltas.get(key, (0, 0))
+        deltas[key] = (
+            sold + sign * quantity,
+            revenue + sign * quantity * unit_price_cents,
+        )
+    return deltas
+
+
+async def record_orders_created(session, orders):
+    """
+    New orders enter the rollups of their day.
+
+    ``orders``: ``(created_at, status, price_cents, items)`` with items as
+    ``(flavor, size, quantity, unit_price_cents)``; only the items of
+    orders created as FINISHED count as sold.
+    """
+    order_deltas = {}
+    sold = {}
+    for created_at, status, price_cents, items in orders:
+        key = (created_at.date(), status)
+        count, revenue = order_deltas.get(key, (0, 0))
+        order_deltas[key] = (count + 1, revenue + price_cents)
+        if status == SOLD_STATUS:
+            item_deltas(created_at.date(), items, deltas=sold)
+    await bump_order_stats(session, order_deltas)
+    await bump_item_stats(session, sold)
+
+
+async def record_items_changed(session, created_at, status, items, sign=1):
+    """OrderItems added (``sign=1``) to or removed (``-1``) from one order."""
+    day = created_at.date()
+    values = item_values(items)
+    revenue = sign * sum(quantity * price for _, _, quantity, price in values)
+    await bump_order_stats(session, {(day, status): (0, revenue)})
+    if status == SOLD_STATUS:
+        await bump_item_stats(session, item_deltas(day, values, sign))
+
+
+async def record_status_change(session, order, old_status):
+    """Move an order between status buckets; finishing it counts its items as sold."""
+    day = order.created_at.date()
+    await bump_order_stats(
+        session,
+        {
+            (day, old_status): (-1, -order.price_cents),
+            (day, order.status): (1, order.price_cents),
+        },
+    )
+    if order.status == SOLD_STATUS:
+        # os itens são somados no próprio banco, sem carregá-los
+        dialect = await upsert_dialect(session)
+        size = func.coalesce(OrderItem.size, "")
+        sold = (
+            select(
+                literal(day, Date),
+                OrderItem.flavor,
+                size,
+                func.sum(OrderItem.quantity),
+                func.sum(OrderItem.quantity * OrderItem.unit_price_cents),
+            )
+            .where(OrderItem.order_id == order.id)
+            .group_by(OrderItem.flavor, size)
+        )
+        statement = add_on_conflict(
+            dialect.insert(DailyItemStats).from_select(
+                ["day", "flavor", "size", "quantity", "revenue_cents"], sold
+            ),
+            DailyItemStats,
+            ["day", "flavor", "size"],
+            ["quantity", "revenue_cents"],
+        )
+        await session.execute(statement)
+
+
+async def rebuild_rollups(session):
+    """
+    Recompute both rollup tables from ``orders`` and ``order_items``.
+
+    Runs as one transaction; writes that commit while it runs on a
+    database without serialized writers (Postgres) may be counted twice or
+    missed, so run it when order traffic is quiet.
+    """
+    day = func.date(Order.created_at)
+    size = func.coalesce(OrderItem.size, "")
+    await session.execute(delete(DailyOrderStats))
+    await session.execute(delete(DailyItemStats))
+    await session.execute(
+        insert(DailyOrderStats).from_select(
+            ["day", "status", "orders", "revenue_cents"],
+            select(day, Order.status, func.count(), func.sum(Order.price_cents))
+            .where(Order.status.is_not(None))
+            .group_by(day, Order.status),
+        )
+    )
+    await session.execute(
+        insert(DailyItemStats).from_select(
+            ["day", "flavor", "size", "quantity", "revenue_cents"],
+            select(
+                day,
+                OrderItem.flavor,
+                size,
+                func.sum(OrderItem.quantity),
+                func.sum(OrderItem.quantity * OrderItem.unit_price_cents),
+            )
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(Order.status == SOLD_STATUS)
+            .group_by(day, OrderItem.flavor, size),
+        )
+    )
+    await session.commit()
+
+
+def between_days(query, column, start=None, end=None):
+    # ``end`` inclusivo: o relatório de um dia é start == end
+    if start is not None:
+        query = query.where(column >= start)
+    if end is not None:
+        query = query.where(column <= end)
+    return query
+
+
+async def orders_report(session, start=None, end=None):
+    """Orders and their value per day and status."""
+    query = between_days(
+        select(DailyOrderStats)
+        .where((DailyOrderStats.orders != 0) | (DailyOrderStats.revenue_cents != 0))
+        .order_by(DailyOrderStats.day, DailyOrderStats.status),
+        DailyOrderStats.day,
+        start,
+        end,
+    )
+    return list(await session.scalars(query))
+
+
+async def revenue_report(session, start=None, end=None):
+    """Finished orders and revenue per day."""
+    query = between_days(
+        select(DailyOrderStats)
+        .where(DailyOrderStats.status == SOLD_STATUS, DailyOrderStats.orders != 0)
+        .order_by(DailyOrderStats.day),
+        DailyOrderStats.day,
+        start,
+        end,
+    )
+    return list(await session.scalars(query))
+
+
+async def top_items_report(session, by, limit, start=None, end=None):
+    """Best sellers by ``flavor`` or ``size``: ``(key, quantity, revenue_cents)``."""
+    key = getattr(DailyItemStats, by)
+    quantity = func.sum(DailyItemStats.quantity)
+    query = between_days(
+        select(key, quantity, func.sum(DailyItemStats.revenue_cents))
+        .group_by(key)
+        .having(quantity > 0)
+        .order_by(quantity.desc(), key)
+        .limit(limit),
+        DailyItemStats.day,
+        start,
+        end,
+    )
+    return (await session.execute(query)).all()
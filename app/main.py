@@ -1,33 +1,79 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
-from dotenv import load_dotenv
-import os
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.core.config import METRICS_ENABLED, QUERY_PROFILER_ENABLED
+from app.core.hashing import HashQueueFull
+from app.core.metrics import MetricsMiddleware
+from app.core.profiler import QueryProfilerMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # o schema não é criado aqui: "python -m app.cli init-db" roda uma vez por
+    # deploy, antes dos workers, em vez de cada worker disputar o create_all
+    from app.models.dependencies import (
+        order_broker,
+        outbox_dispatcher,
+        password_hasher,
+    )
 
+    await outbox_dispatcher.start()
+    try:
+        yield
+    finally:
+        order_broker.close()
+        await outbox_dispatcher.stop()
+        password_hasher.shutdown()
 
-load_dotenv()
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
-ACESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
-app = FastAPI()
+async def hash_queue_full_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Authentication is busy, please try again shortly"},
+        headers={"Retry-After": "1"},
+    )
 
 
-@app.on_event("startup")
-def on_startup():
+def create_app():
+    """
+    Build the FastAPI application from the settings in ``app.core.config``.
 
-    os.makedirs("./data", exist_ok=True)
+    The routers, and with them the models, engines and dependencies, are
+    only imported here, so importing ``app.main`` stays cheap.
+    """
+    # orjson serializa as respostas bem mais rápido que o json da stdlib
+    app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+    if METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+    if QUERY_PROFILER_ENABLED:
+        app.add_middleware(QueryProfilerMiddleware)
+    app.add_exception_handler(HashQueueFull, hash_queue_full_handler)
 
-    from app.core.database import criar_bd
+    from routes.auth_routes import auth_router
+    from routes.order_routes import order_import_router, order_router
+    from routes.report_routes import report_router
+    from routes.stream_routes import stream_router
 
-    criar_bd()
+    app.include_router(auth_router)
+    app.include_router(order_router)
+    app.include_router(order_import_router)
+    app.include_router(report_router)
+    app.include_router(stream_router)
 
+    if METRICS_ENABLED:
+        from routes.metrics_routes import metrics_router
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauths2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login-form")
+        app.include_router(metrics_router)
+    return app
 
-from routes.auth_routes import auth_router
-from routes.order_routes import order_router
 
-app.include_router(auth_router)
-app.include_router(order_router)
+def __getattr__(name):
+    # "uvicorn app.main:app" e os testes usam o app do módulo: montado no
+    # primeiro acesso e reaproveitado depois
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
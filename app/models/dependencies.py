@@ -1,29 +1,230 @@
-from app.core.database import SessionLocal
+import hashlib
+import math
+import time
+
+from app.core.cache import TTLCache
+from app.core.hashing import PasswordHasher
+from app.core.database import AsyncSessionLocal, session_router
+from app.core.metrics import AUTH_RATE_LIMITED
+from app.core.idempotency import IdempotencyStore
+from app.core.outbox import OutboxDispatcher, make_sinks, pop_pending_events
+from app.core.pubsub import OrderBroker
+from app.core.ratelimit import RateLimiter, make_backend
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from app.main import SECRET_KEY, ALGORITHM, oauths2_scheme
+from app.core.config import (
+    SIGNING_KEY,
+    ALGORITHM,
+    ACESS_TOKEN_EXPIRE_MINUTES,
+    AUTH_STATELESS_TOKENS,
+    AUTH_TOKEN_CACHE_SIZE,
+    AUTH_USER_CACHE_SIZE,
+    AUTH_USER_CACHE_TTL,
+    AUTH_RATE_LIMIT_EMAIL_BURST,
+    AUTH_RATE_LIMIT_EMAIL_PER_MINUTE,
+    AUTH_RATE_LIMIT_IP_BURST,
+    AUTH_RATE_LIMIT_IP_PER_MINUTE,
+    IDEMPOTENCY_CACHE_SIZE,
+    IDEMPOTENCY_LOCK_SECONDS,
+    IDEMPOTENCY_TTL_SECONDS,
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_DISPATCHER_ENABLED,
+    OUTBOX_FILE_PATH,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_POLL_SECONDS,
+    OUTBOX_QUEUE_SIZE,
+    OUTBOX_RETRY_BASE_SECONDS,
+    OUTBOX_RETRY_MAX_SECONDS,
+    OUTBOX_SINKS,
+    OUTBOX_WEBHOOK_TIMEOUT,
+    OUTBOX_WEBHOOK_URL,
+    PASSWORD_HASH_EXECUTOR,
+    PASSWORD_HASH_QUEUE_SIZE,
+    PASSWORD_HASH_WORKERS,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_SQLITE_PATH,
+    STREAM_QUEUE_SIZE,
+)
 from app.models.tables import User
 
+oauths2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login-form")
+# pool de hashing de senha (bcrypt fora do event loop); sobe no primeiro uso
+password_hasher = PasswordHasher(
+    workers=PASSWORD_HASH_WORKERS,
+    queue_size=PASSWORD_HASH_QUEUE_SIZE,
+    executor=PASSWORD_HASH_EXECUTOR,
+)
 
-def get_session():
-    session = SessionLocal()
-    try:
+# usuários já autenticados, por id; evita um SELECT por requisição
+user_cache = TTLCache(maxsize=AUTH_USER_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL)
+# claims de tokens já verificados, pelo digest do token; cada um vale até o exp
+token_cache = TTLCache(
+    maxsize=AUTH_TOKEN_CACHE_SIZE, ttl=ACESS_TOKEN_EXPIRE_MINUTES * 60
+)
+# tokens resolvidos só pelas claims (hits) ou que caíram no banco (misses)
+stateless_stats = {"hits": 0, "misses": 0}
+# tentativas de autenticação: cada uma custa um bcrypt inteiro
+rate_limit_backend = make_backend(
+    RATE_LIMIT_BACKEND, RATE_LIMIT_SQLITE_PATH, RATE_LIMIT_MAX_KEYS
+)
+ip_rate_limiter = RateLimiter(
+    rate_limit_backend, "ip", AUTH_RATE_LIMIT_IP_PER_MINUTE, AUTH_RATE_LIMIT_IP_BURST
+)
+email_rate_limiter = RateLimiter(
+    rate_limit_backend,
+    "email",
+    AUTH_RATE_LIMIT_EMAIL_PER_MINUTE,
+    AUTH_RATE_LIMIT_EMAIL_BURST,
+)
+# respostas de POST com Idempotency-Key, compartilhadas entre workers pelo banco
+idempotency_store = IdempotencyStore(
+    AsyncSessionLocal,
+    ttl=IDEMPOTENCY_TTL_SECONDS,
+    lock_seconds=IDEMPOTENCY_LOCK_SECONDS,
+    maxsize=IDEMPOTENCY_CACHE_SIZE,
+)
+# entrega dos eventos de pedido gravados no outbox
+outbox_dispatcher = OutboxDispatcher(
+    AsyncSessionLocal,
+    make_sinks(
+        OUTBOX_SINKS,
+        # um lote inteiro precisa caber na fila de cada assinante
+        max(OUTBOX_QUEUE_SIZE, OUTBOX_BATCH_SIZE),
+        OUTBOX_FILE_PATH,
+        OUTBOX_WEBHOOK_URL,
+        OUTBOX_WEBHOOK_TIMEOUT,
+    ),
+    batch_size=OUTBOX_BATCH_SIZE,
+    poll_interval=OUTBOX_POLL_SECONDS,
+    max_attempts=OUTBOX_MAX_ATTEMPTS,
+    retry_base=OUTBOX_RETRY_BASE_SECONDS,
+    retry_max=OUTBOX_RETRY_MAX_SECONDS,
+    enabled=OUTBOX_DISPATCHER_ENABLED,
+)
+# conexões de WebSocket/SSE deste worker
+order_broker = OrderBroker(queue_size=STREAM_QUEUE_SIZE)
+
+
+async def get_session(request: Request):
+    # GET vai para a réplica (se configurada), escrita sempre no primário
+    async with session_router.session(request) as session:
         yield session
-    finally:
-        session.close()
 
 
-def verify_token(
-    token: str = Depends(oauths2_scheme), session: Session = Depends(get_session)
-):
+def get_session_router():
+    # respostas em streaming abrem a própria session, que dura até o fim do corpo
+    return session_router
+
+
+def detached_user(user_id, email, username, active, admin):
+    # cópia fora de qualquer session: pode ser reaproveitada entre requisições
+    user = User(email, username, None, active, admin)
+    user.id = user_id
+    return user
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_cached_user(mapper, connection, target):
+    state = inspect(target)
+    if state.deleted or state.was_deleted:
+        user_cache.pop(target.id)
+        return
+    for attribute in ("admin", "active"):
+        if state.attrs[attribute].history.has_changes():
+            user_cache.pop(target.id)
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def publish_committed_events(session):
+    messages = pop_pending_events(session)
+    if messages:
+        outbox_dispatcher.notify()
+        for message in messages:
+            order_broker.publish(message)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_uncommitted_events(session):
+    pop_pending_events(session)
+
+
+def decode_token(token):
+    # as claims em cache são compartilhadas entre requisições: só leitura
+    digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    cached = token_cache.get(digest)
+    if cached is not None:
+        return cached
     try:
-        dic_info = jwt.decode(token, SECRET_KEY, ALGORITHM)
-        user_id = dic_info.get("sub")
-    except JWTError:
+        dic_info = jwt.decode(token, SIGNING_KEY, ALGORITHM)
+        decoded = int(dic_info.get("sub")), dic_info
+    except (JWTError, TypeError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid access token")
+    exp = dic_info.get("exp")
+    if isinstance(exp, (int, float)):
+        expires_at = token_cache.timer() + exp - time.time()
+        token_cache.set(digest, decoded, expires_at=expires_at)
+    return decoded
+
+
+async def token_user_id(request: Request):
+    # id do dono do token, sem ir ao banco; None se não houver token válido
+    try:
+        user_id, _ = decode_token(await oauths2_scheme(request))
+    except HTTPException:
+        return None
+    return user_id
+
+
+async def check_auth_rate_limit(request: Request, email):
+    # antes do bcrypt: por IP primeiro, para um IP bloqueado não gastar o email
+    limits = (
+        (ip_rate_limiter, request.client.host if request.client else "unknown"),
+        (email_rate_limiter, str(email).strip().lower()),
+    )
+    for limiter, key in limits:
+        retry_after = await limiter.hit(key)
+        if retry_after:
+            AUTH_RATE_LIMITED.labels(limiter.scope).inc()
+            raise HTTPException(
+                status_code=429,
+                detail="Too many attempts, please try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
 
-    user = session.query(User).filter(User.id == user_id).first()
+
+async def load_user(token, session):
+    """Resolve a bearer token to its (detached, cached) user, or raise 401."""
+    user_id, dic_info = decode_token(token)
+
+    if AUTH_STATELESS_TOKENS:
+        if "admin" in dic_info and "active" in dic_info:
+            stateless_stats["hits"] += 1
+            return detached_user(
+                user_id, None, None, dic_info["active"], dic_info["admin"]
+            )
+        # token emitido antes das claims: consulta o banco normalmente
+        stateless_stats["misses"] += 1
+
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid access token")
+    user = detached_user(user.id, user.email, user.username, user.active, user.admin)
+    user_cache.set(user_id, user)
     return user
+
+
+async def verify_token(
+    token: str = Depends(oauths2_scheme), session: AsyncSession = Depends(get_session)
+):
+    return await load_user(token, session)
@@ -1,10 +1,20 @@
+from datetime import datetime, timezone
+from decimal import Decimal, ROUND_HALF_UP
+
 from sqlalchemy import (
     Column,
     Integer,
     String,
     ForeignKey,
     Boolean,
-    Float,
+    Date,
+    DateTime,
+    Index,
+    LargeBinary,
+    delete,
+    func,
+    select,
+    update,
 )
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -12,6 +22,16 @@ from app.core.database import Base
 # building tables that will be used in the database
 
 
+def utcnow():
+    # datas gravadas sem fuso, sempre em UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def to_cents(value):
+    # valores monetários são guardados em centavos inteiros
+    return int(Decimal(str(value)).quantize(Decimal("0.01"), ROUND_HALF_UP) * 100)
+
+
 class User(Base):
     __tablename__ = "users"
     id = Column("id", Integer, primary_key=True, autoincrement=True)
@@ -31,20 +51,53 @@ class User(Base):
 
 class Order(Base):
     __tablename__ = "orders"
+    # listagens por usuário e por status paginam por id (keyset)
+    __table_args__ = (
+        Index("ix_orders_user_id_id", "user_id", "id"),
+        Index("ix_orders_status_id", "status", "id"),
+        Index("ix_orders_created_at", "created_at"),
+    )
 
     id = Column("id", Integer, primary_key=True, autoincrement=True)
     user_id = Column("user_id", Integer, ForeignKey("users.id"))
     status = Column("status", String)  # result in pending, finished, canceled
-    price = Column("price", Float)
+    price_cents = Column("price_cents", Integer, nullable=False, default=0)
+    # sobe a cada mudança de itens ou status; base do ETag das rotas GET
+    version = Column("version", Integer, nullable=False, default=1, server_default="1")
+    created_at = Column(
+        "created_at",
+        DateTime,
+        nullable=False,
+        default=utcnow,
+        server_default=func.current_timestamp(),
+    )
     items = relationship("OrderItem", cascade="all, delete")
+    # o ORM incluiria "AND version = :lida" num UPDATE do pedido, mas nenhuma rota
+    # altera Order pelo ORM (preço e status mudam por UPDATE em SQL, que sobe a
+    # versão por conta própria): na prática isto não checa nada
+    __mapper_args__ = {"version_id_col": version}
 
     def __init__(self, user_id, status="PENDING", price=0):
         self.user_id = user_id
         self.status = status
         self.price = price
 
+    @property
+    def price(self):
+        return self.price_cents / 100
+
+    @price.setter
+    def price(self, value):
+        self.price_cents = to_cents(value)
+
     def calculate_price(self):
-        self.price = sum(item.unit_price * item.quantity for item in self.items)
+        self.price_cents = sum(item.total_cents for item in self.items)
+
+
+# transições de status permitidas: origem -> destinos
+ORDER_TRANSITIONS = {
+    "PENDING": {"FINISHED", "CANCELED"},
+}
 
 
 class OrderItem(Base):
@@ -54,8 +107,8 @@ class OrderItem(Base):
     quantity = Column("quantity", Integer)
     flavor = Column("flavor", String, nullable=False)
     size = Column("size", String)
-    unit_price = Column("unit_price", Float)
-    order_id = Column("order_id", Integer, ForeignKey("orders.id"))
+    unit_price_cents = Column("unit_price_cents", Integer, nullable=False)
+    order_id = Column("order_id", Integer, ForeignKey("orders.id"), index=True)
 
     def __init__(self, quantity, flavor, size, unit_price, order_id):
         self.quantity = quantity
@@ -63,3 +116,121 @@ class OrderItem(Base):
         self.size = size
         self.unit_price = unit_price
         self.order_id = order_id
+
+    @property
+    def unit_price(self):
+        return self.unit_price_cents / 100
+
+    @unit_price.setter
+    def unit_price(self, value):
+        self.unit_price_cents = to_cents(value)
+
+    @property
+    def total_cents(self):
+        return self.quantity * self.unit_price_cents
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    # respostas de escritas já feitas, por usuário + Idempotency-Key
+    user_id = Column("user_id", Integer, primary_key=True)
+    key = Column("key", String, primary_key=True)
+    fingerprint = Column("fingerprint", String, nullable=False)
+    # NULL enquanto a primeira requisição ainda está rodando
+    status_code = Column("status_code", Integer)
+    body = Column("body", LargeBinary)
+    media_type = Column("media_type", String)
+    expires_at = Column("expires_at", DateTime, nullable=False, index=True)
+
+
+class DailyOrderStats(Base):
+    __tablename__ = "daily_order_stats"
+    # rollup por dia de criação e status, mantido pelas próprias escritas de pedido
+    day = Column("day", Date, primary_key=True)
+    status = Column("status", String, primary_key=True)
+    orders = Column("orders", Integer, nullable=False, default=0)
+    revenue_cents = Column("revenue_cents", Integer, nullable=False, default=0)
+
+
+class DailyItemStats(Base):
+    __tablename__ = "daily_item_stats"
+    # itens vendidos (pedidos FINISHED) por dia de criação do pedido, sabor e tamanho
+    day = Column("day", Date, primary_key=True)
+    flavor = Column("flavor", String, primary_key=True)
+    size = Column("size", String, primary_key=True)
+    quantity = Column("quantity", Integer, nullable=False, default=0)
+    revenue_cents = Column("revenue_cents", Integer, nullable=False, default=0)
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    # eventos de pedido gravados na mesma transação da escrita; o dispatcher
+    # apaga cada um depois de entregue
+    id = Column("id", Integer, primary_key=True, autoincrement=True)
+    event_type = Column("event_type", String, nullable=False)
+    order_id = Column("order_id", Integer, nullable=False)
+    payload = Column("payload", String, nullable=False)
+    created_at = Column("created_at", DateTime, nullable=False, default=utcnow)
+    attempts = Column("attempts", Integer, nullable=False, default=0)
+    last_error = Column("last_error", String)
+    # preenchido quando as tentativas acabam: sai da fila e fica para inspeção
+    failed_at = Column("failed_at", DateTime)
+
+
+def increment_order_price(order_id, delta_cents):
+    """
+    UPDATE that shifts an order's price by ``delta_cents`` and bumps its version.
+
+    The status and creation time come back with the new price, as seen under
+    the row lock.
+    """
+    return (
+        update(Order)
+        .where(Order.id == order_id)
+        .values(price_cents=Order.price_cents + delta_cents, version=Order.version + 1)
+        .returning(Order.price_cents, Order.version, Order.status, Order.created_at)
+    )
+
+
+def delete_order_item(order_item_id, user_id=None):
+    """
+    DELETE that removes an order item and returns it.
+
+    When ``user_id`` is given it only matches items of that user's orders.
+    Two requests removing the same item can't both get it back, so the
+    price delta for it is applied once.
+    """
+    query = (
+        delete(OrderItem).where(OrderItem.id == order_item_id).returning(OrderItem)
+    )
+    if user_id is not None:
+        query = query.where(
+            OrderItem.order_id.in_(select(Order.id).where(Order.user_id == user_id))
+        )
+    return query
+
+
+def transition_sources(new_status):
+    return [
+        status for status, targets in ORDER_TRANSITIONS.items() if new_status in targets
+    ]
+
+
+def transition_order_status(order_id, new_status, user_id=None):
+    """
+    UPDATE that moves an order to ``new_status`` and returns it.
+
+    Matches only while the order's current status may move to ``new_status``
+    and, when ``user_id`` is given, while it belongs to that user; the check
+    and the write are one statement, so nothing can change in between.
+    """
+    sources = transition_sources(new_status)
+    query = (
+        update(Order)
+        .where(Order.id == order_id, Order.status.in_(sources))
+        .values(status=new_status, version=Order.version + 1)
+        .returning(Order)
+    )
+    if user_id is not None:
+        query = query.where(Order.user_id == user_id)
+    return query
@@ -0,0 +1,154 @@
+"""
+Concurrency benchmark: blocking Session inside ``async def`` vs AsyncSession.
+
+Two minimal FastAPI apps serve the same "load an order with its items" query
+used by ``visualize_order``. The first one runs it through the sync
+``Session`` (the old ``get_session`` pattern), the second through
+``AsyncSession`` (aiosqlite). Each query calls ``bench_sleep(ms)`` inside
+SQLite to stand in for the network round trip of a real database server;
+the sync version blocks the event loop for that time, the async one doesn't.
+
+Usage:
+    python -m benchmarks.bench_async_sessions --requests 400 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from app.core.database import Base
+from app.models.tables import Order, OrderItem, User
+
+
+def _sleep_ms(ms):
+    time.sleep(ms / 1000)
+    return 0
+
+
+def _register_sleep(dbapi_connection, _record):
+    dbapi_connection.create_function("bench_sleep", 1, _sleep_ms)
+
+
+def seed(url, orders):
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        user = User("bench@example.com", "bench", "x", True)
+        session.add(user)
+        session.flush()
+        for _ in range(orders):
+            order = Order(user_id=user.id)
+            session.add(order)
+            session.flush()
+            session.add(OrderItem(1, "Calabresa", "Large", 10.0, order.id))
+        session.commit()
+    engine.dispose()
+
+
+def order_query(order_id, latency_ms):
+    return (
+        select(Order, func.bench_sleep(latency_ms))
+        .options(selectinload(Order.items))
+        .where(Order.id == order_id)
+    )
+
+
+def build_sync_app(url, latency_ms, pool_size):
+    # a blocking pool checkout inside the event loop deadlocks once every
+    # connection is taken, so the legacy app gets one connection per client
+    engine = create_engine(
+        url, connect_args={"check_same_thread": False}, pool_size=pool_size
+    )
+    event.listen(engine, "connect", _register_sleep)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    app = FastAPI()
+
+    def get_session():
+        session = SessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    @app.get("/orders/{order_id}")
+    async def visualize(order_id: int, session=Depends(get_session)):
+        order = session.execute(order_query(order_id, latency_ms)).scalar()
+        return {"id": order.id, "items": len(order.items)}
+
+    return app, engine
+
+
+def build_async_app(url, latency_ms):
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+    event.listen(engine.sync_engine, "connect", _register_sleep)
+    SessionLocal = async_sessionmaker(
+        bind=engine, autoflush=False, expire_on_commit=False
+    )
+    app = FastAPI()
+
+    async def get_session():
+        async with SessionLocal() as session:
+            yield session
+
+    @app.get("/orders/{order_id}")
+    async def visualize(order_id: int, session=Depends(get_session)):
+        order = (await session.execute(order_query(order_id, latency_ms))).scalar()
+        return {"id": order.id, "items": len(order.items)}
+
+    return app, engine
+
+
+async def drive(app, total, concurrency, orders):
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+
+        async def one(i):
+            async with semaphore:
+                response = await c.get(f"/orders/{i % orders + 1}")
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        return time.perf_counter() - started
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed(url, args.orders)
+
+        sync_app, sync_engine = build_sync_app(url, args.latency_ms, args.concurrency)
+        async_app, async_engine = build_async_app(url, args.latency_ms)
+        results = {}
+        for name, app in (("sync-in-async", sync_app), ("async", async_app)):
+            elapsed = await drive(app, args.requests, args.concurrency, args.orders)
+            results[name] = args.requests / elapsed
+            print(f"{name:>14}: {results[name]:8.1f} req/s ({elapsed:.2f}s)")
+        print(f"{'speedup':>14}: {results['async'] / results['sync-in-async']:.2f}x")
+
+        sync_engine.dispose()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=5.0,
+        help="simulated server-side latency per query",
+    )
+    asyncio.run(main(parser.parse_args()))
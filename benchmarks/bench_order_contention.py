@@ -0,0 +1,118 @@
+"""
+Contention benchmark for concurrent writes on one order.
+
+Runs ``--requests`` add-item calls with ``--concurrency`` in flight against
+``--orders`` orders (1 = every request fights over the same row), each one
+followed by a remove-item of every other added item, in-process through
+httpx's ASGI transport on a throwaway SQLite file. Adds and removals are
+both plain SQL deltas, retried only on lock races. Reports throughput,
+retries and 409s, and fails if the 409 rate goes over ``--max-conflict-rate``
+or any order's stored price differs from the sum of the items left in it.
+
+Usage:
+    python -m benchmarks.bench_order_contention --orders 1 --requests 500 --concurrency 25
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+async def run(args, database_url):
+    os.environ["DATABASE_URL"] = database_url
+    from app.core.database import SessionLocal, async_engine, criar_bd
+    from app.core.metrics import ORDER_WRITE_CONFLICTS
+    from app.main import create_app
+    from app.models.dependencies import password_hasher
+    from app.models.tables import Order, OrderItem, User
+    from routes.auth_routes import create_token
+
+    criar_bd()
+    with SessionLocal() as session:
+        user = User("bench@example.com", "bench", "x", True)
+        session.add(user)
+        session.commit()
+        orders = [Order(user_id=user.id) for _ in range(args.orders)]
+        session.add_all(orders)
+        session.commit()
+        order_ids = [order.id for order in orders]
+        headers = {"Authorization": f"Bearer {create_token(user)}"}
+
+    item = {"quantity": 1, "flavor": "Calabresa", "size": "Large", "unit_price": 10.0}
+    semaphore = asyncio.Semaphore(args.concurrency)
+    statuses = []
+
+    async def add_item(client, n):
+        async with semaphore:
+            response = await client.post(
+                f"/orders/order/add-item/{order_ids[n % len(order_ids)]}",
+                json=item,
+                headers=headers,
+            )
+            statuses.append(response.status_code)
+            if n % 2:
+                item_id = response.json()["item_id"]
+                response = await client.post(
+                    f"/orders/order/remove-item/{item_id}", headers=headers
+                )
+                statuses.append(response.status_code)
+
+    transport = httpx.ASGITransport(app=create_app())
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://b") as c:
+            started = time.perf_counter()
+            await asyncio.gather(*(add_item(c, n) for n in range(args.requests)))
+            elapsed = time.perf_counter() - started
+    finally:
+        await async_engine.dispose()
+        password_hasher.shutdown()
+
+    with SessionLocal() as session:
+        consistent = all(
+            order.price_cents
+            == sum(
+                item.total_cents
+                for item in session.query(OrderItem).filter_by(order_id=order.id)
+            )
+            for order in session.query(Order)
+        )
+
+    conflicts = {
+        outcome: child.value
+        for (outcome,), child in ORDER_WRITE_CONFLICTS._children.items()
+    }
+    print(
+        f"{len(statuses)} add/remove-item requests on {args.orders} order(s), "
+        f"concurrency {args.concurrency}: {len(statuses) / elapsed:.1f} req/s"
+    )
+    print(
+        f"200: {statuses.count(200)}  409: {statuses.count(409)}  "
+        f"retries: {conflicts.get('retried', 0)}  prices consistent: {consistent}"
+    )
+    conflict_rate = statuses.count(409) / len(statuses)
+    if conflict_rate > args.max_conflict_rate:
+        print(f"FAIL 409 rate {conflict_rate:.2%} > {args.max_conflict_rate:.2%}")
+    if not consistent:
+        print("FAIL stored prices differ from their items")
+    return consistent and conflict_rate <= args.max_conflict_rate
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        passed = asyncio.run(run(args, f"sqlite:///{os.path.join(tmp, 'bench.db')}"))
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=25)
+    parser.add_argument("--max-conflict-rate", type=float, default=0.01)
+    main(parser.parse_args())
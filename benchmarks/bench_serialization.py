@@ -0,0 +1,88 @@
+"""
+Serialization benchmark for a page of orders with their items.
+
+Builds ``--orders`` ORM orders with ``--items`` items each (no database
+involved) and times three ways of turning the ``/orders/list`` payload into
+response bytes:
+
+- ``jsonable_encoder``: the old path for raw ORM objects, walked attribute
+  by attribute by FastAPI and dumped with the stdlib json
+- ``response_model + json``: the declared ``OrderPageSchema`` validated from
+  the ORM objects by pydantic-core, still dumped with the stdlib json
+- ``response_model + orjson``: the same model, rendered by ``ORJSONResponse``
+  (the app's default response class)
+
+Usage:
+    python -m benchmarks.bench_serialization --orders 500 --items 5 --repeat 20
+"""
+
+import argparse
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.models.tables import Order, OrderItem
+from scheme import OrderPageSchema
+
+
+def build_page(orders, items):
+    page = []
+    for order_id in range(1, orders + 1):
+        order = Order(user_id=1)
+        # sem banco, os defaults das colunas não são aplicados
+        order.id, order.version = order_id, 1
+        order.items = [
+            OrderItem(2, "Calabresa", "Large", 39.9, order_id) for _ in range(items)
+        ]
+        for item_id, item in enumerate(order.items, start=1):
+            item.id = order_id * items + item_id
+        order.calculate_price()
+        page.append(order)
+    return {"orders": page, "next_cursor": None}
+
+
+def encoder_json(payload):
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def model_json(payload):
+    content = OrderPageSchema.model_validate(payload).model_dump(mode="json")
+    return JSONResponse(content).body
+
+
+def model_orjson(payload):
+    content = OrderPageSchema.model_validate(payload).model_dump(mode="json")
+    return ORJSONResponse(content).body
+
+
+def measure(func, payload, repeat):
+    func(payload)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(payload)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(args):
+    payload = build_page(args.orders, args.items)
+    paths = {
+        "jsonable_encoder": encoder_json,
+        "response_model + json": model_json,
+        "response_model + orjson": model_orjson,
+    }
+    baseline = None
+    for name, func in paths.items():
+        best = measure(func, payload, args.repeat)
+        baseline = baseline or best
+        print(f"{name:>24}: {best * 1000:8.2f} ms  ({baseline / best:5.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,103 @@
+"""
+Cold start benchmark: what a new worker pays before serving its first request.
+
+Each of ``--runs`` fresh interpreters times, on a throwaway SQLite file
+migrated once up front by ``init_db`` (as a deploy would):
+
+- ``import app.main``: should load only settings and middlewares
+- ``create_app()``: routers, models, engines and dependencies
+- ``startup``: the lifespan (no schema work; the outbox task and friends)
+- ``first request``: a login for an unknown email, which opens the first
+  database connection
+- ``second request``: the same login on a warm worker
+
+and the medians are printed.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PHASES = ("import app.main", "create_app()", "startup", "first request", "2nd request")
+
+
+async def measure():
+    timings = {}
+    started = time.perf_counter()
+    from app.main import create_app
+
+    timings["import app.main"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    app = create_app()
+    timings["create_app()"] = time.perf_counter() - started
+
+    import httpx
+    from app.core.database import async_engine
+
+    login = {"email": "nobody@example.com", "password": "wrong-password"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        started = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            timings["startup"] = time.perf_counter() - started
+            for phase in ("first request", "2nd request"):
+                started = time.perf_counter()
+                await c.post("/auth/login", json=login)
+                timings[phase] = time.perf_counter() - started
+    await async_engine.dispose()
+    return timings
+
+
+def main(args):
+    if args.child:
+        print(json.dumps(asyncio.run(measure())))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+            # o dispatcher consultaria o banco durante a medição
+            "OUTBOX_DISPATCHER_ENABLED": "false",
+        }
+        subprocess.run(
+            [sys.executable, "-m", "app.cli", "init-db"],
+            env=env,
+            check=True,
+            capture_output=True,
+        )
+        runs = [
+            json.loads(
+                subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+                    env=env,
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+            )
+            for _ in range(args.runs)
+        ]
+
+    for phase in PHASES:
+        median = statistics.median(run[phase] for run in runs)
+        print(f"{phase:>16}: {median * 1000:8.1f} ms")
+    total = statistics.median(sum(run.values()) for run in runs)
+    print(f"{'total':>16}: {total * 1000:8.1f} ms  (median of {args.runs} runs)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    main(parser.parse_args())
@@ -0,0 +1,85 @@
+"""
+Microbenchmark of the live order update fan-out in ``OrderBroker``.
+
+Opens ``--connections`` idle subscriptions, each parked in ``get`` like a
+WebSocket/SSE connection waiting for its next message, spread over
+``--users`` users plus ``--admins`` admin connections, and reports:
+
+- the memory held per idle connection (subscription plus the waiting task)
+- the time to publish one update, which only touches the owner's and the
+  admins' subscriptions
+- the time until every reached connection has taken its message
+- how many connections were dropped for a full mailbox (admins see every
+  update, so ``--messages`` above ``--queue-size`` in one burst drops them)
+
+Usage:
+    python -m benchmarks.bench_stream_fanout --connections 10000 --users 1000
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from app.core.pubsub import OrderBroker, SubscriptionClosed
+
+
+async def consume(subscription, received):
+    try:
+        while True:
+            if await subscription.get() is not None:
+                received[0] += 1
+    except SubscriptionClosed:
+        pass
+
+
+async def main(args):
+    broker = OrderBroker(queue_size=args.queue_size)
+    received = [0]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    subscriptions = [
+        broker.subscribe(n % args.users, admin=n < args.admins)
+        for n in range(args.connections)
+    ]
+    tasks = [
+        asyncio.create_task(consume(subscription, received))
+        for subscription in subscriptions
+    ]
+    await asyncio.sleep(0)
+    idle = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{'idle connection':>24}: {idle / args.connections:8.0f} bytes")
+
+    messages = [
+        {"type": "order.finished", "order_id": n, "user_id": n % args.users}
+        for n in range(args.messages)
+    ]
+    started = time.perf_counter()
+    for message in messages:
+        broker.publish(message)
+    published = time.perf_counter() - started
+    # assinaturas derrubadas (caixa cheia) não consomem o que sobrou
+    while any(sub.messages and sub.reason is None for sub in subscriptions):
+        await asyncio.sleep(0)
+    drained = time.perf_counter() - started
+    print(f"{'publish':>24}: {published / args.messages * 1e6:8.2f} us/update")
+    print(
+        f"{'delivered':>24}: {drained / args.messages * 1e6:8.2f} us/update"
+        f"  ({received[0] / args.messages:.1f} connections each)"
+    )
+    print(f"{'dropped':>24}: {broker.dropped:8d} slow connections")
+
+    broker.close()
+    await asyncio.gather(*tasks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--admins", type=int, default=5)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--queue-size", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,56 @@
+"""
+Microbenchmark of the per-request token check in ``verify_token``.
+
+Times three ways of turning the same bearer token into its claims:
+
+- ``jwt.decode(str key)``: the old path, where python-jose builds an HMAC
+  key from the secret string, checks the signature, parses the JSON and
+  validates the claims on every request
+- ``jwt.decode(parsed key)``: the same with ``SIGNING_KEY`` built once at
+  startup
+- ``decode_token (cached)``: the app's helper, answering repeated tokens
+  from the digest -> claims cache until their ``exp``
+
+Usage:
+    python -m benchmarks.bench_token_verification --requests 20000
+"""
+
+import argparse
+import time
+
+from jose import jwt
+
+from app.core.config import ALGORITHM, SECRET_KEY, SIGNING_KEY
+from app.models.dependencies import decode_token
+from app.models.tables import User
+from routes.auth_routes import create_token
+
+
+def measure(func, token, requests):
+    func(token)
+    started = time.perf_counter()
+    for _ in range(requests):
+        func(token)
+    return (time.perf_counter() - started) / requests
+
+
+def main(args):
+    user = User("bench@example.com", "bench", None, True)
+    user.id = 1
+    token = create_token(user)
+    paths = {
+        "jwt.decode(str key)": lambda t: jwt.decode(t, SECRET_KEY, ALGORITHM),
+        "jwt.decode(parsed key)": lambda t: jwt.decode(t, SIGNING_KEY, ALGORITHM),
+        "decode_token (cached)": decode_token,
+    }
+    baseline = None
+    for name, func in paths.items():
+        per_call = measure(func, token, args.requests)
+        baseline = baseline or per_call
+        print(f"{name:>24}: {per_call * 1e6:8.2f} us  ({baseline / per_call:6.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    main(parser.parse_args())
@@ -0,0 +1,315 @@
+"""
+End-to-end load test for the order lifecycle.
+
+Virtual users run scripted scenarios against the real app, either
+in-process through httpx's ASGI transport or over HTTP against a local
+uvicorn started on a throwaway SQLite database:
+
+- ``order_lifecycle``: signup -> login -> create order -> add N items -> finish
+- ``admin_listing``: an admin walks every page of /orders/list
+
+Latencies are grouped per route template and reported as throughput and
+p50/p95/p99. ``--save`` writes them as a JSON baseline and ``--compare``
+fails (exit code 1) when a route's p95 regressed beyond ``--tolerance``.
+
+Usage:
+    python -m benchmarks.loadtest --mode asgi --users 20 --iterations 5 --items 5
+    python -m benchmarks.loadtest --mode uvicorn --save baseline.json
+    python -m benchmarks.loadtest --compare baseline.json --tolerance 0.25
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+from jose import jwt
+
+ITEM = {"quantity": 1, "flavor": "Calabresa", "size": "Large", "unit_price": 39.9}
+# todos os usuários virtuais se cadastram do mesmo IP: com os limites padrão
+# de /auth o teste travaria no Retry-After
+LOAD_ENV = {
+    "AUTH_RATE_LIMIT_IP_PER_MINUTE": "0",
+    "AUTH_RATE_LIMIT_EMAIL_PER_MINUTE": "0",
+}
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of ``values`` (0 < q <= 100)."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client, route, method, url, **kwargs):
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[route].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+    def summary(self, elapsed):
+        routes = {}
+        for route, values in sorted(self.latencies.items()):
+            routes[route] = {
+                "count": len(values),
+                "errors": self.errors[route],
+                "mean_ms": sum(values) / len(values) * 1000,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+            }
+        total = sum(route["count"] for route in routes.values())
+        return {
+            "elapsed_s": elapsed,
+            "requests": total,
+            "throughput_rps": total / elapsed if elapsed else 0.0,
+            "routes": routes,
+        }
+
+
+def expect_success(response, step):
+    if not response.is_success:
+        raise RuntimeError(
+            f"{step} failed with {response.status_code}: {response.text[:200]}"
+        )
+    return response
+
+
+async def signup_and_login(client, recorder, admin=False):
+    email = f"load-{uuid.uuid4().hex}@example.com"
+    response = await recorder.request(
+        client,
+        "POST /auth/create_account",
+        "POST",
+        "/auth/create_account",
+        json={
+            "email": email,
+            "username": email,
+            "password": "load-test-password",
+            "active": True,
+            "admin": admin,
+        },
+    )
+    expect_success(response, "signup")
+    response = await recorder.request(
+        client,
+        "POST /auth/login",
+        "POST",
+        "/auth/login",
+        json={"email": email, "password": "load-test-password"},
+    )
+    token = expect_success(response, "login").json()["access_token"]
+    user_id = int(jwt.get_unverified_claims(token)["sub"])
+    return user_id, {"Authorization": f"Bearer {token}"}
+
+
+async def order_lifecycle(client, recorder, iterations, items):
+    user_id, headers = await signup_and_login(client, recorder)
+    for _ in range(iterations):
+        response = await recorder.request(
+            client,
+            "POST /orders/order",
+            "POST",
+            "/orders/order",
+            json={"user_id": user_id},
+            headers=headers,
+        )
+        order_id = int(response.json()["message"].rsplit(" ", 1)[-1])
+        for _ in range(items):
+            await recorder.request(
+                client,
+                "POST /orders/order/add-item/{order_id}",
+                "POST",
+                f"/orders/order/add-item/{order_id}",
+                json=ITEM,
+                headers=headers,
+            )
+        await recorder.request(
+            client,
+            "GET /orders/order/{order_id}",
+            "GET",
+            f"/orders/order/{order_id}",
+            headers=headers,
+        )
+        await recorder.request(
+            client,
+            "POST /orders/order/finish/{order_id}",
+            "POST",
+            f"/orders/order/finish/{order_id}",
+            headers=headers,
+        )
+
+
+async def admin_listing(client, recorder, iterations, page_size):
+    _, headers = await signup_and_login(client, recorder, admin=True)
+    for _ in range(iterations):
+        after = 0
+        while after is not None:
+            response = await recorder.request(
+                client,
+                "GET /orders/list",
+                "GET",
+                f"/orders/list?limit={page_size}&after={after}",
+                headers=headers,
+            )
+            after = response.json()["next_cursor"]
+
+
+async def run_load(client, args):
+    recorder = Recorder()
+    tasks = [
+        order_lifecycle(client, recorder, args.iterations, args.items)
+        for _ in range(args.users)
+    ]
+    tasks += [
+        admin_listing(client, recorder, args.iterations, args.page_size)
+        for _ in range(args.admins)
+    ]
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    return recorder.summary(time.perf_counter() - started)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_asgi(args, database_url):
+    # antes de importar o app, que lê a configuração no import
+    os.environ.update(LOAD_ENV, DATABASE_URL=database_url)
+    from app.core.database import async_engine, criar_bd
+    from app.main import create_app
+    from app.models.dependencies import password_hasher
+
+    # o ASGITransport não roda o lifespan: schema e limpeza ficam aqui
+    criar_bd()
+    transport = httpx.ASGITransport(app=create_app())
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://load") as c:
+            return await run_load(c, args)
+    finally:
+        await async_engine.dispose()
+        password_hasher.shutdown()
+
+
+async def run_uvicorn(args, database_url):
+    port = free_port()
+    env = {**os.environ, **LOAD_ENV, "DATABASE_URL": database_url}
+    # como num deploy: o schema uma vez, antes do servidor
+    init_db = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "app.cli", "init-db", env=env
+    )
+    if await init_db.wait():
+        raise RuntimeError(f"init-db exited with {init_db.returncode}")
+    server = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "app.main:app",
+        "--port",
+        str(port),
+        "--log-level",
+        "warning",
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/auth/")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start")
+            return await run_load(client, args)
+    finally:
+        server.terminate()
+        await server.wait()
+
+
+def compare(baseline, current, tolerance):
+    """Return the routes whose p95 grew more than ``tolerance`` (a fraction)."""
+    regressions = []
+    for route, stats in current["routes"].items():
+        previous = baseline["routes"].get(route)
+        if not previous:
+            continue
+        if stats["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append((route, previous["p95_ms"], stats["p95_ms"]))
+    return regressions
+
+
+def print_summary(result):
+    print(
+        f"{result['requests']} requests in {result['elapsed_s']:.2f}s "
+        f"({result['throughput_rps']:.1f} req/s)"
+    )
+    print(f"{'route':<42}{'count':>7}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for route, stats in result["routes"].items():
+        print(
+            f"{route:<42}{stats['count']:>7}{stats['errors']:>5}"
+            f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+        )
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'load.db')}"
+        runner = run_asgi if args.mode == "asgi" else run_uvicorn
+        result = asyncio.run(runner(args, database_url))
+
+    result["meta"] = {
+        "mode": args.mode,
+        "users": args.users,
+        "admins": args.admins,
+        "iterations": args.iterations,
+        "items": args.items,
+        "python": platform.python_version(),
+    }
+    print_summary(result)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, result, args.tolerance)
+        for route, before, after in regressions:
+            print(f"REGRESSION {route}: p95 {before:.1f}ms -> {after:.1f}ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--admins", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    main(parser.parse_args())
@@ -1,29 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from app.models.tables import User
-from app.models.dependencies import get_session, verify_token
-from app.main import bcrypt_context, ACESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY, ALGORITHM
+from app.models.dependencies import (
+    check_auth_rate_limit,
+    get_session,
+    password_hasher,
+    verify_token,
+)
+from app.core.config import ACESS_TOKEN_EXPIRE_MINUTES, SIGNING_KEY, ALGORITHM
 from scheme import UserSchema, LoginSchema
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import jwt
 from datetime import datetime, timedelta, timezone
 from fastapi.security import OAuth2PasswordRequestForm
 
-
 auth_router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-def create_token(id_user, token_lifetime=timedelta(minutes=ACESS_TOKEN_EXPIRE_MINUTES)):
+def create_token(user, token_lifetime=timedelta(minutes=ACESS_TOKEN_EXPIRE_MINUTES)):
     expiration = datetime.now(timezone.utc) + token_lifetime
-    desc_info = {"sub": str(id_user), "exp": expiration}
-    encoded_token = jwt.encode(desc_info, SECRET_KEY, ALGORITHM)
+    # admin/active vão assinados no token para o modo AUTH_STATELESS_TOKENS
+    desc_info = {
+        "sub": str(user.id),
+        "admin": bool(user.admin),
+        "active": bool(user.active),
+        "exp": expiration,
+    }
+    encoded_token = jwt.encode(desc_info, SIGNING_KEY, ALGORITHM)
     return encoded_token
 
 
-def authenticate_user(email, password, session):
-    user = session.query(User).filter(User.email == email).first()
+async def authenticate_user(email, password, session):
+    user = await session.scalar(select(User).where(User.email == email))
     if not user:
         return False
-    elif not bcrypt_context.verify(password, user.password):
+    elif not await password_hasher.verify(password, user.password):
         return False
     return user
 
@@ -40,15 +51,18 @@ async def home():
 
 @auth_router.post("/create_account")
 async def create_account(
-    user_schema: UserSchema, session: Session = Depends(get_session)
+    user_schema: UserSchema,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
 ):
-    user = session.query(User).filter(User.email == user_schema.email).first()
+    await check_auth_rate_limit(request, user_schema.email)
+    user = await session.scalar(select(User).where(User.email == user_schema.email))
     if user:
         raise HTTPException(
             status_code=400, detail="email already exists; please use a different email"
         )
     else:
-        password_hash = bcrypt_context.hash(user_schema.password)
+        password_hash = await password_hasher.hash(user_schema.password)
         new_user = User(
             user_schema.email,
             user_schema.username,
@@ -57,7 +71,7 @@ async def create_account(
             user_schema.admin,
         )
         session.add(new_user)
-        session.commit()
+        await session.commit()
         return {
             "message": f"User {user_schema.email} created successfully",
             "status": "success",
@@ -65,16 +79,21 @@ async def create_account(
 
 
 @auth_router.post("/login")
-async def login(login_schema: LoginSchema, session: Session = Depends(get_session)):
-    user = authenticate_user(login_schema.email, login_schema.password, session)
+async def login(
+    login_schema: LoginSchema,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+):
+    await check_auth_rate_limit(request, login_schema.email)
+    user = await authenticate_user(login_schema.email, login_schema.password, session)
     if not user:
         raise HTTPException(
             status_code=400, detail="user not found, please check your credentials"
         )
 
     else:
-        access_token = create_token(user.id)
-        refresh_token = create_token(user.id, token_lifetime=timedelta(days=7))
+        access_token = create_token(user)
+        refresh_token = create_token(user, token_lifetime=timedelta(days=7))
         return {
             "access_token": access_token,
             "refresh_token": refresh_token,
@@ -84,17 +103,19 @@ async def login(login_schema: LoginSchema, session: Session = Depends(get_sessio
 
 @auth_router.post("/login-form")
 async def acess_form(
+    request: Request,
     data_form: OAuth2PasswordRequestForm = Depends(),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
-    user = authenticate_user(data_form.username, data_form.password, session)
+    await check_auth_rate_limit(request, data_form.username)
+    user = await authenticate_user(data_form.username, data_form.password, session)
     if not user:
         raise HTTPException(
             status_code=400, detail="user not found, please check your credentials"
         )
 
     else:
-        access_token = create_token(user.id)
+        access_token = create_token(user)
         return {
             "access_token": access_token,
             "token_type": "bearer",
@@ -103,5 +124,5 @@ async def acess_form(
 
 @auth_router.get("/refresh")
 async def toke_refresh(user: User = Depends(verify_token)):
-    acess_token = create_token(user.id)
+    acess_token = create_token(user)
     return {"access_token": acess_token, "token_type": "bearer"}
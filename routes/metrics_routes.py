@@ -0,0 +1,128 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import registry
+from app.models.dependencies import (
+    order_broker,
+    outbox_dispatcher,
+    password_hasher,
+    stateless_stats,
+    token_cache,
+    user_cache,
+)
+
+metrics_router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+password_hash_in_flight = registry.gauge(
+    "password_hash_in_flight", "bcrypt jobs running or queued."
+)
+password_hash_queue_depth = registry.gauge(
+    "password_hash_queue_depth", "bcrypt jobs waiting for a worker."
+)
+password_hash_rejected = registry.counter(
+    "password_hash_rejected_total", "bcrypt jobs rejected with a full queue."
+)
+auth_user_cache = registry.counter(
+    "auth_user_cache_requests_total",
+    "verify_token user cache lookups.",
+    ("result",),
+)
+auth_user_cache_size = registry.gauge(
+    "auth_user_cache_size", "Users held by the verify_token cache."
+)
+auth_token_cache = registry.counter(
+    "auth_token_cache_requests_total",
+    "Verified-token claims cache lookups.",
+    ("result",),
+)
+auth_token_cache_size = registry.gauge(
+    "auth_token_cache_size", "Verified tokens held by the claims cache."
+)
+auth_stateless_tokens = registry.counter(
+    "auth_stateless_tokens_total",
+    "Tokens resolved from their claims (hit) or from the database (miss).",
+    ("result",),
+)
+
+
+@registry.on_collect
+def collect_auth_state():
+    # lidos só na hora do scrape: os contadores já existem nos próprios objetos
+    hasher = password_hasher.metrics()
+    password_hash_in_flight.set(hasher["in_flight"])
+    password_hash_queue_depth.set(hasher["queue_depth"])
+    password_hash_rejected.labels().set(hasher["rejected"])
+
+    cache = user_cache.stats()
+    auth_user_cache.labels("hit").set(cache["hits"])
+    auth_user_cache.labels("miss").set(cache["misses"])
+    auth_user_cache_size.set(cache["size"])
+
+    cache = token_cache.stats()
+    auth_token_cache.labels("hit").set(cache["hits"])
+    auth_token_cache.labels("miss").set(cache["misses"])
+    auth_token_cache_size.set(cache["size"])
+
+    auth_stateless_tokens.labels("hit").set(stateless_stats["hits"])
+    auth_stateless_tokens.labels("miss").set(stateless_stats["misses"])
+
+
+outbox_events_delivered = registry.counter(
+    "outbox_events_delivered_total", "Order events delivered, by sink.", ("sink",)
+)
+outbox_sink_failures = registry.counter(
+    "outbox_sink_failures_total", "Outbox batches a sink failed to take.", ("sink",)
+)
+outbox_events_failed = registry.counter(
+    "outbox_events_failed_total", "Order events dropped after max attempts."
+)
+outbox_lag = registry.gauge(
+    "outbox_lag_seconds", "Age of the oldest undelivered order event."
+)
+outbox_subscriber_backlog = registry.gauge(
+    "outbox_subscriber_backlog", "Events waiting in in-process subscriber queues."
+)
+
+
+@registry.on_collect
+def collect_outbox_state():
+    for sink, count in outbox_dispatcher.delivered.items():
+        outbox_events_delivered.labels(sink).set(count)
+    for sink, count in outbox_dispatcher.failures.items():
+        outbox_sink_failures.labels(sink).set(count)
+    outbox_events_failed.labels().set(outbox_dispatcher.dead)
+    outbox_lag.set(outbox_dispatcher.lag_seconds)
+    queue = outbox_dispatcher.sink("queue")
+    outbox_subscriber_backlog.set(
+        sum(subscriber.qsize() for subscriber in queue.subscribers) if queue else 0
+    )
+
+
+stream_connections = registry.gauge(
+    "stream_connections", "Open WebSocket/SSE order update subscriptions."
+)
+stream_messages = registry.counter(
+    "stream_messages_total",
+    "Order updates published to, and queued for, live subscribers.",
+    ("stage",),
+)
+stream_dropped = registry.counter(
+    "stream_subscribers_dropped_total", "Subscribers closed for falling behind."
+)
+
+
+@registry.on_collect
+def collect_stream_state():
+    stream_connections.set(len(order_broker))
+    stream_messages.labels("published").set(order_broker.published)
+    stream_messages.labels("delivered").set(order_broker.delivered)
+    stream_dropped.labels().set(order_broker.dropped)
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus scrape endpoint. Not authenticated: keep it on an internal network.
+    """
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
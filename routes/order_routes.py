@@ -1,16 +1,272 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from scheme import OrderSchema, ItemSchema, ResponseOrderSchema
-from app.models.dependencies import get_session, verify_token
-from app.models.tables import Order, User, OrderItem
-from typing import List
+import asyncio
+import hashlib
+import random
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from scheme import (
+    OrderSchema,
+    ItemSchema,
+    OrderWithItemsSchema,
+    ResponseOrderSchema,
+    MessageSchema,
+    OrderCreatedSchema,
+    ItemAddedSchema,
+    ItemsAddedSchema,
+    OrderStatusSchema,
+    ItemRemovedSchema,
+    OrderDetailSchema,
+    OrderPageSchema,
+    ImportReportSchema,
+)
+from app.core.config import (
+    IMPORT_CHUNK_SIZE,
+    ORDER_CONFLICT_BACKOFF_MS,
+    ORDER_CONFLICT_RETRIES,
+)
+from app.core.database import SessionRouter, is_write_conflict
+from app.core.idempotency import idempotent_route_class
+from app.core.metrics import ORDER_WRITE_CONFLICTS
+from app.core.order_export import (
+    EXPORT_MEDIA_TYPES,
+    csv_export,
+    export_query,
+    ndjson_export,
+    stream_rows,
+)
+from app.core.order_import import csv_rows, import_orders, iter_lines, ndjson_rows
+from app.core.outbox import (
+    event_row,
+    item_event_data,
+    record_events,
+    record_order_event,
+)
+from app.core.rollups import (
+    item_values,
+    record_items_changed,
+    record_orders_created,
+    record_status_change,
+)
+from app.models.dependencies import (
+    get_session,
+    get_session_router,
+    idempotency_store,
+    token_user_id,
+    verify_token,
+)
+from app.models.tables import (
+    Order,
+    User,
+    OrderItem,
+    delete_order_item,
+    increment_order_price,
+    transition_order_status,
+    transition_sources,
+)
+from typing import List, Optional
 
 order_router = APIRouter(
-    prefix="/orders", tags=["orders"], dependencies=[Depends(verify_token)]
+    prefix="/orders",
+    tags=["orders"],
+    dependencies=[Depends(verify_token)],
+    route_class=idempotent_route_class(idempotency_store, token_user_id),
+)
+# sem a rota idempotente, que leria o corpo inteiro para calcular o
+# fingerprint: a importação lê o corpo como stream
+order_import_router = APIRouter(
+    prefix="/orders",
+    tags=["orders"],
+    dependencies=[Depends(verify_token)],
 )
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+# o cliente pode guardar a resposta, mas sempre revalida com If-None-Match
+CACHE_CONTROL = "private, no-cache"
 
-@order_router.get("/")
+
+async def get_order_with_items(session, order_id):
+    # AsyncSession não faz lazy load: os itens vêm junto com o pedido
+    return await session.scalar(
+        select(Order).options(selectinload(Order.items)).where(Order.id == order_id)
+    )
+
+
+def build_items(item_schemas, order_id=None):
+    return [
+        OrderItem(
+            item_schema.quantity,
+            item_schema.flavor,
+            item_schema.size,
+            item_schema.unit_price,
+            order_id,
+        )
+        for item_schema in item_schemas
+    ]
+
+
+async def apply_price_delta(session, order, items, sign=1):
+    # o preço muda pelo total dos itens (sign=-1 para remoção) no próprio UPDATE,
+    # sem recarregar os itens. Os valores devolvidos não marcam o pedido como
+    # alterado para o próximo flush
+    delta_cents = sign * sum(item.total_cents for item in items)
+    updated = (
+        await session.execute(
+            increment_order_price(order.id, delta_cents),
+            execution_options={"synchronize_session": False},
+        )
+    ).one_or_none()
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    set_committed_value(order, "price_cents", updated.price_cents)
+    set_committed_value(order, "version", updated.version)
+    await record_items_changed(session, updated.created_at, updated.status, items, sign)
+    # ids dos itens novos para o evento
+    await session.flush()
+    await record_events(
+        session,
+        [
+            event_row(
+                "order.items_added" if sign > 0 else "order.item_removed",
+                order.id,
+                order.user_id,
+                updated.status,
+                updated.price_cents,
+                updated.version,
+                items=item_event_data(items),
+            )
+        ],
+    )
+
+
+async def retry_on_conflict(session, operation):
+    """
+    Run ``operation`` until it commits without losing a lock race: SQLite
+    busy/locked, or a Postgres serialization failure (40001) or deadlock
+    (40P01).
+
+    Each conflict rolls back, waits a jittered exponential backoff and runs
+    the whole operation again from a fresh read; after
+    ``ORDER_CONFLICT_RETRIES`` retries the client gets a 409.
+    """
+    for attempt in range(ORDER_CONFLICT_RETRIES + 1):
+        try:
+            return await operation()
+        except DBAPIError as error:
+            if not is_write_conflict(error):
+                raise
+            await session.rollback()
+            if attempt == ORDER_CONFLICT_RETRIES:
+                ORDER_WRITE_CONFLICTS.labels("exhausted").inc()
+                raise HTTPException(
+                    status_code=409,
+                    detail="The order was changed by another request, please retry",
+                )
+            ORDER_WRITE_CONFLICTS.labels("retried").inc()
+            backoff = ORDER_CONFLICT_BACKOFF_MS / 1000 * 2**attempt
+            await asyncio.sleep(random.uniform(0, backoff))
+
+
+async def change_status(session, order_id, new_status, user):
+    # checagem de dono e de transição dentro do próprio UPDATE: uma ida ao banco
+    order = await session.scalar(
+        transition_order_status(order_id, new_status, None if user.admin else user.id),
+        execution_options={"synchronize_session": False},
+    )
+    if order is not None:
+        # toda transição parte de um único status (hoje, PENDING)
+        (old_status,) = transition_sources(new_status)
+        await record_status_change(session, order, old_status)
+        await record_order_event(session, f"order.{new_status.lower()}", order)
+        await session.commit()
+        return order
+
+    # nada casou: só agora descobre o motivo para responder o erro certo
+    current = (
+        await session.execute(
+            select(Order.user_id, Order.status).where(Order.id == order_id)
+        )
+    ).first()
+    if current is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if not user.admin and user.id != current.user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="Unfortunately, you do not have permission to make this change.",
+        )
+    raise HTTPException(
+        status_code=409,
+        detail=f"Order cannot go from {current.status} to {new_status}",
+    )
+
+
+def page_query(query, after, limit, filters):
+    # paginação por keyset no id: cada página custa o mesmo número de queries
+    query = query.where(Order.id > after).order_by(Order.id).limit(limit)
+    for column, value in filters.items():
+        if value is not None:
+            query = query.where(getattr(Order, column) == value)
+    return query
+
+
+async def list_orders_page(session, after, limit, **filters):
+    query = page_query(
+        select(Order).options(selectinload(Order.items)), after, limit, filters
+    )
+    orders = (await session.scalars(query)).all()
+    next_cursor = orders[-1].id if len(orders) == limit else None
+    return orders, next_cursor
+
+
+async def page_versions(session, after, limit, **filters):
+    # só (id, version) da página: resolve o ETag sem carregar pedidos nem itens
+    query = page_query(select(Order.id, Order.version), after, limit, filters)
+    return (await session.execute(query)).all()
+
+
+def naive_utc(value):
+    # created_at é gravado sem fuso, em UTC
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def order_etag(order_id, version):
+    return f'"order-{order_id}-v{version}"'
+
+
+def page_etag(versions):
+    digest = hashlib.blake2b(digest_size=8)
+    for order_id, version in versions:
+        digest.update(f"{order_id}:{version};".encode())
+    return f'"orders-{digest.hexdigest()}"'
+
+
+def etag_matches(request, etag):
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    # If-None-Match usa comparação fraca: W/"x" casa com "x"
+    candidates = [
+        candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")
+    ]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag):
+    return Response(
+        status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
+
+
+@order_router.get("/", response_model=MessageSchema)
 async def orders():
     """
 
@@ -21,41 +277,76 @@ async def orders():
     return {"message": "you accessed the order routes"}
 
 
-@order_router.post("/order")
+@order_router.post("/order", response_model=MessageSchema)
 async def create_order(
-    user_schema: OrderSchema, session: Session = Depends(get_session)
+    user_schema: OrderSchema, session: AsyncSession = Depends(get_session)
 ):
     new_order = Order(user_id=user_schema.user_id)
     session.add(new_order)
-    session.commit()
+    await session.flush()
+    await record_orders_created(
+        session,
+        [(new_order.created_at, new_order.status, new_order.price_cents, [])],
+    )
+    await record_order_event(session, "order.created", new_order, items=[])
+    await session.commit()
     return {"message": f"Order successfully created. Order ID: {new_order.id}"}
 
 
-@order_router.post("/order/cancel/{order_id}")
+@order_router.post("/order/with-items", response_model=OrderCreatedSchema)
+async def create_order_with_items(
+    order_schema: OrderWithItemsSchema, session: AsyncSession = Depends(get_session)
+):
+    # checkout completo: pedido + itens + preço em um único commit
+    new_order = Order(user_id=order_schema.user_id)
+    new_order.items = build_items(order_schema.items)
+    new_order.calculate_price()
+    session.add(new_order)
+    await session.flush()
+    await record_orders_created(
+        session,
+        [
+            (
+                new_order.created_at,
+                new_order.status,
+                new_order.price_cents,
+                item_values(new_order.items),
+            )
+        ],
+    )
+    await record_order_event(
+        session, "order.created", new_order, items=item_event_data(new_order.items)
+    )
+    await session.commit()
+    return {
+        "message": f"Order successfully created. Order ID: {new_order.id}",
+        "order_id": new_order.id,
+        "item_ids": [item.id for item in new_order.items],
+        "order_price": new_order.price,
+    }
+
+
+@order_router.post("/order/cancel/{order_id}", response_model=OrderStatusSchema)
 async def cancel_order(
     order_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     user: User = Depends(verify_token),
 ):
-    order = session.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    if not user.admin and user.id != order.user_id:
-        raise HTTPException(
-            status_code=403,
-            detail="Unfortunately, you do not have permission to make this change.",
-        )
-    order.status = "CANCELED"
-    session.commit()
+    order = await change_status(session, order_id, "CANCELED", user)
     return {
         "message": f"order number: {order.id} successfully canceled",
         "order": order,
     }
 
 
-@order_router.get("/list")
+@order_router.get("/list", response_model=OrderPageSchema)
 async def list_all_orders(
-    session: Session = Depends(get_session), user: User = Depends(verify_token)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: int = Query(0, ge=0),
+    status: Optional[str] = None,
+    user_id: Optional[int] = None,
+    session: AsyncSession = Depends(get_session),
+    user: User = Depends(verify_token),
 ):
     if not user.admin:
         raise HTTPException(
@@ -63,103 +354,215 @@ async def list_all_orders(
             detail="Unfortunately, you do not have permission to make this change",
         )
     else:
-        orders = session.query(Order).all()
-        return {"orders": orders}
+        orders, next_cursor = await list_orders_page(
+            session, after, limit, status=status, user_id=user_id
+        )
+        return {"orders": orders, "next_cursor": next_cursor}
 
 
-@order_router.post("/order/add-item/{order_id}")
-async def add_item_order(
-    order_id: int,
-    item_schema: ItemSchema,
-    session: Session = Depends(get_session),
+@order_router.get("/export", response_class=StreamingResponse)
+async def export_orders(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    min_id: Optional[int] = Query(None, ge=0),
+    max_id: Optional[int] = Query(None, ge=0),
+    router: SessionRouter = Depends(get_session_router),
     user: User = Depends(verify_token),
 ):
-    order = session.query(Order).filter(Order.id == order_id).first()
+    """
+    Full dump of orders with their items, streamed as NDJSON or CSV.
+    """
+    if not user.admin:
+        raise HTTPException(
+            status_code=403,
+            detail="Unfortunately, you do not have permission to make this change",
+        )
+    query = export_query(
+        status=status,
+        user_id=user_id,
+        created_from=naive_utc(created_from),
+        created_to=naive_utc(created_to),
+        min_id=min_id,
+        max_id=max_id,
+    )
+    partitions = stream_rows(router.factory_for(request), query, EXPORT_BATCH_SIZE)
+    body = csv_export(partitions) if format == "csv" else ndjson_export(partitions)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'},
+    )
 
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
 
-    if not user.admin and user.id != order.user_id:
+@order_import_router.post("/import", response_model=ImportReportSchema)
+async def bulk_import_orders(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=10000),
+    session: AsyncSession = Depends(get_session),
+    user: User = Depends(verify_token),
+):
+    """
+    Bulk import of orders with their items, as NDJSON or CSV, read as a stream.
+    """
+    if not user.admin:
         raise HTTPException(
             status_code=403,
             detail="Unfortunately, you do not have permission to make this change",
         )
-    order_item = OrderItem(
-        item_schema.quantity,
-        item_schema.flavor,
-        item_schema.size,
-        item_schema.unit_price,
-        order_id,
-    )
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+    lines = iter_lines(request.stream())
+    rows = csv_rows(lines) if format == "csv" else ndjson_rows(lines)
+    return await import_orders(session, rows, chunk_size)
 
-    session.add(order_item)
-    order.calculate_price()
-    session.commit()
-    return {
-        "message": "Item successfully created",
-        "item_id": order_item.id,
-        "order_price": order.price,
-    }
 
+@order_router.post("/order/add-item/{order_id}", response_model=ItemAddedSchema)
+async def add_item_order(
+    order_id: int,
+    item_schema: ItemSchema,
+    session: AsyncSession = Depends(get_session),
+    user: User = Depends(verify_token),
+):
+    async def add_item():
+        order = await session.get(Order, order_id)
 
-@order_router.post("/order/remove-item/{order_item_id}")
-async def remove_item_order(
-    order_item_id: int,
-    session: Session = Depends(get_session),
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+
+        if not user.admin and user.id != order.user_id:
+            raise HTTPException(
+                status_code=403,
+                detail="Unfortunately, you do not have permission to make this change",
+            )
+        (order_item,) = build_items([item_schema], order_id)
+
+        session.add(order_item)
+        await apply_price_delta(session, order, [order_item])
+        await session.commit()
+        return {
+            "message": "Item successfully created",
+            "item_id": order_item.id,
+            "order_price": order.price,
+        }
+
+    return await retry_on_conflict(session, add_item)
+
+
+@order_router.post("/order/add-items/{order_id}", response_model=ItemsAddedSchema)
+async def add_items_order(
+    order_id: int,
+    # um lote vazio subiria a versão e publicaria um evento sem itens
+    item_schemas: List[ItemSchema] = Body(..., min_length=1),
+    session: AsyncSession = Depends(get_session),
     user: User = Depends(verify_token),
 ):
-    order_item = session.query(OrderItem).filter(OrderItem.id == order_item_id).first()
+    async def add_items():
+        order = await session.get(Order, order_id)
 
-    if not order_item:
-        raise HTTPException(status_code=404, detail="Order item not found")
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
 
-    order = session.query(Order).filter(Order.id == order_item.order_id).first()
+        if not user.admin and user.id != order.user_id:
+            raise HTTPException(
+                status_code=403,
+                detail="Unfortunately, you do not have permission to make this change",
+            )
 
-    if not user.admin and user.id != order.user_id:
-        raise HTTPException(
-            status_code=403,
-            detail="Unfortunately, you do not have permission to make this change",
+        # todos os itens entram num único flush (INSERT em lote) e o preço
+        # recebe um único delta; somar não depende do que foi lido, então não
+        # há checagem de versão, só novas tentativas se o banco estiver ocupado
+        order_items = build_items(item_schemas, order_id)
+        session.add_all(order_items)
+        await apply_price_delta(session, order, order_items)
+        await session.commit()
+        return {
+            "message": "Items successfully created",
+            "item_ids": [order_item.id for order_item in order_items],
+            "order_price": order.price,
+        }
+
+    return await retry_on_conflict(session, add_items)
+
+
+@order_router.post(
+    "/order/remove-item/{order_item_id}", response_model=ItemRemovedSchema
+)
+async def remove_item_order(
+    order_item_id: int,
+    session: AsyncSession = Depends(get_session),
+    user: User = Depends(verify_token),
+):
+    async def remove_item():
+        # o DELETE ... RETURNING decide quem remove o item: a remoção só tira
+        # o total dele do preço, então não depende da versão do pedido
+        order_item = await session.scalar(
+            delete_order_item(order_item_id, None if user.admin else user.id),
+            execution_options={"synchronize_session": False},
         )
+        if order_item is None:
+            # nada removido: só agora descobre o motivo para responder o erro certo
+            exists = await session.scalar(
+                select(OrderItem.id).where(OrderItem.id == order_item_id)
+            )
+            if exists is None:
+                raise HTTPException(status_code=404, detail="Order item not found")
+            raise HTTPException(
+                status_code=403,
+                detail="Unfortunately, you do not have permission to make this change",
+            )
 
-    session.delete(order_item)
-    order.calculate_price()
-    session.commit()
-    return {
-        "message": "Item successfully removed",
-        "quantity_items_ordered": len(order.items),
-        "order": order,
-    }
+        order = await get_order_with_items(session, order_item.order_id)
+        await apply_price_delta(session, order, [order_item], sign=-1)
+        await session.commit()
+        return {
+            "message": "Item successfully removed",
+            "quantity_items_ordered": len(order.items),
+            "order": order,
+        }
+
+    return await retry_on_conflict(session, remove_item)
 
 
-@order_router.post("/order/finish/{order_id}")
+@order_router.post("/order/finish/{order_id}", response_model=OrderStatusSchema)
 async def finish_order(
     order_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     user: User = Depends(verify_token),
 ):
-    order = session.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    if not user.admin and user.id != order.user_id:
-        raise HTTPException(
-            status_code=403,
-            detail="Unfortunately, you do not have permission to make this change.",
-        )
-    order.status = "FINISHED"
-    session.commit()
+    order = await change_status(session, order_id, "FINISHED", user)
     return {
         "message": f"order number: {order.id} successfully finished",
         "order": order,
     }
 
 
-@order_router.get("/order/{order_id}")
+@order_router.get("/order/{order_id}", response_model=OrderDetailSchema)
 async def visualize_order(
     order_id: int,
-    session: Session = Depends(get_session),
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
     user: User = Depends(verify_token),
 ):
-    order = session.query(Order).filter(Order.id == order_id).first()
+    if request.headers.get("if-none-match"):
+        # GET condicional: busca só dono e versão pela PK, sem os itens
+        current = (
+            await session.execute(
+                select(Order.user_id, Order.version).where(Order.id == order_id)
+            )
+        ).first()
+        if current and (user.admin or user.id == current.user_id):
+            etag = order_etag(order_id, current.version)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+    order = await get_order_with_items(session, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     if not user.admin and user.id != order.user_id:
@@ -167,12 +570,34 @@ async def visualize_order(
             status_code=403,
             detail="Unfortunately, you do not have permission to make this change.",
         )
+    response.headers["ETag"] = order_etag(order.id, order.version)
+    response.headers["Cache-Control"] = CACHE_CONTROL
     return {"quantity_items_ordered": len(order.items), "order": order}
 
 
 @order_router.get("/list/order-user", response_model=List[ResponseOrderSchema])
 async def list_orders(
-    session: Session = Depends(get_session), user: User = Depends(verify_token)
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: int = Query(0, ge=0),
+    status: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+    user: User = Depends(verify_token),
 ):
-    orders = session.query(Order).filter(Order.user_id == user.id).all()
+    if request.headers.get("if-none-match"):
+        versions = await page_versions(
+            session, after, limit, status=status, user_id=user.id
+        )
+        etag = page_etag(versions)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+    orders, next_cursor = await list_orders_page(
+        session, after, limit, status=status, user_id=user.id
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    response.headers["ETag"] = page_etag((order.id, order.version) for order in orders)
+    response.headers["Cache-Control"] = CACHE_CONTROL
     return orders
@@ -0,0 +1,89 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.rollups import orders_report, revenue_report, top_items_report
+from app.models.dependencies import get_session, verify_token
+from app.models.tables import User
+from scheme import OrdersReportSchema, RevenueReportSchema, TopItemsReportSchema
+
+
+async def require_admin(user: User = Depends(verify_token)):
+    if not user.admin:
+        raise HTTPException(
+            status_code=403,
+            detail="Unfortunately, you do not have permission to make this change",
+        )
+    return user
+
+
+# os relatórios leem só os rollups, nunca orders/order_items
+report_router = APIRouter(
+    prefix="/reports", tags=["reports"], dependencies=[Depends(require_admin)]
+)
+
+
+@report_router.get("/orders", response_model=OrdersReportSchema)
+async def orders_per_day(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Orders and their value per day of creation and current status.
+    """
+    rows = await orders_report(session, start, end)
+    return {
+        "days": [
+            {
+                "day": row.day,
+                "status": row.status,
+                "orders": row.orders,
+                "revenue": row.revenue_cents / 100,
+            }
+            for row in rows
+        ]
+    }
+
+
+@report_router.get("/revenue", response_model=RevenueReportSchema)
+async def revenue_per_day(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Revenue of finished orders per day of creation, with the period totals.
+    """
+    rows = await revenue_report(session, start, end)
+    return {
+        "days": [
+            {"day": row.day, "orders": row.orders, "revenue": row.revenue_cents / 100}
+            for row in rows
+        ],
+        "orders": sum(row.orders for row in rows),
+        "revenue": sum(row.revenue_cents for row in rows) / 100,
+    }
+
+
+@report_router.get("/top", response_model=TopItemsReportSchema)
+async def top_items(
+    by: str = Query("flavor", pattern="^(flavor|size)$"),
+    limit: int = Query(10, ge=1, le=100),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Best sellers among finished orders, by flavor or size.
+    """
+    rows = await top_items_report(session, by, limit, start, end)
+    return {
+        "by": by,
+        "items": [
+            {"key": key, "quantity": quantity, "revenue": revenue / 100}
+            for key, quantity, revenue in rows
+        ],
+    }
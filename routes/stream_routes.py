@@ -0,0 +1,143 @@
+import asyncio
+import contextlib
+from typing import Optional
+
+import orjson
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import StreamingResponse
+
+from app.core.config import STREAM_HEARTBEAT_SECONDS
+from app.core.database import SessionRouter
+from app.core.pubsub import SubscriptionClosed
+from app.models.dependencies import (
+    get_session_router,
+    load_user,
+    order_broker,
+    verify_token,
+)
+from app.models.tables import User
+
+stream_router = APIRouter(prefix="/orders/stream", tags=["stream"])
+
+# como cada motivo de fim vira código de fechamento no WebSocket
+CLOSE_CODES = {
+    "dropped": status.WS_1013_TRY_AGAIN_LATER,
+    "closed": status.WS_1001_GOING_AWAY,
+}
+
+
+def subscribe_for(user, order_id=None, user_id=None):
+    # admins veem todos os pedidos (ou os de um usuário); os demais, só os seus
+    if user.admin and user_id is None:
+        return order_broker.subscribe(user.id, admin=True, order_id=order_id)
+    return order_broker.subscribe(user_id if user.admin else user.id, order_id=order_id)
+
+
+def check_user_filter(user, user_id):
+    return user_id is None or user.admin or user_id == user.id
+
+
+def sse_frame(event, data):
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def sse_events(user, order_id, user_id, heartbeat):
+    # a assinatura nasce e morre com o corpo: o finally roda também quando o
+    # Starlette cancela o gerador porque o cliente desconectou
+    subscription = subscribe_for(user, order_id, user_id)
+    try:
+        yield b": connected\n\n"
+        while True:
+            try:
+                message = await subscription.get(heartbeat)
+            except SubscriptionClosed as closed:
+                yield sse_frame(closed.reason, {})
+                return
+            # comentário SSE: mantém proxies abertos e detecta cliente morto
+            yield b": ping\n\n" if message is None else sse_frame("order", message)
+    finally:
+        order_broker.unsubscribe(subscription)
+
+
+@stream_router.get("", response_class=StreamingResponse)
+async def order_updates_sse(
+    order_id: Optional[int] = Query(None, ge=0),
+    user_id: Optional[int] = Query(None, ge=0),
+    user: User = Depends(verify_token),
+):
+    """
+    Server-Sent Events with the updates of the caller's orders (all orders
+    for admins), optionally narrowed to one ``order_id``.
+    """
+    if not check_user_filter(user, user_id):
+        raise HTTPException(
+            status_code=403,
+            detail="Unfortunately, you do not have permission to make this change",
+        )
+    return StreamingResponse(
+        sse_events(user, order_id, user_id, STREAM_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def wait_disconnect(websocket, subscription):
+    # mensagens do cliente são ignoradas; a desconexão encerra a assinatura
+    with contextlib.suppress(WebSocketDisconnect):
+        while True:
+            await websocket.receive_bytes()
+    order_broker.release(subscription)
+
+
+@stream_router.websocket("/ws")
+async def order_updates_ws(
+    websocket: WebSocket,
+    order_id: Optional[int] = Query(None, ge=0),
+    user_id: Optional[int] = Query(None, ge=0),
+    token: Optional[str] = None,
+    router: SessionRouter = Depends(get_session_router),
+):
+    """
+    WebSocket with the same updates as the SSE stream, one JSON text frame
+    per message. Browsers cannot set headers here, so the token may come in
+    ``?token=``.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    token = token or authorization.removeprefix("Bearer ").strip()
+    try:
+        # a session só vive durante a autenticação, não durante a conexão
+        async with router.replica() as session:
+            user = await load_user(token, session)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if not check_user_filter(user, user_id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = subscribe_for(user, order_id, user_id)
+    receiver = asyncio.create_task(wait_disconnect(websocket, subscription))
+    try:
+        while True:
+            try:
+                message = await subscription.get()
+            except SubscriptionClosed as closed:
+                if closed.reason in CLOSE_CODES:
+                    await websocket.close(code=CLOSE_CODES[closed.reason])
+                return
+            await websocket.send_text(orjson.dumps(message).decode())
+    except WebSocketDisconnect:
+        # o cliente caiu no meio de um envio
+        pass
+    finally:
+        order_broker.unsubscribe(subscription)
+        receiver.cancel()
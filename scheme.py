@@ -1,5 +1,7 @@
+from datetime import date
+
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Literal, Optional, List
 
 
 class UserSchema(BaseModel):
@@ -38,11 +40,122 @@ class ItemSchema(BaseModel):
         from_attributes = True
 
 
-class ResponseOrderSchema(BaseModel):
+class OrderWithItemsSchema(BaseModel):
+    user_id: int
+    items: List[ItemSchema]
+
+    class Config:
+        from_attributes = True
+
+
+class ResponseItemSchema(ItemSchema):
+    id: int
+
+
+class OrderSummarySchema(BaseModel):
     id: int
+    user_id: int
     status: str
     price: float
-    items: List[ItemSchema]
+    version: int
 
     class Config:
         from_attributes = True
+
+
+class ResponseOrderSchema(OrderSummarySchema):
+    items: List[ResponseItemSchema]
+
+
+class MessageSchema(BaseModel):
+    message: str
+
+
+class OrderCreatedSchema(MessageSchema):
+    order_id: int
+    item_ids: List[int]
+    order_price: float
+
+
+class ItemAddedSchema(MessageSchema):
+    item_id: int
+    order_price: float
+
+
+class ItemsAddedSchema(MessageSchema):
+    item_ids: List[int]
+    order_price: float
+
+
+class OrderStatusSchema(MessageSchema):
+    order: OrderSummarySchema
+
+
+class ItemRemovedSchema(MessageSchema):
+    quantity_items_ordered: int
+    order: ResponseOrderSchema
+
+
+class OrderDetailSchema(BaseModel):
+    quantity_items_ordered: int
+    order: ResponseOrderSchema
+
+
+class OrderPageSchema(BaseModel):
+    orders: List[ResponseOrderSchema]
+    next_cursor: Optional[int]
+
+
+class ImportOrderSchema(BaseModel):
+    user_id: int
+    status: Literal["PENDING", "FINISHED", "CANCELED"] = "PENDING"
+    items: List[ItemSchema] = []
+
+
+class ImportErrorSchema(BaseModel):
+    line: int
+    error: str
+
+
+class ImportReportSchema(BaseModel):
+    rows: int
+    orders: int
+    items: int
+    errors: int
+    error_samples: List[ImportErrorSchema]
+    seconds: float
+    rows_per_second: float
+
+
+class DailyOrdersSchema(BaseModel):
+    day: date
+    status: str
+    orders: int
+    revenue: float
+
+
+class OrdersReportSchema(BaseModel):
+    days: List[DailyOrdersSchema]
+
+
+class DailyRevenueSchema(BaseModel):
+    day: date
+    orders: int
+    revenue: float
+
+
+class RevenueReportSchema(BaseModel):
+    days: List[DailyRevenueSchema]
+    orders: int
+    revenue: float
+
+
+class TopItemSchema(BaseModel):
+    key: str
+    quantity: int
+    revenue: float
+
+
+class TopItemsReportSchema(BaseModel):
+    by: str
+    items: List[TopItemSchema]
@@ -2,17 +2,41 @@
 Pytest fixtures for API testing
 """
 
+import asyncio
+import os
+from typing import NamedTuple
+
+# o outbox vem desligado por padrão; os testes usam o sink queue
+os.environ.setdefault("OUTBOX_SINKS", "queue")
+
 import pytest
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from fastapi import Request
 from fastapi.testclient import TestClient
-from app.core.database import Base
+from app.core.database import Base, SessionRouter
+from app.core.profiler import QueryProfile
 from app.models.tables import User, Order, OrderItem
-from app.main import app, bcrypt_context
-from app.models.dependencies import get_session
+from app.core.hashing import bcrypt_context
+from app.main import app
+from app.models.dependencies import (
+    get_session,
+    get_session_router,
+    idempotency_store,
+    outbox_dispatcher,
+    rate_limit_backend,
+    token_cache,
+    user_cache,
+)
 
 # Use in-memory SQLite for tests with shared cache
 TEST_DATABASE_URL = "sqlite:///file:testdb?mode=memory&cache=shared&uri=true"
+TEST_ASYNC_DATABASE_URL = (
+    "sqlite+aiosqlite:///file:testdb?mode=memory&cache=shared&uri=true"
+)
 
 
 @pytest.fixture(scope="function")
@@ -45,29 +69,122 @@ def test_db(test_engine):
 
 
 @pytest.fixture(scope="function")
-def client(test_engine):
+def client(test_engine, route_sessions):
     """FastAPI test client with overridden database"""
 
-    # Create a session factory for the test engine
-    TestingSessionLocal = sessionmaker(
-        autocommit=False, autoflush=False, bind=test_engine
+    # The routes use AsyncSession; point an aiosqlite engine at the same
+    # shared in-memory database the sync fixtures write to
+    async_engine = create_async_engine(
+        TEST_ASYNC_DATABASE_URL,
+        connect_args={"check_same_thread": False, "uri": True},
+    )
+    TestingSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
     )
 
-    def override_get_session():
-        db = TestingSessionLocal()
-        try:
-            yield db
-        finally:
-            db.close()
-
-    app.dependency_overrides[get_session] = override_get_session
+    route_sessions(SessionRouter(TestingSessionLocal))
+    # ids are reused by every fresh in-memory database
+    token_cache.clear()
+    rate_limit_backend.clear()
+    idempotency_store.cache.clear()
+    session_factory = idempotency_store.session_factory
+    idempotency_store.session_factory = TestingSessionLocal
+    # o dispatcher de fundo consultaria o banco entre as requisições e
+    # estouraria os query_budget; os testes do outbox chamam dispatch_batch
+    outbox_dispatcher.session_factory = TestingSessionLocal
+    dispatcher_enabled = outbox_dispatcher.enabled
+    outbox_dispatcher.enabled = False
+    outbox_dispatcher.reset_stats()
 
     with TestClient(app) as test_client:
         yield test_client
+        test_client.portal.call(async_engine.dispose)
+
+    idempotency_store.session_factory = session_factory
+    outbox_dispatcher.session_factory = session_factory
+    outbox_dispatcher.enabled = dispatcher_enabled
+
+
+@pytest.fixture
+def route_sessions():
+    """Serve the routes' sessions from a given SessionRouter"""
+
+    def install(router):
+        async def override_get_session(request: Request):
+            async with router.session(request) as session:
+                yield session
 
+        app.dependency_overrides[get_session] = override_get_session
+        app.dependency_overrides[get_session_router] = lambda: router
+        user_cache.clear()
+
+    yield install
     app.dependency_overrides.clear()
 
 
+class FileDatabase(NamedTuple):
+    session: object
+    user: User
+    async_engine: object
+
+
+@pytest.fixture
+def file_database(tmp_path):
+    """
+    Factory for SQLite file databases with the schema and one user, each with
+    a sync session and an aiosqlite engine on the same file
+    """
+    databases = []
+
+    def create(name="test"):
+        path = tmp_path / f"{name}.db"
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        user = User("user@example.com", "testuser", "x", True)
+        session.add(user)
+        session.commit()
+        async_engine = create_async_engine(
+            f"sqlite+aiosqlite:///{path}", connect_args={"check_same_thread": False}
+        )
+        databases.append(FileDatabase(session, user, async_engine))
+        return databases[-1]
+
+    yield create
+    for database in databases:
+        asyncio.run(database.async_engine.dispose())
+        engine = database.session.get_bind()
+        database.session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def query_budget():
+    """Assert that a block runs at most ``max_queries`` SQL statements"""
+
+    @contextmanager
+    def budget(max_queries):
+        profile = QueryProfile()
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            profile.record(statement, 0.0)
+
+        event.listen(Engine, "after_cursor_execute", record)
+        try:
+            yield profile
+        finally:
+            event.remove(Engine, "after_cursor_execute", record)
+        report = "\n".join(
+            f"{count} x {statement}"
+            for statement, (count, _) in profile.statements.items()
+        )
+        assert (
+            profile.count <= max_queries
+        ), f"{profile.count} queries, budget is {max_queries}:\n{report}"
+
+    return budget
+
+
 @pytest.fixture
 def sample_user(test_db):
     """Create a sample regular user"""
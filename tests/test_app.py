@@ -0,0 +1,37 @@
+"""
+Application factory tests
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from app.main import create_app
+
+
+@pytest.mark.unit
+class TestCreateApp:
+    """Test that the app is built by create_app, not on import"""
+
+    def test_import_builds_nothing(self):
+        """Test that importing app.main loads no router, model or engine"""
+        code = (
+            "import sys, app.main; "
+            "print(sorted(m for m in sys.modules if m.startswith(('routes', "
+            "'app.models', 'app.core.database'))))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+
+        assert result.stdout.strip() == "[]"
+
+    def test_each_call_builds_a_new_app(self):
+        """Test that create_app returns independent apps with every router"""
+        first, second = create_app(), create_app()
+
+        assert first is not second
+        paths = {route.path for route in first.routes}
+        assert {"/auth/login", "/orders/order", "/reports/orders"} <= paths
+        assert "/orders/stream/ws" in paths
@@ -118,3 +118,126 @@ class TestAuthEndpoints:
         data = response.json()
         assert "message" in data
         assert not data["authentication"]
+
+
+@pytest.mark.auth
+class TestAuthenticatedUserCache:
+    """Test the user cache and stateless mode of verify_token"""
+
+    def test_repeated_requests_hit_cache(self, client, user_token):
+        """Test that only the first request looks the user up"""
+        from app.models.dependencies import user_cache
+
+        headers = {"Authorization": f"Bearer {user_token}"}
+        client.get("/orders/", headers=headers)
+        hits = user_cache.hits
+
+        client.get("/orders/", headers=headers)
+        client.get("/orders/", headers=headers)
+
+        assert user_cache.hits == hits + 2
+
+    def test_admin_change_invalidates_cache(
+        self, client, user_token, sample_user, test_db
+    ):
+        """Test that promoting a user takes effect immediately"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        assert client.get("/orders/list", headers=headers).status_code == 403
+
+        sample_user.admin = True
+        test_db.commit()
+
+        assert client.get("/orders/list", headers=headers).status_code == 200
+
+    def test_stateless_mode_trusts_token_claims(
+        self, client, user_token, sample_user, test_db, monkeypatch
+    ):
+        """Test that stateless mode authorizes from claims without a lookup"""
+        from app.models import dependencies
+
+        monkeypatch.setattr(dependencies, "AUTH_STATELESS_TOKENS", True)
+        hits = dependencies.stateless_stats["hits"]
+        test_db.delete(sample_user)
+        test_db.commit()
+
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.get("/orders/", headers=headers)
+
+        assert response.status_code == 200
+        assert dependencies.stateless_stats["hits"] == hits + 1
+
+    def test_stateless_mode_falls_back_without_claims(
+        self, client, sample_user, monkeypatch
+    ):
+        """Test that tokens without admin/active claims still hit the database"""
+        from datetime import datetime, timedelta, timezone
+        from jose import jwt
+        from app.core.config import SECRET_KEY, ALGORITHM
+        from app.models import dependencies
+
+        monkeypatch.setattr(dependencies, "AUTH_STATELESS_TOKENS", True)
+        misses = dependencies.stateless_stats["misses"]
+        legacy_token = jwt.encode(
+            {
+                "sub": str(sample_user.id),
+                "exp": datetime.now(timezone.utc) + timedelta(minutes=5),
+            },
+            SECRET_KEY,
+            ALGORITHM,
+        )
+
+        headers = {"Authorization": f"Bearer {legacy_token}"}
+        response = client.get("/orders/", headers=headers)
+
+        assert response.status_code == 200
+        assert dependencies.stateless_stats["misses"] == misses + 1
+
+
+@pytest.mark.auth
+class TestVerifiedTokenCache:
+    """Test the cache of verified token claims"""
+
+    def test_repeated_requests_skip_decode(self, client, user_token):
+        """Test that a token is only verified on its first request"""
+        from app.models.dependencies import token_cache
+
+        headers = {"Authorization": f"Bearer {user_token}"}
+        client.get("/orders/", headers=headers)
+        hits, misses = token_cache.hits, token_cache.misses
+
+        client.get("/orders/", headers=headers)
+        client.get("/orders/", headers=headers)
+
+        assert token_cache.hits == hits + 2
+        assert token_cache.misses == misses
+
+    def test_entry_expires_with_the_token(self, client, sample_user, monkeypatch):
+        """Test that cached claims are dropped at the token's exp"""
+        from datetime import timedelta
+        from app.models import dependencies
+        from routes.auth_routes import create_token
+
+        now = [1000.0]
+        monkeypatch.setattr(dependencies.token_cache, "timer", lambda: now[0])
+        token = create_token(sample_user, token_lifetime=timedelta(seconds=60))
+
+        user_id, _ = dependencies.decode_token(token)
+        assert user_id == sample_user.id
+        assert dependencies.decode_token(token) is dependencies.decode_token(token)
+
+        now[0] += 61
+        assert len(dependencies.token_cache) == 1
+        assert (
+            dependencies.token_cache.get(next(iter(dependencies.token_cache._data)))
+            is None
+        )
+
+    def test_invalid_token_is_not_cached(self, client):
+        """Test that rejected tokens never enter the cache"""
+        from app.models.dependencies import token_cache
+
+        headers = {"Authorization": "Bearer not-a-token"}
+        response = client.get("/orders/", headers=headers)
+
+        assert response.status_code == 401
+        assert len(token_cache) == 0
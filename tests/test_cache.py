@@ -0,0 +1,54 @@
+"""
+In-process cache tests
+"""
+
+import pytest
+from app.core.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+class TestTTLCache:
+    """Test the bounded TTL + LRU cache"""
+
+    def test_entries_expire_after_ttl(self):
+        """Test that entries are dropped once their ttl elapses"""
+        clock = FakeClock()
+        cache = TTLCache(maxsize=10, ttl=5, timer=clock)
+        cache.set("a", 1)
+
+        clock.now = 4.9
+        assert cache.get("a") == 1
+        clock.now = 5.0
+        assert cache.get("a") is None
+        assert len(cache) == 0
+        assert cache.stats() == {"hits": 1, "misses": 1, "size": 0}
+
+    def test_explicit_expiry(self):
+        """Test per-entry absolute expiry"""
+        clock = FakeClock()
+        cache = TTLCache(maxsize=10, ttl=100, timer=clock)
+        cache.set("a", 1, expires_at=2)
+
+        clock.now = 2
+        assert cache.get("a") is None
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that the cache never grows beyond maxsize"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert len(cache) == 2
@@ -0,0 +1,163 @@
+"""
+Database layer tests
+"""
+
+import pytest
+from app.core.database import to_async_url
+
+
+@pytest.mark.unit
+class TestAsyncDatabaseUrl:
+    """Test mapping of DATABASE_URL onto asyncio drivers"""
+
+    def test_sqlite_uses_aiosqlite(self):
+        """Test that SQLite URLs use the aiosqlite driver"""
+        assert (
+            to_async_url("sqlite:///./data/dados.db")
+            == "sqlite+aiosqlite:///./data/dados.db"
+        )
+
+    def test_postgres_uses_asyncpg(self):
+        """Test that PostgreSQL URLs use asyncpg and keep credentials"""
+        assert (
+            to_async_url("postgresql+psycopg2://user:secret@db:5432/delivery")
+            == "postgresql+asyncpg://user:secret@db:5432/delivery"
+        )
+
+    def test_async_url_is_unchanged(self):
+        """Test that an URL already using an async driver is kept"""
+        url = "sqlite+aiosqlite:///:memory:"
+        assert to_async_url(url) == url
+
+
+@pytest.mark.unit
+class TestSqlitePerformanceProfile:
+    """Test that the SQLite pragmas are applied on connect"""
+
+    def test_pragmas_applied_to_new_connections(self, tmp_path):
+        """Test WAL, synchronous and busy_timeout on a file database"""
+        from sqlalchemy import create_engine, text
+        from app.core.database import SQLITE_PRAGMAS, apply_sqlite_pragmas
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+        apply_sqlite_pragmas(engine)
+        try:
+            with engine.connect() as connection:
+
+                def pragma(name):
+                    return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+                assert pragma("journal_mode") == "wal"
+                assert pragma("synchronous") == 1  # NORMAL
+                assert pragma("busy_timeout") == SQLITE_PRAGMAS["busy_timeout"]
+                assert pragma("temp_store") == 2  # MEMORY
+        finally:
+            engine.dispose()
+
+    async def test_pragmas_applied_to_async_engine(self, tmp_path):
+        """Test that aiosqlite connections get the same profile"""
+        from sqlalchemy import text
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from app.core.database import apply_sqlite_pragmas
+
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'a.db'}")
+        apply_sqlite_pragmas(engine.sync_engine, {"journal_mode": "WAL"})
+        try:
+            async with engine.connect() as connection:
+                mode = (await connection.execute(text("PRAGMA journal_mode"))).scalar()
+                assert mode == "wal"
+        finally:
+            await engine.dispose()
+
+
+@pytest.mark.integration
+class TestInitDb:
+    """Test the one-off schema setup behind ``python -m app.cli init-db``"""
+
+    def head_revision(self):
+        from alembic.config import Config
+        from alembic.script import ScriptDirectory
+        from app.core.database import ALEMBIC_INI
+
+        return ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_current_head()
+
+    def schema(self, url):
+        from sqlalchemy import create_engine, inspect, text
+
+        engine = create_engine(url)
+        try:
+            with engine.connect() as connection:
+                version = connection.execute(
+                    text("SELECT version_num FROM alembic_version")
+                ).scalar()
+                return set(inspect(connection).get_table_names()), version
+        finally:
+            engine.dispose()
+
+    def test_empty_database_is_migrated_to_head(self, tmp_path):
+        """Test that a new database gets every table and the head revision"""
+        from app.cli import main
+        from app.core.database import Base
+
+        url = f"sqlite:///{tmp_path / 'new' / 'app.db'}"
+
+        assert main(["init-db", "--database-url", url]) == 0
+        # rodar de novo (outro deploy) não muda nada
+        assert main(["init-db", "--database-url", url]) == 0
+
+        tables, version = self.schema(url)
+        assert set(Base.metadata.tables) <= tables
+        assert version == self.head_revision()
+
+    def test_database_from_create_all_is_migrated(self, tmp_path):
+        """Test that a schema made by the old create_all is migrated to head"""
+        from sqlalchemy import create_engine, inspect, text
+        from app.core.database import Base, init_db
+
+        url = f"sqlite:///{tmp_path / 'old.db'}"
+        engine = create_engine(url)
+        # schema que o create_all do startup gerava antes das migrações
+        with engine.begin() as connection:
+            for ddl in (
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR NOT NULL"
+                " UNIQUE, username VARCHAR, password VARCHAR, active BOOLEAN,"
+                " admin BOOLEAN)",
+                "CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER"
+                " REFERENCES users (id), status VARCHAR, price FLOAT)",
+                "CREATE TABLE order_items (id INTEGER PRIMARY KEY, quantity INTEGER,"
+                " flavor VARCHAR NOT NULL, size VARCHAR, unit_price FLOAT,"
+                " order_id INTEGER REFERENCES orders (id))",
+                "INSERT INTO users VALUES (1, 'a@a.com', 'a', 'x', 1, 0)",
+                "INSERT INTO orders VALUES (1, 1, 'PENDING', 25.98)",
+                "INSERT INTO order_items VALUES (1, 2, 'Calabresa', 'M', 12.99, 1)",
+            ):
+                connection.execute(text(ddl))
+        engine.dispose()
+
+        init_db(url)
+
+        tables, version = self.schema(url)
+        assert set(Base.metadata.tables) <= tables
+        assert version == self.head_revision()
+
+        engine = create_engine(url)
+        try:
+            with engine.connect() as connection:
+                columns = {
+                    table: {c["name"] for c in inspect(connection).get_columns(table)}
+                    for table in ("orders", "order_items")
+                }
+                row = connection.execute(
+                    text("SELECT price_cents, version FROM orders")
+                ).one()
+                unit = connection.execute(
+                    text("SELECT unit_price_cents FROM order_items")
+                ).scalar()
+        finally:
+            engine.dispose()
+        assert {"price_cents", "version", "created_at"} <= columns["orders"]
+        assert "price" not in columns["orders"]
+        assert "unit_price_cents" in columns["order_items"]
+        assert "unit_price" not in columns["order_items"]
+        assert tuple(row) == (2598, 1)
+        assert unit == 1299
@@ -0,0 +1,69 @@
+"""
+Password hashing pool tests
+"""
+
+import asyncio
+import threading
+
+import pytest
+from app.core.hashing import HashQueueFull, PasswordHasher
+
+
+@pytest.mark.unit
+class TestPasswordHasher:
+    """Test the bounded bcrypt worker pool"""
+
+    async def test_hash_and_verify(self):
+        """Test that hashes produced by the pool verify"""
+        hasher = PasswordHasher(workers=1, queue_size=1)
+        try:
+            hashed = await hasher.hash("secret123")
+            assert await hasher.verify("secret123", hashed)
+            assert not await hasher.verify("wrong", hashed)
+            assert hasher.metrics()["completed"] == 3
+        finally:
+            hasher.shutdown()
+
+    async def test_rejects_when_queue_is_full(self):
+        """Test that jobs beyond workers + queue_size fail fast"""
+        hasher = PasswordHasher(workers=1, queue_size=1)
+        release = threading.Event()
+        try:
+            running = [
+                asyncio.ensure_future(hasher._run(release.wait)) for _ in range(2)
+            ]
+            await asyncio.sleep(0)
+            assert hasher.queue_depth == 1
+
+            with pytest.raises(HashQueueFull):
+                await hasher.hash("secret123")
+            assert hasher.metrics()["rejected"] == 1
+
+            release.set()
+            await asyncio.gather(*running)
+            assert hasher.queue_depth == 0
+        finally:
+            release.set()
+            hasher.shutdown()
+
+
+@pytest.mark.auth
+class TestLoginUnderLoad:
+    """Test login behaviour when the hashing pool is saturated"""
+
+    def test_login_returns_503_when_pool_is_full(
+        self, client, sample_user, monkeypatch
+    ):
+        """Test that a full hashing queue answers 503 with Retry-After"""
+        from app.models.dependencies import password_hasher
+
+        monkeypatch.setattr(password_hasher, "queue_size", 0)
+        monkeypatch.setattr(password_hasher, "workers", 0)
+
+        response = client.post(
+            "/auth/login",
+            json={"email": "user@example.com", "password": "testpassword123"},
+        )
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,148 @@
+"""
+Idempotency-Key tests for the mutating order routes
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from app.core.idempotency import utcnow
+from app.models.tables import IdempotencyKey, Order, OrderItem
+
+ITEM = {"quantity": 1, "flavor": "Calabresa", "size": "Large", "unit_price": 12.5}
+
+
+@pytest.mark.orders
+class TestIdempotencyKey:
+    """Test that retried writes with the same key run only once"""
+
+    def test_replay_returns_stored_response(
+        self, client, user_token, sample_user, test_db
+    ):
+        """Test that a retried order creation replays the first response"""
+        headers = {"Authorization": f"Bearer {user_token}", "Idempotency-Key": "k1"}
+        payload = {"user_id": sample_user.id}
+
+        first = client.post("/orders/order", json=payload, headers=headers)
+        replay = client.post("/orders/order", json=payload, headers=headers)
+
+        assert first.status_code == replay.status_code == 200
+        assert replay.content == first.content
+        assert replay.headers["Idempotent-Replayed"] == "true"
+        assert "Idempotent-Replayed" not in first.headers
+        assert test_db.query(Order).count() == 1
+
+    def test_replay_skips_order_tables(
+        self, client, user_token, sample_order, test_db, query_budget
+    ):
+        """Test that a cached replay runs no statement against the orders"""
+        headers = {"Authorization": f"Bearer {user_token}", "Idempotency-Key": "k2"}
+        url = f"/orders/order/add-item/{sample_order.id}"
+        client.post(url, json=ITEM, headers=headers)
+
+        with query_budget(1) as profile:
+            response = client.post(url, json=ITEM, headers=headers)
+
+        assert response.status_code == 200
+        assert not any("order" in statement for statement in profile.statements)
+        assert test_db.query(OrderItem).count() == 1
+
+    def test_different_request_with_same_key_is_422(
+        self, client, user_token, sample_order, test_db
+    ):
+        """Test that a key cannot be reused for another payload"""
+        headers = {"Authorization": f"Bearer {user_token}", "Idempotency-Key": "k3"}
+        url = f"/orders/order/add-item/{sample_order.id}"
+        client.post(url, json=ITEM, headers=headers)
+
+        response = client.post(url, json={**ITEM, "quantity": 2}, headers=headers)
+
+        assert response.status_code == 422
+        assert test_db.query(OrderItem).count() == 1
+
+    def test_key_in_progress_is_409(
+        self, client, user_token, sample_user, sample_order, test_db
+    ):
+        """Test that a retry while the first request still runs is rejected"""
+        test_db.add(
+            IdempotencyKey(
+                user_id=sample_user.id,
+                key="k4",
+                fingerprint="running",
+                expires_at=utcnow() + timedelta(minutes=1),
+            )
+        )
+        test_db.commit()
+        headers = {"Authorization": f"Bearer {user_token}", "Idempotency-Key": "k4"}
+
+        response = client.post(
+            f"/orders/order/add-item/{sample_order.id}", json=ITEM, headers=headers
+        )
+
+        assert response.status_code == 409
+        assert test_db.query(OrderItem).count() == 0
+
+    def test_expired_key_can_be_reused(
+        self, client, user_token, sample_user, sample_order, test_db
+    ):
+        """Test that an abandoned reservation is taken over once it expires"""
+        test_db.add(
+            IdempotencyKey(
+                user_id=sample_user.id,
+                key="k5",
+                fingerprint="abandoned",
+                expires_at=utcnow() - timedelta(seconds=1),
+            )
+        )
+        test_db.commit()
+        headers = {"Authorization": f"Bearer {user_token}", "Idempotency-Key": "k5"}
+
+        response = client.post(
+            f"/orders/order/add-item/{sample_order.id}", json=ITEM, headers=headers
+        )
+
+        assert response.status_code == 200
+        assert test_db.query(OrderItem).count() == 1
+
+    def test_failed_request_releases_key(
+        self, client, user_token, sample_order, test_db
+    ):
+        """Test that an error response is not stored and the key can be retried"""
+        headers = {"Authorization": f"Bearer {user_token}", "Idempotency-Key": "k6"}
+
+        missing = client.post(
+            "/orders/order/add-item/99999", json=ITEM, headers=headers
+        )
+        retried = client.post(
+            f"/orders/order/add-item/{sample_order.id}", json=ITEM, headers=headers
+        )
+
+        assert missing.status_code == 404
+        assert retried.status_code == 200
+        assert test_db.query(IdempotencyKey).one().status_code == 200
+
+    def test_keys_are_scoped_per_user(
+        self, client, user_token, admin_token, sample_order, test_db
+    ):
+        """Test that two users can use the same key independently"""
+        url = f"/orders/order/add-item/{sample_order.id}"
+        for token in (user_token, admin_token):
+            headers = {"Authorization": f"Bearer {token}", "Idempotency-Key": "k7"}
+            response = client.post(url, json=ITEM, headers=headers)
+            assert response.status_code == 200
+            assert "Idempotent-Replayed" not in response.headers
+
+        assert test_db.query(OrderItem).count() == 2
+
+    def test_without_key_nothing_is_stored(
+        self, client, user_token, sample_order, test_db
+    ):
+        """Test that requests without the header behave as before"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        url = f"/orders/order/add-item/{sample_order.id}"
+
+        client.post(url, json=ITEM, headers=headers)
+        client.post(url, json=ITEM, headers=headers)
+
+        assert test_db.query(OrderItem).count() == 2
+        assert test_db.query(IdempotencyKey).count() == 0
@@ -0,0 +1,46 @@
+"""
+Load benchmark reporting tests
+"""
+
+import pytest
+from benchmarks.loadtest import Recorder, compare, percentile
+
+
+@pytest.mark.unit
+class TestLoadTestReport:
+    """Test percentile reporting and baseline comparison"""
+
+    def test_percentile_nearest_rank(self):
+        """Test nearest-rank percentiles"""
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+        assert percentile([7], 99) == 7
+
+    def test_summary_groups_by_route(self):
+        """Test per-route counts, errors and throughput"""
+        recorder = Recorder()
+        recorder.latencies["GET /orders/list"] = [0.01, 0.02, 0.03]
+        recorder.errors["GET /orders/list"] = 1
+
+        summary = recorder.summary(elapsed=1.5)
+
+        route = summary["routes"]["GET /orders/list"]
+        assert route["count"] == 3
+        assert route["errors"] == 1
+        assert route["p50_ms"] == pytest.approx(20)
+        assert summary["throughput_rps"] == pytest.approx(2)
+
+    def test_compare_flags_p95_regressions(self):
+        """Test that only routes slower than the tolerance are reported"""
+        baseline = {"routes": {"a": {"p95_ms": 10.0}, "b": {"p95_ms": 10.0}}}
+        current = {
+            "routes": {
+                "a": {"p95_ms": 11.0},
+                "b": {"p95_ms": 13.0},
+                "new": {"p95_ms": 99.0},
+            }
+        }
+
+        assert compare(baseline, current, tolerance=0.2) == [("b", 10.0, 13.0)]
@@ -0,0 +1,130 @@
+"""
+Prometheus metrics tests
+"""
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import (
+    DB_POOL_CHECKOUT,
+    DB_QUERIES,
+    DB_QUERY_DURATION,
+    Registry,
+    instrument_engine,
+)
+
+
+@pytest.mark.unit
+class TestRegistry:
+    """Test the text exposition format"""
+
+    def test_counter_and_gauge(self):
+        """Test that labelled samples render with HELP/TYPE headers"""
+        registry = Registry()
+        requests = registry.counter("requests_total", "Requests.", ("route",))
+        in_flight = registry.gauge("in_flight", "In flight.")
+        requests.labels('/a"b').inc()
+        requests.labels('/a"b').inc(2)
+        in_flight.set(3)
+
+        lines = registry.render().splitlines()
+
+        assert lines == [
+            "# HELP requests_total Requests.",
+            "# TYPE requests_total counter",
+            'requests_total{route="/a\\"b"} 3',
+            "# HELP in_flight In flight.",
+            "# TYPE in_flight gauge",
+            "in_flight 3",
+        ]
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that every bucket counts the observations at or below it"""
+        registry = Registry()
+        latency = registry.histogram("latency", "Latency.", ("route",), (0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            latency.labels("/x").observe(value)
+
+        body = registry.render()
+
+        assert 'latency_bucket{route="/x",le="0.1"} 2' in body
+        assert 'latency_bucket{route="/x",le="1.0"} 3' in body
+        assert 'latency_bucket{route="/x",le="+Inf"} 4' in body
+        assert 'latency_sum{route="/x"} 2.65' in body
+        assert 'latency_count{route="/x"} 4' in body
+
+    def test_collect_callbacks_run_on_render(self):
+        """Test that on_collect callbacks update values before rendering"""
+        registry = Registry()
+        size = registry.gauge("size", "Size.")
+        registry.on_collect(lambda: size.set(7))
+
+        assert "size 7" in registry.render()
+
+    def test_wrong_label_count(self):
+        """Test that a label count mismatch is rejected"""
+        registry = Registry()
+        requests = registry.counter("requests_total", "Requests.", ("route",))
+
+        with pytest.raises(ValueError):
+            requests.labels()
+
+
+@pytest.mark.unit
+class TestInstrumentEngine:
+    """Test the SQLAlchemy engine hooks"""
+
+    def test_counts_queries_and_checkouts(self):
+        """Test that statements and pool checkouts are recorded"""
+        engine = create_engine("sqlite://")
+        instrument_engine(engine, "test")
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+
+            assert DB_QUERIES.labels("test").value == 2
+            assert DB_QUERY_DURATION.labels("test").count == 2
+            assert DB_POOL_CHECKOUT.labels("test").count == 1
+        finally:
+            engine.dispose()
+            for metric in (DB_QUERIES, DB_QUERY_DURATION, DB_POOL_CHECKOUT):
+                metric._children.pop(("test",), None)
+
+
+@pytest.mark.integration
+class TestMetricsEndpoint:
+    """Test the /metrics endpoint"""
+
+    def test_exposes_route_latency(self, client, user_token, sample_order):
+        """Test that requests are recorded under their route template"""
+        client.get(
+            f"/orders/order/{sample_order.id}",
+            headers={"Authorization": f"Bearer {user_token}"},
+        )
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert (
+            'http_request_duration_seconds_count{method="GET",'
+            'route="/orders/order/{order_id}"}' in body
+        )
+        assert (
+            'http_requests_total{method="POST",route="/auth/login",status="200"}'
+            in body
+        )
+        assert 'password_hash_duration_seconds_count{operation="verify"}' in body
+        assert 'auth_user_cache_requests_total{result="miss"}' in body
+
+    def test_unmatched_paths_share_one_series(self, client):
+        """Test that unknown paths do not create a series per path"""
+        client.get("/does-not-exist/1")
+        client.get("/does-not-exist/2")
+
+        body = client.get("/metrics").text
+
+        assert 'route="unmatched",status="404"' in body
+        assert "/does-not-exist" not in body
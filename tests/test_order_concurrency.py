@@ -0,0 +1,257 @@
+"""
+Concurrency tests: parallel writes on one order, on a SQLite file
+"""
+
+import asyncio
+import sqlite3
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import routes.order_routes as order_routes
+from app.core.database import SessionRouter, apply_sqlite_pragmas
+from app.main import app
+from app.models.tables import Order, OrderItem
+from routes.auth_routes import create_token
+
+ITEM = {"quantity": 1, "flavor": "Calabresa", "size": "Large", "unit_price": 12.5}
+
+
+@pytest.fixture
+def database(file_database):
+    return file_database("orders")
+
+
+@pytest.fixture
+def order_db(database):
+    """A file database with one user and one empty order"""
+    order = Order(user_id=database.user.id)
+    database.session.add(order)
+    database.session.commit()
+    return database.session, database.user, order
+
+
+@pytest.fixture
+async def concurrent_client(database, order_db, route_sessions):
+    apply_sqlite_pragmas(database.async_engine.sync_engine)
+    route_sessions(
+        SessionRouter(
+            async_sessionmaker(bind=database.async_engine, expire_on_commit=False)
+        )
+    )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+@pytest.mark.integration
+class TestConcurrentOrderWrites:
+    """Test that parallel changes on one order never lose or repeat an update"""
+
+    async def test_parallel_add_items_keep_price_consistent(
+        self, concurrent_client, order_db
+    ):
+        """Test that the price and version match the items that were committed"""
+        session, user, order = order_db
+        headers = {"Authorization": f"Bearer {create_token(user)}"}
+
+        responses = await asyncio.gather(
+            *(
+                concurrent_client.post(
+                    f"/orders/order/add-item/{order.id}", json=ITEM, headers=headers
+                )
+                for _ in range(25)
+            )
+        )
+
+        assert [response.status_code for response in responses] == [200] * 25
+        session.expire_all()
+        stored = session.get(Order, order.id)
+        items = session.query(OrderItem).filter_by(order_id=order.id).count()
+        assert items == 25
+        assert stored.price_cents == 25 * 1250
+        assert stored.version == 1 + 25
+
+    async def test_parallel_removes_of_one_item_subtract_once(
+        self, concurrent_client, order_db
+    ):
+        """Test that racing removals of the same item only discount it once"""
+        session, user, order = order_db
+        headers = {"Authorization": f"Bearer {create_token(user)}"}
+        for _ in range(2):
+            await concurrent_client.post(
+                f"/orders/order/add-item/{order.id}", json=ITEM, headers=headers
+            )
+        item_id = session.query(OrderItem).filter_by(order_id=order.id).first().id
+
+        responses = await asyncio.gather(
+            *(
+                concurrent_client.post(
+                    f"/orders/order/remove-item/{item_id}", headers=headers
+                )
+                for _ in range(5)
+            )
+        )
+
+        statuses = sorted(response.status_code for response in responses)
+        assert statuses == [200, 404, 404, 404, 404]
+        session.expire_all()
+        assert session.get(Order, order.id).price_cents == 1250
+
+    async def test_parallel_removes_of_different_items_all_succeed(
+        self, concurrent_client, order_db
+    ):
+        """Test that removals of different items on one order never answer 409"""
+        session, user, order = order_db
+        headers = {"Authorization": f"Bearer {create_token(user)}"}
+        await concurrent_client.post(
+            f"/orders/order/add-items/{order.id}", json=[ITEM] * 25, headers=headers
+        )
+        item_ids = [
+            item.id for item in session.query(OrderItem).filter_by(order_id=order.id)
+        ]
+
+        responses = await asyncio.gather(
+            *(
+                concurrent_client.post(
+                    f"/orders/order/remove-item/{item_id}", headers=headers
+                )
+                for item_id in item_ids
+            )
+        )
+
+        assert [response.status_code for response in responses] == [200] * 25
+        session.expire_all()
+        stored = session.get(Order, order.id)
+        assert stored.price_cents == 0
+        assert stored.version == 1 + 1 + 25
+
+    async def test_status_change_and_item_add_race(self, concurrent_client, order_db):
+        """Test that a concurrent cancel and item add both land on one version"""
+        session, user, order = order_db
+        headers = {"Authorization": f"Bearer {create_token(user)}"}
+
+        added, canceled = await asyncio.gather(
+            concurrent_client.post(
+                f"/orders/order/add-item/{order.id}", json=ITEM, headers=headers
+            ),
+            concurrent_client.post(f"/orders/order/cancel/{order.id}", headers=headers),
+        )
+
+        assert added.status_code == 200
+        assert canceled.status_code == 200
+        session.expire_all()
+        stored = session.get(Order, order.id)
+        assert stored.status == "CANCELED"
+        assert stored.price_cents == 1250
+        assert stored.version == 3
+
+    async def test_locked_database_is_retried_then_409(
+        self, concurrent_client, order_db, monkeypatch
+    ):
+        """Test that a locked database on add-item retries and answers 409, not 500"""
+        session, user, order = order_db
+        headers = {"Authorization": f"Bearer {create_token(user)}"}
+        monkeypatch.setattr(order_routes, "ORDER_CONFLICT_RETRIES", 2)
+        monkeypatch.setattr(order_routes, "ORDER_CONFLICT_BACKOFF_MS", 0)
+        attempts = []
+
+        async def locked(*args, **kwargs):
+            attempts.append(1)
+            raise locked_error()
+
+        monkeypatch.setattr(order_routes, "apply_price_delta", locked)
+
+        response = await concurrent_client.post(
+            f"/orders/order/add-item/{order.id}", json=ITEM, headers=headers
+        )
+
+        assert response.status_code == 409
+        assert len(attempts) == 3
+        session.expire_all()
+        assert session.query(OrderItem).filter_by(order_id=order.id).count() == 0
+
+
+def locked_error():
+    return OperationalError(
+        "UPDATE orders", {}, sqlite3.OperationalError("database is locked")
+    )
+
+
+class PostgresError(Exception):
+    pgcode = "40001"
+
+
+class FakeSession:
+    def __init__(self):
+        self.rollbacks = 0
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.mark.unit
+class TestRetryOnConflict:
+    """Test the retry loop around order writes that lose a lock race"""
+
+    @pytest.fixture(autouse=True)
+    def no_backoff(self, monkeypatch):
+        monkeypatch.setattr(order_routes, "ORDER_CONFLICT_RETRIES", 2)
+        monkeypatch.setattr(order_routes, "ORDER_CONFLICT_BACKOFF_MS", 0)
+
+    async def test_retries_until_success(self):
+        """Test that a conflict is rolled back and the operation runs again"""
+        session = FakeSession()
+        attempts = []
+
+        async def operation():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise locked_error()
+            return "done"
+
+        assert await order_routes.retry_on_conflict(session, operation) == "done"
+        assert len(attempts) == 3
+        assert session.rollbacks == 2
+
+    async def test_conflict_after_last_retry_is_409(self):
+        """Test that running out of retries answers 409"""
+        session = FakeSession()
+
+        async def operation():
+            raise locked_error()
+
+        with pytest.raises(HTTPException) as error:
+            await order_routes.retry_on_conflict(session, operation)
+        assert error.value.status_code == 409
+        assert session.rollbacks == 3
+
+    async def test_lock_errors_are_retried(self):
+        """Test that SQLite locked and Postgres serialization errors are conflicts"""
+        session = FakeSession()
+        errors = [
+            locked_error(),
+            OperationalError("UPDATE orders", {}, PostgresError("could not serialize")),
+        ]
+
+        async def operation():
+            if errors:
+                raise errors.pop(0)
+            return "done"
+
+        assert await order_routes.retry_on_conflict(session, operation) == "done"
+        assert session.rollbacks == 2
+
+    async def test_other_database_errors_are_not_retried(self):
+        """Test that a database error that is not a lock race is raised as is"""
+        session = FakeSession()
+
+        async def operation():
+            raise IntegrityError("INSERT", {}, sqlite3.IntegrityError("NOT NULL"))
+
+        with pytest.raises(IntegrityError):
+            await order_routes.retry_on_conflict(session, operation)
+        assert session.rollbacks == 0
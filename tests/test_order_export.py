@@ -0,0 +1,126 @@
+"""
+Streaming order export tests
+"""
+
+import csv
+import io
+import json
+from collections import namedtuple
+from datetime import datetime
+
+import pytest
+
+from app.core.order_export import ndjson_export
+from app.models.tables import Order, OrderItem
+
+Row = namedtuple(
+    "Row",
+    "id user_id status price_cents created_at item_id quantity flavor size "
+    "unit_price_cents",
+)
+
+
+@pytest.fixture
+def export_orders(test_db, sample_user):
+    """Three orders on different days, the first two with items"""
+    orders = []
+    for day, status in ((1, "PENDING"), (2, "FINISHED"), (3, "CANCELED")):
+        order = Order(user_id=sample_user.id, status=status)
+        order.created_at = datetime(2026, 10, day, 12)
+        test_db.add(order)
+        test_db.flush()
+        if day < 3:
+            order.items = [
+                OrderItem(1, "Calabresa", "Large", 10.0, order.id),
+                OrderItem(2, "Mussarela", "Small", 5.5, order.id),
+            ]
+            order.calculate_price()
+        orders.append(order)
+    test_db.commit()
+    return orders
+
+
+@pytest.mark.orders
+class TestOrderExport:
+    """Test GET /orders/export"""
+
+    def test_ndjson_nests_items(self, client, admin_token, export_orders):
+        """Test that each NDJSON line is one order with its items"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        response = client.get("/orders/export", headers=headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["id"] for line in lines] == [order.id for order in export_orders]
+        assert [len(line["items"]) for line in lines] == [2, 2, 0]
+        assert lines[0]["price"] == 21.0
+        assert lines[0]["items"][1]["unit_price"] == 5.5
+        assert lines[0]["created_at"] == "2026-10-01T12:00:00"
+
+    def test_csv_one_row_per_item(self, client, admin_token, export_orders):
+        """Test that the CSV has a header and one row per item"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        response = client.get("/orders/export?format=csv", headers=headers)
+
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 5
+        assert rows[-1]["status"] == "CANCELED"
+        assert rows[-1]["flavor"] == ""
+        assert rows[1]["unit_price"] == "5.5"
+
+    def test_filters(self, client, admin_token, export_orders):
+        """Test the status, date and id range filters"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        first, second, third = export_orders
+
+        def exported(query):
+            response = client.get(f"/orders/export?{query}", headers=headers)
+            return [json.loads(line)["id"] for line in response.text.splitlines()]
+
+        assert exported("status=FINISHED") == [second.id]
+        assert exported(
+            "created_from=2026-10-02T00:00:00&created_to=2026-10-03T00:00:00"
+        ) == [second.id]
+        assert exported("created_from=2026-10-02T09:30:00-03:00") == [third.id]
+        assert exported(f"min_id={second.id}&max_id={third.id}") == [
+            second.id,
+            third.id,
+        ]
+
+    def test_export_requires_admin(self, client, user_token):
+        """Test that regular users cannot export orders"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        response = client.get("/orders/export", headers=headers)
+
+        assert response.status_code == 403
+
+
+@pytest.mark.unit
+class TestNdjsonExport:
+    """Test the grouping of joined rows into orders"""
+
+    async def test_order_split_across_batches(self):
+        """Test that an order whose items span two batches stays one line"""
+        created_at = datetime(2026, 10, 1)
+
+        async def partitions():
+            yield [
+                Row(1, 7, "PENDING", 1000, created_at, 10, 1, "A", "L", 500),
+                Row(1, 7, "PENDING", 1000, created_at, 11, 1, "B", "L", 500),
+            ]
+            yield [
+                Row(1, 7, "PENDING", 1000, created_at, 12, 1, "C", "L", 0),
+                Row(2, 7, "PENDING", 0, created_at, None, None, None, None, None),
+            ]
+
+        chunks = [chunk async for chunk in ndjson_export(partitions())]
+
+        lines = [json.loads(line) for line in b"".join(chunks).splitlines()]
+        assert len(chunks) == 2
+        assert [len(line["items"]) for line in lines] == [3, 0]
+        assert lines[0]["items"][2]["flavor"] == "C"
@@ -0,0 +1,203 @@
+"""
+Bulk order import tests: NDJSON/CSV parsing, chunked inserts and the CLI
+"""
+
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.cli import run_import
+import app.core.order_import as order_import
+from app.core.order_import import iter_lines
+from app.models.tables import Order, OrderItem
+
+ITEM = {"quantity": 2, "flavor": "Calabresa", "size": "Large", "unit_price": 12.5}
+
+
+def ndjson(*orders):
+    return "\n".join(
+        order if isinstance(order, str) else json.dumps(order) for order in orders
+    )
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+@pytest.mark.unit
+class TestIterLines:
+    """Test that a byte stream is split into lines"""
+
+    async def test_lines_split_across_chunks(self):
+        """Test that lines and multi-byte characters can span chunks"""
+        data = "a,ç\r\nsecond\nlast".encode()
+        parts = [data[:3], data[3:9], data[9:]]
+
+        lines = [line async for line in iter_lines(chunks(*parts))]
+
+        assert lines == ["a,ç", "second", "last"]
+
+
+@pytest.mark.orders
+class TestImportEndpoint:
+    """Test POST /orders/import"""
+
+    def test_ndjson_import_with_row_errors(
+        self, client, admin_token, sample_user, test_db
+    ):
+        """Test that valid orders are imported and bad rows only get reported"""
+        body = ndjson(
+            {"user_id": sample_user.id, "items": [ITEM, ITEM]},
+            "{not json",
+            {"user_id": sample_user.id, "status": "LOST"},
+            {"user_id": 9999},
+            {"user_id": sample_user.id, "status": "FINISHED"},
+        )
+
+        response = client.post(
+            "/orders/import?chunk_size=2",
+            content=body,
+            headers={"Authorization": f"Bearer {admin_token}"},
+        )
+
+        assert response.status_code == 200
+        report = response.json()
+        assert (report["rows"], report["orders"], report["items"]) == (5, 2, 2)
+        assert report["errors"] == 3
+        assert [error["line"] for error in report["error_samples"]] == [2, 3, 4]
+        assert "status" in report["error_samples"][1]["error"]
+        assert "user 9999" in report["error_samples"][2]["error"]
+        orders = test_db.query(Order).order_by(Order.id).all()
+        assert [(order.status, order.price_cents) for order in orders] == [
+            ("PENDING", 5000),
+            ("FINISHED", 0),
+        ]
+        assert test_db.query(OrderItem).filter_by(order_id=orders[0].id).count() == 2
+
+    def test_error_samples_follow_line_order(
+        self, client, admin_token, sample_user, monkeypatch
+    ):
+        """Test that chunk errors and row errors are reported in file order"""
+        monkeypatch.setattr(order_import, "MAX_REPORTED_ERRORS", 3)
+        body = ndjson(
+            {"user_id": 9999},
+            "{not json",
+            {"user_id": sample_user.id},
+            {"user_id": 9998},
+            "{not json",
+        )
+
+        response = client.post(
+            "/orders/import?chunk_size=3",
+            content=body,
+            headers={"Authorization": f"Bearer {admin_token}"},
+        )
+
+        report = response.json()
+        assert report["errors"] == 4
+        assert [error["line"] for error in report["error_samples"]] == [1, 2, 4]
+        assert "user 9999" in report["error_samples"][0]["error"]
+
+    def test_csv_import_groups_items(self, client, admin_token, sample_user, test_db):
+        """Test that consecutive CSV rows of one order_ref make one order"""
+        user_id = sample_user.id
+        body = "\n".join(
+            [
+                "order_ref,user_id,status,quantity,flavor,size,unit_price",
+                f"a,{user_id},,1,Calabresa,Large,10.00",
+                f"a,{user_id},,3,Mussarela,Small,5.50",
+                f"b,{user_id},CANCELED,,,,",
+                f"c,{user_id},,x,Calabresa,Large,10.00",
+            ]
+        )
+
+        response = client.post(
+            "/orders/import",
+            content=body,
+            headers={
+                "Authorization": f"Bearer {admin_token}",
+                "Content-Type": "text/csv",
+            },
+        )
+
+        report = response.json()
+        assert (report["rows"], report["orders"], report["items"]) == (3, 2, 2)
+        assert report["error_samples"][0]["line"] == 5
+        orders = test_db.query(Order).order_by(Order.id).all()
+        assert [(order.status, order.price_cents) for order in orders] == [
+            ("PENDING", 2650),
+            ("CANCELED", 0),
+        ]
+
+    def test_csv_missing_columns(self, client, admin_token):
+        """Test that a CSV without the required header is rejected as a row error"""
+        response = client.post(
+            "/orders/import?format=csv",
+            content="user_id,flavor\n1,Calabresa",
+            headers={"Authorization": f"Bearer {admin_token}"},
+        )
+
+        report = response.json()
+        assert report["orders"] == 0
+        assert "missing columns" in report["error_samples"][0]["error"]
+
+    def test_import_requires_admin(self, client, user_token, sample_user):
+        """Test that regular users cannot import orders"""
+        response = client.post(
+            "/orders/import",
+            content=ndjson({"user_id": sample_user.id}),
+            headers={"Authorization": f"Bearer {user_token}"},
+        )
+
+        assert response.status_code == 403
+
+    def test_import_ignores_idempotency_key(
+        self, client, admin_token, sample_user, test_db
+    ):
+        """Test that the streamed import is not buffered for an Idempotency-Key"""
+        headers = {"Authorization": f"Bearer {admin_token}", "Idempotency-Key": "k1"}
+        body = ndjson({"user_id": sample_user.id})
+
+        responses = [
+            client.post("/orders/import", content=body, headers=headers)
+            for _ in range(2)
+        ]
+
+        assert [response.status_code for response in responses] == [200, 200]
+        assert "Idempotent-Replayed" not in responses[1].headers
+        assert test_db.query(Order).count() == 2
+
+
+@pytest.mark.integration
+class TestImportCli:
+    """Test the import-orders command"""
+
+    async def test_import_file_in_chunks(self, file_database, tmp_path, query_budget):
+        """Test that each chunk is written with one items statement"""
+        session, user, async_engine = file_database("import")
+        session_factory = async_sessionmaker(bind=async_engine)
+        path = tmp_path / "orders.ndjson"
+        path.write_text(
+            ndjson(*({"user_id": user.id, "items": [ITEM, ITEM]} for _ in range(10)))
+        )
+
+        # por lote: usuários + pedidos + um executemany de itens + rollup +
+        # eventos; o SQLite não tem lote para RETURNING em ordem, então cada
+        # pedido é um INSERT
+        with query_budget(3 + 10 + 3 + 3 + 3) as profile:
+            report = await run_import(str(path), None, 4, session_factory)
+
+        assert (report["orders"], report["items"], report["errors"]) == (10, 20, 0)
+        item_inserts = [
+            count
+            for statement, (count, _) in profile.statements.items()
+            if statement.startswith("INSERT INTO order_items")
+        ]
+        assert item_inserts == [3]
+        assert session.query(Order).count() == 10
+        assert session.query(OrderItem).count() == 20
+        assert {item.order_id for item in session.query(OrderItem)} == {
+            order.id for order in session.query(Order)
+        }
@@ -84,6 +84,23 @@ class TestOrderEndpoints:
         assert "item_id" in data
         assert "order_price" in data
 
+    def test_add_item_updates_order_price(self, client, user_token, sample_order):
+        """Test that the returned price includes the item just added"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        payload = {
+            "quantity": 2,
+            "flavor": "Pepperoni",
+            "size": "Large",
+            "unit_price": 15.99,
+        }
+
+        response = client.post(
+            f"/orders/order/add-item/{sample_order.id}", json=payload, headers=headers
+        )
+
+        assert response.status_code == 200
+        assert response.json()["order_price"] == pytest.approx(31.98)
+
     def test_add_item_to_nonexistent_order(self, client, user_token):
         """Test adding item to non-existent order"""
         headers = {"Authorization": f"Bearer {user_token}"}
@@ -104,7 +121,7 @@ class TestOrderEndpoints:
         """Test that user cannot add items to another user's order"""
         # Create another user's order
         from app.models.tables import User, Order
-        from app.main import bcrypt_context
+        from app.core.hashing import bcrypt_context
 
         other_user = User(
             email="other@example.com",
@@ -184,7 +201,7 @@ class TestOrderEndpoints:
     def test_visualize_other_user_order(self, client, user_token, test_db):
         """Test that user cannot view another user's order"""
         from app.models.tables import User, Order
-        from app.main import bcrypt_context
+        from app.core.hashing import bcrypt_context
 
         other_user = User(
             email="another@example.com",
@@ -297,3 +314,388 @@ class TestOrderPriceCalculation:
 
         expected_price = (2 * 15.99) + (1 * 12.99)
         assert sample_order.price == expected_price
+
+
+@pytest.mark.orders
+class TestOrderPagination:
+    """Test keyset pagination and filters on order listings"""
+
+    @pytest.fixture
+    def many_orders(self, test_db, sample_user):
+        from app.models.tables import Order
+
+        orders = [Order(user_id=sample_user.id) for _ in range(5)]
+        orders[-1].status = "CANCELED"
+        test_db.add_all(orders)
+        test_db.commit()
+        return [order.id for order in orders]
+
+    def test_list_all_orders_pages_with_cursor(self, client, admin_token, many_orders):
+        """Test walking the admin listing page by page"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        first = client.get("/orders/list?limit=2", headers=headers).json()
+        assert [order["id"] for order in first["orders"]] == many_orders[:2]
+        assert first["next_cursor"] == many_orders[1]
+
+        second = client.get(
+            f"/orders/list?limit=2&after={first['next_cursor']}", headers=headers
+        ).json()
+        assert [order["id"] for order in second["orders"]] == many_orders[2:4]
+
+        last = client.get(
+            f"/orders/list?limit=2&after={second['next_cursor']}", headers=headers
+        ).json()
+        assert [order["id"] for order in last["orders"]] == many_orders[4:]
+        assert last["next_cursor"] is None
+
+    def test_list_all_orders_filters(
+        self, client, admin_token, sample_user, many_orders
+    ):
+        """Test status and user_id filters on the admin listing"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        response = client.get("/orders/list?status=CANCELED", headers=headers)
+        assert [order["id"] for order in response.json()["orders"]] == [many_orders[-1]]
+
+        response = client.get(
+            f"/orders/list?user_id={sample_user.id + 100}", headers=headers
+        )
+        assert response.json()["orders"] == []
+
+    def test_list_user_orders_next_cursor_header(self, client, user_token, many_orders):
+        """Test that the user listing exposes the next cursor as a header"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        response = client.get("/orders/list/order-user?limit=3", headers=headers)
+
+        assert len(response.json()) == 3
+        assert response.headers["X-Next-Cursor"] == str(many_orders[2])
+
+    def test_list_rejects_oversized_page(self, client, admin_token):
+        """Test that the page size is bounded"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = client.get("/orders/list?limit=100000", headers=headers)
+        assert response.status_code == 422
+
+
+@pytest.mark.orders
+class TestBatchItems:
+    """Test batch item insertion and single-request checkout"""
+
+    ITEMS = [
+        {"quantity": 2, "flavor": "Pepperoni", "size": "Large", "unit_price": 15.99},
+        {"quantity": 1, "flavor": "Margherita", "size": "Medium", "unit_price": 12.99},
+        {"quantity": 3, "flavor": "Calabresa", "size": "Small", "unit_price": 9.5},
+    ]
+
+    def test_add_items_in_one_request(self, client, user_token, sample_order, test_db):
+        """Test adding several items to an order at once"""
+        from app.models.tables import OrderItem
+
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.post(
+            f"/orders/order/add-items/{sample_order.id}",
+            json=self.ITEMS,
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["item_ids"]) == 3
+        assert data["order_price"] == pytest.approx(2 * 15.99 + 12.99 + 3 * 9.5)
+        stored = test_db.query(OrderItem).filter_by(order_id=sample_order.id).count()
+        assert stored == 3
+
+    def test_add_empty_items_is_rejected(
+        self, client, user_token, sample_order, test_db
+    ):
+        """Test that an empty batch answers 422 and leaves the order alone"""
+        from app.models.tables import Order, OutboxEvent
+
+        version = sample_order.version
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.post(
+            f"/orders/order/add-items/{sample_order.id}", json=[], headers=headers
+        )
+
+        assert response.status_code == 422
+        test_db.expire_all()
+        assert test_db.get(Order, sample_order.id).version == version
+        assert test_db.query(OutboxEvent).count() == 0
+
+    def test_add_items_to_other_user_order(
+        self, client, admin_token, user_token, sample_admin
+    ):
+        """Test that batch insertion checks order ownership"""
+        admin_headers = {"Authorization": f"Bearer {admin_token}"}
+        response = client.post(
+            "/orders/order/with-items",
+            json={"user_id": sample_admin.id, "items": []},
+            headers=admin_headers,
+        )
+        order_id = response.json()["order_id"]
+
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.post(
+            f"/orders/order/add-items/{order_id}", json=self.ITEMS, headers=headers
+        )
+        assert response.status_code == 403
+
+    def test_create_order_with_items(self, client, user_token, sample_user, test_db):
+        """Test creating an order and its items in a single request"""
+        from app.models.tables import Order
+
+        headers = {"Authorization": f"Bearer {user_token}"}
+        response = client.post(
+            "/orders/order/with-items",
+            json={"user_id": sample_user.id, "items": self.ITEMS},
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["item_ids"]) == 3
+        order = test_db.get(Order, data["order_id"])
+        assert len(order.items) == 3
+        assert order.price == pytest.approx(data["order_price"])
+
+
+@pytest.mark.unit
+class TestOrderPriceCents:
+    """Test integer-cent storage and SQL-side price maintenance"""
+
+    def test_to_cents_rounds_half_up(self):
+        """Test conversion of currency values to integer cents"""
+        from app.models.tables import to_cents
+
+        assert to_cents(15.99) == 1599
+        assert to_cents(0.1) == 10
+        assert to_cents(2.675) == 268
+
+    def test_repeated_additions_do_not_drift(self, client, user_token, sample_order):
+        """Test that many small items sum exactly"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        payload = {"quantity": 1, "flavor": "Mini", "size": "Small", "unit_price": 0.1}
+
+        for _ in range(10):
+            response = client.post(
+                f"/orders/order/add-item/{sample_order.id}",
+                json=payload,
+                headers=headers,
+            )
+
+        assert response.json()["order_price"] == 1.0
+
+    def test_remove_item_subtracts_line_total(
+        self, client, user_token, sample_order_with_items
+    ):
+        """Test that removing an item subtracts exactly its line total"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        item = sample_order_with_items.items[0]
+
+        response = client.post(f"/orders/order/remove-item/{item.id}", headers=headers)
+
+        order = response.json()["order"]
+        assert order["price"] == 12.99
+        assert "price_cents" not in order
+
+    def test_responses_keep_currency_prices(
+        self, client, user_token, sample_order_with_items
+    ):
+        """Test that order payloads show price/unit_price, not the cent columns"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        response = client.get(
+            f"/orders/order/{sample_order_with_items.id}", headers=headers
+        )
+
+        order = response.json()["order"]
+        assert order["price"] == pytest.approx(44.97)
+        assert sorted(item["unit_price"] for item in order["items"]) == [12.99, 15.99]
+        assert "price_cents" not in order
+        assert all("unit_price_cents" not in item for item in order["items"])
+
+
+@pytest.mark.orders
+class TestOrderResponseModels:
+    """Test that order routes answer with their declared schemas"""
+
+    def test_visualize_order_shape(self, client, user_token, sample_order_with_items):
+        """Test the order detail payload"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        response = client.get(
+            f"/orders/order/{sample_order_with_items.id}", headers=headers
+        )
+
+        order = response.json()["order"]
+        assert set(order) == {"id", "user_id", "status", "price", "version", "items"}
+        assert order["price"] == pytest.approx(2 * 15.99 + 12.99)
+        assert set(order["items"][0]) == {
+            "id",
+            "quantity",
+            "flavor",
+            "size",
+            "unit_price",
+        }
+
+    def test_status_change_shape(self, client, user_token, sample_order):
+        """Test that status changes return the order without internal columns"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        response = client.post(
+            f"/orders/order/finish/{sample_order.id}", headers=headers
+        )
+
+        assert response.headers["content-type"] == "application/json"
+        assert response.json()["order"] == {
+            "id": sample_order.id,
+            "user_id": sample_order.user_id,
+            "status": "FINISHED",
+            "price": 0.0,
+            "version": 2,
+        }
+
+
+@pytest.mark.orders
+class TestConditionalGet:
+    """Test ETag / If-None-Match on order reads"""
+
+    ITEM = {"quantity": 1, "flavor": "Calabresa", "size": "Large", "unit_price": 20.0}
+
+    def test_order_not_modified(
+        self, client, user_token, sample_order_with_items, query_budget
+    ):
+        """Test that an unchanged order answers 304 from a single lookup"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        url = f"/orders/order/{sample_order_with_items.id}"
+        etag = client.get(url, headers=headers).headers["ETag"]
+
+        with query_budget(1):
+            response = client.get(url, headers={**headers, "If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+
+    def test_order_changes_invalidate_etag(self, client, user_token, sample_order):
+        """Test that item and status changes produce a new ETag"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        url = f"/orders/order/{sample_order.id}"
+        etags = [client.get(url, headers=headers).headers["ETag"]]
+
+        client.post(
+            f"/orders/order/add-item/{sample_order.id}", json=self.ITEM, headers=headers
+        )
+        response = client.get(url, headers={**headers, "If-None-Match": etags[-1]})
+        assert response.status_code == 200
+        etags.append(response.headers["ETag"])
+
+        client.post(f"/orders/order/finish/{sample_order.id}", headers=headers)
+        response = client.get(url, headers={**headers, "If-None-Match": etags[-1]})
+        assert response.status_code == 200
+        assert response.json()["order"]["status"] == "FINISHED"
+        etags.append(response.headers["ETag"])
+
+        assert len(set(etags)) == 3
+
+    def test_not_modified_requires_permission(
+        self, client, admin_token, user_token, sample_admin
+    ):
+        """Test that a matching ETag does not bypass the ownership check"""
+        response = client.post(
+            "/orders/order/with-items",
+            json={"user_id": sample_admin.id, "items": []},
+            headers={"Authorization": f"Bearer {admin_token}"},
+        )
+        order_id = response.json()["order_id"]
+
+        response = client.get(
+            f"/orders/order/{order_id}",
+            headers={"Authorization": f"Bearer {user_token}", "If-None-Match": "*"},
+        )
+
+        assert response.status_code == 403
+
+    def test_user_listing_not_modified(self, client, user_token, sample_user):
+        """Test the aggregate ETag of a user's order page"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        client.post("/orders/order", json={"user_id": sample_user.id}, headers=headers)
+        etag = client.get("/orders/list/order-user", headers=headers).headers["ETag"]
+
+        response = client.get(
+            "/orders/list/order-user", headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 304
+
+        client.post("/orders/order", json={"user_id": sample_user.id}, headers=headers)
+        response = client.get(
+            "/orders/list/order-user", headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        assert response.headers["ETag"] != etag
+
+
+@pytest.mark.orders
+class TestStatusTransitions:
+    """Test single-statement cancel/finish with the transition table"""
+
+    def test_finish_reads_nothing_before_the_update(
+        self, client, user_token, sample_order, query_budget
+    ):
+        """Test that the ownership and status checks ride on the UPDATE"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        client.get("/orders/", headers=headers)
+
+        # UPDATE do pedido + os dois rollups + o evento no outbox
+        with query_budget(4) as profile:
+            response = client.post(
+                f"/orders/order/finish/{sample_order.id}", headers=headers
+            )
+
+        assert response.status_code == 200
+        assert not [
+            statement
+            for statement in profile.statements
+            if statement.startswith("SELECT")
+        ]
+        assert response.json()["order"]["status"] == "FINISHED"
+
+    @pytest.mark.parametrize(
+        "first, second",
+        [("finish", "cancel"), ("cancel", "finish"), ("cancel", "cancel")],
+    )
+    def test_only_pending_orders_change(
+        self, client, user_token, sample_order, test_db, first, second
+    ):
+        """Test that a closed order cannot change status again"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        client.post(f"/orders/order/{first}/{sample_order.id}", headers=headers)
+
+        response = client.post(
+            f"/orders/order/{second}/{sample_order.id}", headers=headers
+        )
+
+        assert response.status_code == 409
+        test_db.refresh(sample_order)
+        assert sample_order.status == ("FINISHED" if first == "finish" else "CANCELED")
+
+    def test_permission_is_checked_before_transition(self, client, user_token, test_db):
+        """Test that another user's closed order answers 403, not 409"""
+        from app.models.tables import User, Order
+
+        other = User(email="other@example.com", username="o", password="x", active=True)
+        test_db.add(other)
+        test_db.commit()
+        order = Order(user_id=other.id, status="FINISHED")
+        test_db.add(order)
+        test_db.commit()
+
+        response = client.post(
+            f"/orders/order/cancel/{order.id}",
+            headers={"Authorization": f"Bearer {user_token}"},
+        )
+
+        assert response.status_code == 403
@@ -0,0 +1,270 @@
+"""
+Order event outbox tests: events written with each order change and their dispatch
+"""
+
+import asyncio
+import json
+
+import pytest
+import requests
+
+from app.core.metrics import OUTBOX_DELIVERY_LAG
+from app.core.outbox import (
+    FileSink,
+    OutboxDispatcher,
+    QueueSink,
+    SinkFull,
+    WebhookSink,
+)
+from app.models.dependencies import order_broker, outbox_dispatcher
+from app.models.tables import OutboxEvent
+
+ITEM = {"quantity": 2, "flavor": "Calabresa", "size": "Large", "unit_price": 10.0}
+
+
+class FailingSink:
+    name = "failing"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def send(self, events):
+        self.calls += 1
+        raise ConnectionError("sink is down")
+
+    def close(self):
+        pass
+
+
+def outbox_rows(test_db):
+    test_db.expire_all()
+    return test_db.query(OutboxEvent).order_by(OutboxEvent.id).all()
+
+
+@pytest.fixture
+def order_events(client, user_token, sample_user):
+    """An order created with items, changed and finished through the API"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    created = client.post(
+        "/orders/order/with-items",
+        json={"user_id": sample_user.id, "items": [ITEM, ITEM]},
+        headers=headers,
+    ).json()
+    order_id = created["order_id"]
+    client.post(f"/orders/order/add-item/{order_id}", json=ITEM, headers=headers)
+    client.post(f"/orders/order/remove-item/{created['item_ids'][0]}", headers=headers)
+    client.post(f"/orders/order/finish/{order_id}", headers=headers)
+    return created
+
+
+@pytest.fixture
+def dispatcher(client):
+    """Build dispatchers on the test database; run them with client.portal"""
+
+    def build(sinks, **options):
+        return OutboxDispatcher(outbox_dispatcher.session_factory, sinks, **options)
+
+    return build
+
+
+@pytest.fixture
+def background_dispatcher(client):
+    """Run the app's dispatcher task with only a queue sink and a long poll"""
+    queue_sink = QueueSink()
+    sinks, poll_interval = outbox_dispatcher.sinks, outbox_dispatcher.poll_interval
+    outbox_dispatcher.sinks, outbox_dispatcher.poll_interval = [queue_sink], 60
+    outbox_dispatcher.enabled = True
+    outbox_dispatcher.reset_stats()
+    client.portal.call(outbox_dispatcher.start)
+    yield queue_sink
+    client.portal.call(outbox_dispatcher.stop)
+    outbox_dispatcher.sinks, outbox_dispatcher.poll_interval = sinks, poll_interval
+    outbox_dispatcher.enabled = False
+    outbox_dispatcher.reset_stats()
+
+
+@pytest.mark.orders
+class TestOutboxEvents:
+    """Test that order changes write their events in the same transaction"""
+
+    def test_order_changes_write_events(self, test_db, order_events):
+        """Test one event per change, in order, with the order state after it"""
+        rows = outbox_rows(test_db)
+
+        assert [row.event_type for row in rows] == [
+            "order.created",
+            "order.items_added",
+            "order.item_removed",
+            "order.finished",
+        ]
+        payloads = [json.loads(row.payload) for row in rows]
+        assert [payload["price"] for payload in payloads] == [40.0, 60.0, 40.0, 40.0]
+        assert [payload["version"] for payload in payloads] == [1, 2, 3, 4]
+        assert payloads[-1]["status"] == "FINISHED"
+        assert payloads[2]["items"][0]["id"] == order_events["item_ids"][0]
+        assert payloads[1]["items"][0]["id"] is not None
+
+    def test_rejected_change_writes_no_event(
+        self, client, user_token, sample_order, test_db
+    ):
+        """Test that a failed transition leaves the outbox untouched"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        client.post(f"/orders/order/cancel/{sample_order.id}", headers=headers)
+
+        response = client.post(
+            f"/orders/order/finish/{sample_order.id}", headers=headers
+        )
+
+        assert response.status_code == 409
+        assert [row.event_type for row in outbox_rows(test_db)] == ["order.canceled"]
+
+    def test_no_sinks_writes_no_event(
+        self, client, user_token, sample_order, test_db, monkeypatch
+    ):
+        """Test that without sinks nothing is written, but live updates still go out"""
+        monkeypatch.setattr("app.core.outbox.OUTBOX_ENABLED", False)
+        subscription = order_broker.subscribe(sample_order.user_id)
+        headers = {"Authorization": f"Bearer {user_token}"}
+        try:
+            client.post(f"/orders/order/finish/{sample_order.id}", headers=headers)
+        finally:
+            order_broker.unsubscribe(subscription)
+
+        assert outbox_rows(test_db) == []
+        assert [update["type"] for update in subscription.messages] == [
+            "order.finished"
+        ]
+
+
+@pytest.mark.orders
+class TestOutboxDispatcher:
+    """Test the batched delivery of outbox events to the sinks"""
+
+    def test_batch_goes_to_every_sink(
+        self, client, test_db, order_events, dispatcher, tmp_path
+    ):
+        """Test that a batch reaches the queue and file sinks and leaves the outbox"""
+        queue_sink = QueueSink()
+        subscriber = queue_sink.subscribe()
+        path = tmp_path / "events.ndjson"
+        instance = dispatcher([queue_sink, FileSink(str(path))], batch_size=3)
+
+        assert client.portal.call(instance.dispatch_batch) == 3
+        assert client.portal.call(instance.dispatch_batch) == 1
+        assert client.portal.call(instance.dispatch_batch) == 0
+
+        received = [subscriber.get_nowait() for _ in range(subscriber.qsize())]
+        written = [json.loads(line) for line in path.read_text().splitlines()]
+        assert received == written
+        assert [event["type"] for event in received] == [
+            "order.created",
+            "order.items_added",
+            "order.item_removed",
+            "order.finished",
+        ]
+        assert received[0]["order_id"] == order_events["order_id"]
+        assert instance.delivered == {"queue": 4, "file": 4}
+        assert outbox_rows(test_db) == []
+
+    def test_failed_batch_is_retried_then_given_up(
+        self, client, test_db, order_events, dispatcher
+    ):
+        """Test that a failing sink keeps the events until max_attempts"""
+        sink = FailingSink()
+        instance = dispatcher([sink], batch_size=10, max_attempts=2)
+
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                client.portal.call(instance.dispatch_batch)
+
+        rows = outbox_rows(test_db)
+        assert len(rows) == 4
+        assert {row.attempts for row in rows} == {2}
+        assert all(row.failed_at is not None for row in rows)
+        assert rows[0].last_error == "failing: sink is down"
+        assert (instance.failures, instance.dead) == ({"failing": 2}, 4)
+        # esgotadas as tentativas, saem da fila
+        assert client.portal.call(instance.dispatch_batch) == 0
+        assert sink.calls == 2
+
+    def test_backoff_grows_to_the_cap(self):
+        """Test the exponential retry delay"""
+        instance = OutboxDispatcher(None, [], retry_base=0.5, retry_max=3.0)
+
+        assert [instance.backoff(n) for n in range(1, 6)] == [0.5, 1.0, 2.0, 3.0, 3.0]
+
+    def test_commit_wakes_the_background_task(
+        self, client, user_token, sample_user, background_dispatcher
+    ):
+        """Test that events are delivered right after the commit, not at the next poll"""
+        subscriber = background_dispatcher.subscribe()
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        client.post("/orders/order", json={"user_id": sample_user.id}, headers=headers)
+
+        async def next_event():
+            return await asyncio.wait_for(subscriber.get(), 5)
+
+        event = client.portal.call(next_event)
+        assert event["type"] == "order.created"
+        assert event["user_id"] == sample_user.id
+
+    def test_metrics_expose_delivery(self, client, order_events):
+        """Test the outbox series on /metrics"""
+        queue_sink = outbox_dispatcher.sink("queue")
+        subscriber = queue_sink.subscribe()
+        delivered_before = OUTBOX_DELIVERY_LAG.labels().count
+        try:
+            client.portal.call(outbox_dispatcher.dispatch_batch)
+            body = client.get("/metrics").text
+        finally:
+            queue_sink.unsubscribe(subscriber)
+
+        assert 'outbox_events_delivered_total{sink="queue"} 4' in body
+        assert "outbox_subscriber_backlog 4" in body
+        assert "outbox_lag_seconds " in body
+        assert OUTBOX_DELIVERY_LAG.labels().count == delivered_before + 4
+
+
+@pytest.mark.unit
+class TestSinks:
+    """Test the sinks on their own"""
+
+    async def test_full_subscriber_rejects_whole_batch(self):
+        """Test that a batch is enqueued for every subscriber or for none"""
+        sink = QueueSink()
+        roomy = sink.subscribe(10)
+        tight = sink.subscribe(2)
+
+        with pytest.raises(SinkFull):
+            await sink.send([{"id": 1}, {"id": 2}, {"id": 3}])
+
+        assert (roomy.qsize(), tight.qsize()) == (0, 0)
+        await sink.send([{"id": 1}, {"id": 2}])
+        assert (roomy.qsize(), tight.qsize()) == (2, 2)
+
+    async def test_queue_without_subscribers_drops_events(self):
+        """Test that nobody listening is not a failure"""
+        await QueueSink().send([{"id": 1}])
+
+    async def test_webhook_posts_batch(self, monkeypatch):
+        """Test that the webhook gets a JSON array and fails on an error status"""
+        sink = WebhookSink("http://kitchen.local/events")
+        calls = []
+
+        def post(url, data, headers, timeout):
+            calls.append((url, json.loads(data)))
+            response = requests.Response()
+            response.status_code = 200 if len(calls) == 1 else 503
+            return response
+
+        monkeypatch.setattr(sink.http, "post", post)
+
+        await sink.send([{"id": 1}])
+        with pytest.raises(requests.HTTPError):
+            await sink.send([{"id": 2}])
+
+        assert calls == [
+            ("http://kitchen.local/events", [{"id": 1}]),
+            ("http://kitchen.local/events", [{"id": 2}]),
+        ]
@@ -0,0 +1,124 @@
+"""
+Per-request query profiler tests
+"""
+
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.profiler import QueryProfile, QueryProfilerMiddleware, normalize_statement
+from app.models.tables import Order
+
+
+@pytest.mark.unit
+class TestNormalizeStatement:
+    """Test that statements differing only in parameters look the same"""
+
+    def test_parameters_and_literals(self):
+        """Test that placeholders and literals are replaced"""
+        assert normalize_statement(
+            "SELECT * FROM orders WHERE id = ? AND status = 'PENDING'"
+        ) == normalize_statement("SELECT * FROM orders WHERE id = 7 AND status = 'X'")
+        assert normalize_statement("SELECT $1, %(id)s, %s") == "SELECT ?, ?, ?"
+
+    def test_in_lists_collapse(self):
+        """Test that IN lists of any size share one shape"""
+        assert normalize_statement("WHERE id IN (?, ?, ?)") == "WHERE id IN (?)"
+        assert normalize_statement("WHERE id IN (?)") == "WHERE id IN (?)"
+
+
+@pytest.mark.unit
+class TestQueryProfile:
+    """Test statement grouping"""
+
+    def test_repeated(self):
+        """Test that only shapes at or above the threshold are reported"""
+        profile = QueryProfile()
+        for order_id in range(6):
+            profile.record(f"SELECT * FROM items WHERE order_id = {order_id}", 0.001)
+        profile.record("SELECT * FROM orders", 0.002)
+
+        repeated = profile.repeated(threshold=5)
+
+        assert profile.count == 7
+        assert [(statement, count) for statement, count, _ in repeated] == [
+            ("SELECT * FROM items WHERE order_id = ?", 6)
+        ]
+
+
+@pytest.fixture
+def profiled_client():
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+    app.add_middleware(QueryProfilerMiddleware, n_plus_one=3)
+
+    @app.get("/loop/{times}")
+    async def loop(times: int):
+        with engine.connect() as conn:
+            for value in range(times):
+                conn.execute(text("SELECT :value"), {"value": value})
+        return {"ok": True}
+
+    with TestClient(app) as test_client:
+        yield test_client
+    engine.dispose()
+
+
+@pytest.mark.integration
+class TestQueryProfilerMiddleware:
+    """Test the profiling headers and N+1 logging"""
+
+    def test_headers(self, profiled_client):
+        """Test that the query count and DB time are reported"""
+        response = profiled_client.get("/loop/2")
+
+        assert response.headers["X-Query-Count"] == "2"
+        assert response.headers["X-DB-Time"].endswith("ms")
+
+    def test_logs_n_plus_one_with_route_name(self, profiled_client, caplog):
+        """Test that a repeated statement is logged with the route name"""
+        with caplog.at_level(logging.WARNING, logger="app.profiler"):
+            profiled_client.get("/loop/2")
+            assert not caplog.records
+
+            profiled_client.get("/loop/4")
+
+        (record,) = caplog.records
+        assert "N+1 suspect in loop (GET /loop/{times})" in record.getMessage()
+        assert "4 x" in record.getMessage()
+
+
+@pytest.mark.orders
+class TestQueryBudgets:
+    """Test that order endpoints keep a fixed number of queries"""
+
+    def test_visualize_order(
+        self, client, user_token, sample_order_with_items, query_budget
+    ):
+        """Test that an order and its items load in a fixed number of queries"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+        client.get(f"/orders/order/{sample_order_with_items.id}", headers=headers)
+
+        with query_budget(2):
+            response = client.get(
+                f"/orders/order/{sample_order_with_items.id}", headers=headers
+            )
+        assert response.status_code == 200
+
+    def test_listing_does_not_grow_with_orders(
+        self, client, admin_token, test_db, sample_user, query_budget
+    ):
+        """Test that listing many orders does not issue a query per order"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        test_db.add_all([Order(user_id=sample_user.id) for _ in range(20)])
+        test_db.commit()
+        client.get("/orders/list", headers=headers)
+
+        with query_budget(2) as profile:
+            response = client.get("/orders/list", headers=headers)
+
+        assert len(response.json()["orders"]) == 20
+        assert not profile.repeated(threshold=2)
@@ -0,0 +1,90 @@
+"""
+Query plan tests: every statement issued by the routes must use an index
+"""
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ITEM = {"quantity": 1, "flavor": "Calabresa", "size": "Large", "unit_price": 20.0}
+
+
+@pytest.fixture
+def captured_statements():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            parameters = parameters[0]
+        statements.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(Engine, "before_cursor_execute", capture)
+
+
+def exercise_routes(client, user_token, admin_token, user_id):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+
+    order_id = client.post(
+        "/orders/order/with-items",
+        json={"user_id": user_id, "items": [ITEM, ITEM]},
+        headers=headers,
+    ).json()["order_id"]
+    item_id = client.post(
+        f"/orders/order/add-item/{order_id}", json=ITEM, headers=headers
+    ).json()["item_id"]
+    client.post(f"/orders/order/add-items/{order_id}", json=[ITEM], headers=headers)
+    client.post(f"/orders/order/remove-item/{item_id}", headers=headers)
+    client.get(f"/orders/order/{order_id}", headers=headers)
+    conditional = {**headers, "If-None-Match": '"stale"'}
+    client.get(f"/orders/order/{order_id}", headers=conditional)
+    client.get("/orders/list/order-user?status=PENDING", headers=conditional)
+    client.get("/orders/list/order-user?limit=1", headers=headers)
+    client.get(f"/orders/list/order-user?after={order_id}", headers=headers)
+    client.get("/orders/list", headers=admin_headers)
+    client.get("/orders/list?status=PENDING", headers=admin_headers)
+    client.get(f"/orders/list?user_id={user_id}", headers=admin_headers)
+    client.post(f"/orders/order/finish/{order_id}", headers=headers)
+    new_order = client.post(
+        "/orders/order/with-items",
+        json={"user_id": user_id, "items": []},
+        headers=headers,
+    ).json()["order_id"]
+    client.post(f"/orders/order/cancel/{new_order}", headers=headers)
+
+
+@pytest.mark.integration
+class TestRouteQueryPlans:
+    """Run EXPLAIN QUERY PLAN on the statements each route issues"""
+
+    def test_no_route_query_scans_a_table(
+        self,
+        client,
+        user_token,
+        admin_token,
+        sample_user,
+        test_engine,
+        captured_statements,
+    ):
+        """Test that no statement falls back to a full table scan"""
+        exercise_routes(client, user_token, admin_token, sample_user.id)
+
+        queries = {
+            (statement, tuple(parameters))
+            for statement, parameters in captured_statements
+            if not statement.lstrip().upper().startswith(("INSERT", "PRAGMA"))
+        }
+        assert queries
+
+        connection = test_engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            for statement, parameters in sorted(queries):
+                cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                plan = [row[3] for row in cursor.fetchall()]
+                scans = [step for step in plan if step.startswith("SCAN")]
+                assert not scans, f"{statement!r} scans: {plan}"
+        finally:
+            connection.close()
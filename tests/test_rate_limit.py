@@ -0,0 +1,163 @@
+"""
+Rate limiting tests for the authentication routes
+"""
+
+import pytest
+
+from app.core.ratelimit import (
+    MemoryRateLimitBackend,
+    RateLimiter,
+    SQLiteRateLimitBackend,
+    take_token,
+)
+from app.models.dependencies import email_rate_limiter, ip_rate_limiter
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+class TestTokenBucket:
+    """Test the refill and take arithmetic"""
+
+    def test_take_until_empty(self):
+        """Test that a full bucket lets ``capacity`` requests through"""
+        tokens, _, retry_after = take_token(2, 0.0, 1.0, 2, 0.0)
+        assert (tokens, retry_after) == (1, 0.0)
+        tokens, _, retry_after = take_token(tokens, 0.0, 1.0, 2, 0.0)
+        assert (tokens, retry_after) == (0, 0.0)
+        tokens, full_at, retry_after = take_token(tokens, 0.0, 1.0, 2, 0.0)
+        assert (tokens, retry_after, full_at) == (0, 1.0, 2.0)
+
+    def test_refill_is_capped(self):
+        """Test that idle time never refills past the capacity"""
+        tokens, full_at, _ = take_token(0, 0.0, 1.0, 3, 100.0)
+        assert tokens == 2
+        assert full_at == 101.0
+
+
+@pytest.mark.unit
+class TestMemoryBackend:
+    """Test the in-process backend"""
+
+    async def test_limit_and_refill(self):
+        """Test that a key is blocked after its burst and let in after a refill"""
+        timer = FakeTimer()
+        limiter = RateLimiter(MemoryRateLimitBackend(timer=timer), "ip", 60, 2)
+
+        assert await limiter.hit("1.2.3.4") == 0.0
+        assert await limiter.hit("1.2.3.4") == 0.0
+        assert await limiter.hit("1.2.3.4") == pytest.approx(1.0)
+        assert await limiter.hit("5.6.7.8") == 0.0
+
+        timer.now += 1
+        assert await limiter.hit("1.2.3.4") == 0.0
+
+    async def test_memory_is_bounded(self):
+        """Test that refilled buckets are evicted and the key count is capped"""
+        timer = FakeTimer()
+        backend = MemoryRateLimitBackend(maxsize=3, timer=timer)
+        limiter = RateLimiter(backend, "ip", 60, 5)
+
+        for n in range(10):
+            await limiter.hit(n)
+        assert len(backend) == 3
+
+        timer.now += 60
+        await limiter.hit("new")
+        assert len(backend) == 1
+
+    async def test_zero_rate_disables(self):
+        """Test that a limit of 0 per minute lets everything through"""
+        limiter = RateLimiter(MemoryRateLimitBackend(), "ip", 0, 0)
+        assert all([await limiter.hit("x") == 0.0 for _ in range(100)])
+
+
+@pytest.mark.unit
+class TestSQLiteBackend:
+    """Test the backend shared between workers"""
+
+    async def test_workers_share_one_limit(self, tmp_path):
+        """Test that two backends on one file enforce a single bucket"""
+        path = str(tmp_path / "ratelimit.db")
+        timer = FakeTimer()
+        first = RateLimiter(SQLiteRateLimitBackend(path, timer=timer), "email", 60, 2)
+        second = RateLimiter(SQLiteRateLimitBackend(path, timer=timer), "email", 60, 2)
+
+        assert await first.hit("a@example.com") == 0.0
+        assert await second.hit("a@example.com") == 0.0
+        assert await first.hit("a@example.com") == pytest.approx(1.0)
+        assert await second.hit("b@example.com") == 0.0
+
+    async def test_purges_refilled_buckets(self, tmp_path):
+        """Test that rows of full buckets are deleted"""
+        timer = FakeTimer()
+        backend = SQLiteRateLimitBackend(
+            str(tmp_path / "ratelimit.db"), purge_every=2, timer=timer
+        )
+        limiter = RateLimiter(backend, "ip", 60, 1)
+        await limiter.hit("old")
+
+        timer.now += 10
+        await limiter.hit("new")
+
+        keys = backend._connect().execute("SELECT key FROM rate_limit_buckets")
+        assert [key for (key,) in keys] == ["ip:new"]
+
+
+@pytest.mark.auth
+class TestAuthRateLimit:
+    """Test that login attempts are limited before any bcrypt work"""
+
+    def test_login_by_email_returns_429(self, client, sample_user, monkeypatch):
+        """Test that repeated logins for one email get 429 with Retry-After"""
+        monkeypatch.setattr(email_rate_limiter, "burst", 2)
+        payload = {"email": "User@Example.com", "password": "wrong"}
+
+        statuses = [
+            client.post("/auth/login", json=payload).status_code for _ in range(2)
+        ]
+        response = client.post(
+            "/auth/login", json={**payload, "email": "user@example.com"}
+        )
+
+        assert statuses == [400, 400]
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+    def test_login_form_by_ip(self, client, sample_user, monkeypatch):
+        """Test that one client is limited across emails"""
+        monkeypatch.setattr(ip_rate_limiter, "burst", 3)
+
+        statuses = [
+            client.post(
+                "/auth/login-form",
+                data={"username": f"user{n}@example.com", "password": "x"},
+            ).status_code
+            for n in range(4)
+        ]
+
+        assert statuses == [400, 400, 400, 429]
+
+    def test_create_account_is_limited(self, client, monkeypatch):
+        """Test that account creation shares the per-IP limit"""
+        monkeypatch.setattr(ip_rate_limiter, "burst", 1)
+        user = {
+            "email": "new@example.com",
+            "username": "new",
+            "password": "pw123456",
+            "active": True,
+        }
+
+        first = client.post("/auth/create_account", json=user)
+        second = client.post(
+            "/auth/create_account", json={**user, "email": "other@example.com"}
+        )
+
+        assert first.status_code == 200
+        assert second.status_code == 429
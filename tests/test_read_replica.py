@@ -0,0 +1,83 @@
+"""
+Read/write session routing tests, using two SQLite files as primary and replica
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.database import SessionRouter
+from app.main import app
+from app.models.tables import Order, User
+from routes.auth_routes import create_token
+
+
+@pytest.fixture
+def file_databases(file_database):
+    """Primary and replica files with the same user in both"""
+    return {name: file_database(name) for name in ("primary", "replica")}
+
+
+@pytest.fixture
+def databases(file_databases):
+    return {name: database.session for name, database in file_databases.items()}
+
+
+@pytest.fixture
+def router(file_databases):
+    primary, replica = (
+        async_sessionmaker(bind=database.async_engine, expire_on_commit=False)
+        for database in (file_databases["primary"], file_databases["replica"])
+    )
+    return SessionRouter(primary, replica, read_your_writes_seconds=60)
+
+
+@pytest.fixture
+def routed_client(router, route_sessions):
+    route_sessions(router)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def headers(databases):
+    user = databases["primary"].get(User, 1)
+    return {"Authorization": f"Bearer {create_token(user)}"}
+
+
+@pytest.mark.integration
+class TestReadReplicaRouting:
+    """Test that reads go to the replica and writes to the primary"""
+
+    def test_get_reads_from_replica(self, routed_client, databases, headers):
+        """Test that GET routes are served by the replica"""
+        databases["replica"].add(Order(user_id=1))
+        databases["replica"].commit()
+
+        response = routed_client.get("/orders/list/order-user", headers=headers)
+
+        assert len(response.json()) == 1
+
+    def test_writes_go_to_primary(self, routed_client, databases, headers):
+        """Test that POST routes are served by the primary"""
+        response = routed_client.post(
+            "/orders/order", json={"user_id": 1}, headers=headers
+        )
+
+        assert response.status_code == 200
+        assert databases["primary"].query(Order).count() == 1
+        assert databases["replica"].query(Order).count() == 0
+
+    def test_reads_stay_on_primary_after_a_write(
+        self, routed_client, router, databases, headers
+    ):
+        """Test read-your-writes right after a mutation"""
+        routed_client.post("/orders/order", json={"user_id": 1}, headers=headers)
+
+        response = routed_client.get("/orders/list/order-user", headers=headers)
+        assert len(response.json()) == 1
+
+        # once the guard window is over, reads go back to the replica
+        router.recent_writers.clear()
+        response = routed_client.get("/orders/list/order-user", headers=headers)
+        assert response.json() == []
@@ -0,0 +1,209 @@
+"""
+Sales report tests: rollups kept by the order writes and their rebuild
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.cli import run_rebuild
+from app.models.tables import (
+    DailyItemStats,
+    DailyOrderStats,
+    Order,
+    OrderItem,
+    utcnow,
+)
+from tests.conftest import TEST_ASYNC_DATABASE_URL
+
+ITEM = {"quantity": 2, "flavor": "Calabresa", "size": "Large", "unit_price": 10.0}
+
+
+def rollups(test_db):
+    # linhas zeradas ficam na tabela incremental mas não no rebuild
+    test_db.expire_all()
+    orders = {
+        (row.day, row.status): (row.orders, row.revenue_cents)
+        for row in test_db.query(DailyOrderStats)
+        if row.orders or row.revenue_cents
+    }
+    items = {
+        (row.day, row.flavor, row.size): (row.quantity, row.revenue_cents)
+        for row in test_db.query(DailyItemStats)
+        if row.quantity or row.revenue_cents
+    }
+    return orders, items
+
+
+@pytest.fixture
+def rebuild(client):
+    """Run rebuild-rollups against the test database"""
+    engine = create_async_engine(
+        TEST_ASYNC_DATABASE_URL,
+        connect_args={"check_same_thread": False, "uri": True},
+    )
+    yield lambda: client.portal.call(run_rebuild, async_sessionmaker(bind=engine))
+    client.portal.call(engine.dispose)
+
+
+@pytest.fixture
+def order_activity(client, user_token, sample_user):
+    """Orders created and changed through the API: finished, canceled, pending"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+
+    def create(items):
+        response = client.post(
+            "/orders/order/with-items",
+            json={"user_id": sample_user.id, "items": items},
+            headers=headers,
+        )
+        return response.json()
+
+    finished = create([ITEM, {**ITEM, "flavor": "Mussarela", "size": "Small"}])
+    client.post(f"/orders/order/remove-item/{finished['item_ids'][1]}", headers=headers)
+    client.post(
+        f"/orders/order/add-item/{finished['order_id']}",
+        json={**ITEM, "quantity": 1, "flavor": "Portuguesa"},
+        headers=headers,
+    )
+    client.post(f"/orders/order/finish/{finished['order_id']}", headers=headers)
+    # item somado depois de finalizado também conta como vendido
+    client.post(
+        f"/orders/order/add-item/{finished['order_id']}",
+        json={**ITEM, "quantity": 1},
+        headers=headers,
+    )
+
+    canceled = create([ITEM])
+    client.post(f"/orders/order/cancel/{canceled['order_id']}", headers=headers)
+
+    client.post("/orders/order", json={"user_id": sample_user.id}, headers=headers)
+    return finished, canceled
+
+
+@pytest.mark.orders
+class TestRollups:
+    """Test that the order writes keep the rollups up to date"""
+
+    def test_writes_update_rollups(self, test_db, order_activity):
+        """Test status counts and sold items after add, remove, finish and cancel"""
+        orders, items = rollups(test_db)
+        day = utcnow().date()
+
+        assert orders == {
+            (day, "FINISHED"): (1, 4000),
+            (day, "CANCELED"): (1, 2000),
+            (day, "PENDING"): (1, 0),
+        }
+        assert items == {
+            (day, "Calabresa", "Large"): (3, 3000),
+            (day, "Portuguesa", "Large"): (1, 1000),
+        }
+
+    def test_rebuild_matches_incremental(self, test_db, order_activity, rebuild):
+        """Test that rebuild-rollups computes what the writes accumulated"""
+        incremental = rollups(test_db)
+
+        rebuild()
+
+        assert rollups(test_db) == incremental
+
+    def test_rebuild_counts_existing_orders(self, test_db, sample_user, rebuild):
+        """Test that orders written outside the API are picked up by a rebuild"""
+        order = Order(user_id=sample_user.id, status="FINISHED")
+        order.created_at = datetime(2026, 10, 1, 12)
+        test_db.add(order)
+        test_db.flush()
+        order.items = [OrderItem(2, "Calabresa", "Large", 10.0, order.id)]
+        order.calculate_price()
+        test_db.commit()
+
+        rebuild()
+
+        day = order.created_at.date()
+        assert rollups(test_db) == (
+            {(day, "FINISHED"): (1, 2000)},
+            {(day, "Calabresa", "Large"): (2, 2000)},
+        )
+
+
+@pytest.mark.orders
+class TestReports:
+    """Test the /reports endpoints"""
+
+    def test_reports_are_admin_only(self, client, user_token):
+        """Test that a regular user gets 403"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        for path in ("/reports/orders", "/reports/revenue", "/reports/top"):
+            assert client.get(path, headers=headers).status_code == 403
+
+    def test_orders_and_revenue(self, client, admin_token, order_activity):
+        """Test the per-day status counts and the revenue totals"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        day = utcnow().date().isoformat()
+
+        orders = client.get("/reports/orders", headers=headers).json()
+        revenue = client.get("/reports/revenue", headers=headers).json()
+
+        assert orders["days"] == [
+            {"day": day, "status": "CANCELED", "orders": 1, "revenue": 20.0},
+            {"day": day, "status": "FINISHED", "orders": 1, "revenue": 40.0},
+            {"day": day, "status": "PENDING", "orders": 1, "revenue": 0.0},
+        ]
+        assert revenue == {
+            "days": [{"day": day, "orders": 1, "revenue": 40.0}],
+            "orders": 1,
+            "revenue": 40.0,
+        }
+
+    def test_top_items(self, client, admin_token, order_activity):
+        """Test the best sellers by flavor and by size"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        by_flavor = client.get("/reports/top", headers=headers).json()
+        by_size = client.get(
+            "/reports/top", params={"by": "size", "limit": 1}, headers=headers
+        ).json()
+
+        assert [item["key"] for item in by_flavor["items"]] == [
+            "Calabresa",
+            "Portuguesa",
+        ]
+        assert by_size == {
+            "by": "size",
+            "items": [{"key": "Large", "quantity": 4, "revenue": 40.0}],
+        }
+
+    def test_date_range_is_inclusive(self, client, admin_token, order_activity):
+        """Test that start and end both include their own day"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        day = utcnow().date().isoformat()
+
+        same_day = client.get(
+            "/reports/revenue", params={"start": day, "end": day}, headers=headers
+        ).json()
+        before = client.get(
+            "/reports/revenue", params={"end": "2000-01-01"}, headers=headers
+        ).json()
+
+        assert same_day["orders"] == 1
+        assert before == {"days": [], "orders": 0, "revenue": 0.0}
+
+    def test_reports_do_not_read_orders(
+        self, client, admin_token, order_activity, query_budget
+    ):
+        """Test that the reports are served from the rollups alone"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        client.get("/reports/orders", headers=headers)
+
+        with query_budget(3) as profile:
+            for path in ("/reports/orders", "/reports/revenue", "/reports/top"):
+                assert client.get(path, headers=headers).status_code == 200
+
+        assert not [
+            statement
+            for statement in profile.statements
+            if " orders" in statement or "order_items" in statement
+        ]
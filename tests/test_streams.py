@@ -0,0 +1,234 @@
+"""
+Live order update tests: in-process broker, SSE and WebSocket endpoints
+"""
+
+import asyncio
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.core.pubsub import OrderBroker, SubscriptionClosed
+from app.models.dependencies import order_broker
+from routes.stream_routes import sse_events
+
+
+def message(order_id=1, user_id=1):
+    return {"type": "order.created", "order_id": order_id, "user_id": user_id}
+
+
+@pytest.fixture
+def broker_subscription(client):
+    """Subscribe to order_broker like a connection of the given user would"""
+    subscriptions = []
+
+    def subscribe(user_id, admin=False, order_id=None):
+        subscription = order_broker.subscribe(user_id, admin=admin, order_id=order_id)
+        subscriptions.append(subscription)
+        return subscription
+
+    yield subscribe
+    for subscription in subscriptions:
+        order_broker.unsubscribe(subscription)
+
+
+@pytest.mark.unit
+class TestOrderBroker:
+    """Test the in-process fan-out"""
+
+    async def test_owner_and_admins_get_the_message(self):
+        """Test that only the order's owner and the admins are reached"""
+        broker = OrderBroker()
+        owner = broker.subscribe(1)
+        other = broker.subscribe(2)
+        admin = broker.subscribe(3, admin=True)
+        other_order = broker.subscribe(1, order_id=99)
+
+        broker.publish(message(order_id=7, user_id=1))
+
+        assert await owner.get(0.1) == message(order_id=7, user_id=1)
+        assert await admin.get(0.1) == message(order_id=7, user_id=1)
+        assert await other.get(0.01) is None
+        assert await other_order.get(0.01) is None
+        assert broker.delivered == 2
+
+    async def test_waiting_subscriber_is_woken(self):
+        """Test that a pending get returns as soon as a message is published"""
+        broker = OrderBroker()
+        subscription = broker.subscribe(1)
+        waiting = asyncio.create_task(subscription.get(5))
+        await asyncio.sleep(0)
+
+        broker.publish(message())
+
+        assert await asyncio.wait_for(waiting, 1) == message()
+
+    async def test_slow_consumer_is_dropped(self):
+        """Test that a full mailbox drops that subscriber and nobody else"""
+        broker = OrderBroker(queue_size=2)
+        slow = broker.subscribe(1)
+        fast = broker.subscribe(1)
+
+        for order_id in range(3):
+            broker.publish(message(order_id=order_id))
+            if order_id < 2:
+                await fast.get(0.1)
+
+        with pytest.raises(SubscriptionClosed) as closed:
+            await slow.get(0.1)
+        assert closed.value.reason == "dropped"
+        assert await fast.get(0.1) == message(order_id=2)
+        assert (broker.dropped, len(broker)) == (1, 1)
+
+    async def test_close_ends_every_subscription(self):
+        """Test that shutdown wakes idle subscribers after what they already got"""
+        broker = OrderBroker()
+        user = broker.subscribe(1)
+        admin = broker.subscribe(2, admin=True)
+        broker.publish(message())
+
+        broker.close()
+
+        assert await user.get(0.1) == message()
+        assert await admin.get(0.1) == message()
+        for subscription in (user, admin):
+            with pytest.raises(SubscriptionClosed):
+                await subscription.get(0.1)
+        assert len(broker) == 0
+
+    async def test_sse_frames_and_heartbeat(self, sample_user):
+        """Test the SSE body: messages, a ping when idle and the end event"""
+        frames = sse_events(sample_user, None, None, heartbeat=0.01)
+
+        assert await anext(frames) == b": connected\n\n"
+        order_broker.publish(message(user_id=sample_user.id))
+        assert (await anext(frames)).startswith(b"event: order\ndata: {")
+        assert await anext(frames) == b": ping\n\n"
+        order_broker.close()
+        assert await anext(frames) == b"event: closed\ndata: {}\n\n"
+        with pytest.raises(StopAsyncIteration):
+            await anext(frames)
+        assert len(order_broker) == 0
+
+
+@pytest.mark.orders
+class TestPublishedUpdates:
+    """Test that committed order changes reach the broker"""
+
+    def test_status_change_is_published(
+        self, client, user_token, sample_order, broker_subscription
+    ):
+        """Test that finishing an order pushes its new state to the owner"""
+        subscription = broker_subscription(sample_order.user_id)
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        client.post(f"/orders/order/finish/{sample_order.id}", headers=headers)
+
+        (update,) = subscription.messages
+        assert update["type"] == "order.finished"
+        assert (update["order_id"], update["status"]) == (sample_order.id, "FINISHED")
+
+    def test_rejected_change_is_not_published(
+        self, client, user_token, sample_order, broker_subscription
+    ):
+        """Test that a failed transition publishes nothing"""
+        subscription = broker_subscription(sample_order.user_id, admin=True)
+        headers = {"Authorization": f"Bearer {user_token}"}
+        client.post(f"/orders/order/cancel/{sample_order.id}", headers=headers)
+
+        response = client.post(
+            f"/orders/order/finish/{sample_order.id}", headers=headers
+        )
+
+        assert response.status_code == 409
+        assert [update["type"] for update in subscription.messages] == [
+            "order.canceled"
+        ]
+
+
+@pytest.mark.orders
+class TestStreamEndpoints:
+    """Test GET /orders/stream and the /orders/stream/ws WebSocket"""
+
+    def test_sse_streams_updates(self, client, user_token, sample_user):
+        """Test the event stream up to a server shutdown"""
+
+        async def publish_then_close():
+            loop = asyncio.get_running_loop()
+            loop.call_later(
+                0.2, order_broker.publish, message(order_id=5, user_id=sample_user.id)
+            )
+            loop.call_later(0.4, order_broker.close)
+
+        client.portal.call(publish_then_close)
+        response = client.get(
+            "/orders/stream", headers={"Authorization": f"Bearer {user_token}"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "event: order\ndata: " in response.text
+        assert '"order_id":5' in response.text
+        assert response.text.endswith("event: closed\ndata: {}\n\n")
+
+    def test_sse_requires_auth_and_own_user(self, client, user_token, admin_token):
+        """Test 401 without a token and 403 for another user's orders"""
+        assert client.get("/orders/stream").status_code == 401
+        response = client.get(
+            "/orders/stream",
+            params={"user_id": 999},
+            headers={"Authorization": f"Bearer {user_token}"},
+        )
+        assert response.status_code == 403
+
+    def test_websocket_pushes_status_changes(self, client, user_token, sample_order):
+        """Test that a WebSocket client sees its order being finished"""
+        headers = {"Authorization": f"Bearer {user_token}"}
+
+        with client.websocket_connect(
+            f"/orders/stream/ws?token={user_token}&order_id={sample_order.id}"
+        ) as websocket:
+            client.post(f"/orders/order/finish/{sample_order.id}", headers=headers)
+            update = websocket.receive_json()
+
+        assert update["type"] == "order.finished"
+        assert update["status"] == "FINISHED"
+
+    def test_websocket_admin_sees_every_order(
+        self, client, admin_token, user_token, sample_order
+    ):
+        """Test that an admin connection gets other users' orders"""
+        with client.websocket_connect(
+            "/orders/stream/ws", headers={"Authorization": f"Bearer {admin_token}"}
+        ) as websocket:
+            client.post(
+                f"/orders/order/cancel/{sample_order.id}",
+                headers={"Authorization": f"Bearer {user_token}"},
+            )
+            update = websocket.receive_json()
+
+        assert (update["type"], update["user_id"]) == (
+            "order.canceled",
+            sample_order.user_id,
+        )
+
+    def test_websocket_rejects_bad_token(self, client):
+        """Test that an invalid token never gets a connection"""
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with client.websocket_connect("/orders/stream/ws?token=not-a-token"):
+                pass
+
+        assert closed.value.code == 1008
+
+    def test_websocket_disconnect_unsubscribes(self, client, user_token):
+        """Test that a closed connection leaves no subscription behind"""
+        with client.websocket_connect(f"/orders/stream/ws?token={user_token}"):
+            assert len(order_broker) == 1
+
+        async def wait_unsubscribed():
+            for _ in range(100):
+                if not len(order_broker):
+                    return 0
+                await asyncio.sleep(0.01)
+            return len(order_broker)
+
+        assert client.portal.call(wait_unsubscribed) == 0